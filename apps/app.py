@@ -1,103 +1,336 @@
+import asyncio
 import json
+import logging
 import uuid
+from contextlib import asynccontextmanager
 from http import HTTPStatus
 from typing import Optional, Annotated
 
-from fastapi import FastAPI, Response, Form
+from fastapi import Depends, FastAPI, Form, Header, Response
+from fastapi.routing import APIRoute
 from slack import WebClient
-from starlette.background import BackgroundTasks
 from starlette.requests import Request
 
+from bookstores import bookstores, product_key
+from debug import loop_monitor, router as debug_router
 from dtos.internal.book import Book
-from dtos.slack.book_submission import BookSubmitPayload
-from dtos.slack.dialog import Dialog, DialogElement
-from dtos.slack.api_repsponse import CommonResponse
-from dtos.slack.api_repsponse import UserProfileResponse
-from functions import post_book_to_notion
+from dtos.slack.book_submission import BookSubmitPayload, Identifier
+from functions import archive_book, get_open_graph, repair_pages_periodically, OPEN_GRAPH_BASE_URL
+from http_clients import http_clients
+from idempotency import idempotency, idempotency_key
+from interactions import interaction_payload
+from metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    background_tasks,
+    errors,
+    handler_outcomes,
+    in_flight_requests,
+    outbox_dead_letters,
+    outbox_depth,
+    registry,
+    request_duration,
+    stage_duration,
+    track_upstream,
+)
+from notion import NOTION_API_BASE_URL, notion_client
+from notion_mirror import notion_mirror
+from outbox import outbox
+from pipeline import Deadline, pending_background_tasks, run_in_background, wait_background_tasks
+from profile_cache import ProfileCache
 from settings import settings
+from shared_cache import shared_cache
+from slack_api import SlackApi
+from taxonomy import JSON_CONTENT_TYPE, taxonomy
 
-app = FastAPI()
+
+logger = logging.getLogger(__name__)
 
 slack_token: Optional[str] = settings.slack_api_token
-slack_client = WebClient(token=slack_token, run_async=True)
+slack_client = WebClient(token=slack_token, base_url=settings.slack_api_base_url, run_async=True)
+slack_api = SlackApi(slack_client, rate_share=settings.slack_rate_share, max_retries=settings.slack_max_retries)
+profile_cache = ProfileCache(slack=slack_api, cache=shared_cache, ttl=settings.profile_cache_ttl)
+
+ARCHIVE_BOOK: str = "archive_book"
+outbox.register(ARCHIVE_BOOK, archive_book)
+
+outbox_depth.set_function(lambda: outbox.depth())
+outbox_dead_letters.set_function(lambda: outbox.dead_letter_count())
+background_tasks.set_function(pending_background_tasks)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    await slack_api.open_session()
+    await http_clients.prewarm(
+        (OPEN_GRAPH_BASE_URL, NOTION_API_BASE_URL),
+        connections_per_host=settings.http_prewarm_connections_per_host,
+        timeout=settings.http_prewarm_timeout,
+    )
+    prewarm_profiles = asyncio.create_task(profile_cache.prewarm_periodically(settings.profile_prewarm_interval))
+    outbox.start()
+    flush_metrics = asyncio.create_task(registry.flush_periodically(settings.metrics_flush_interval))
+    sync_mirror = asyncio.create_task(
+        notion_mirror.sync_periodically(notion_client, settings.notion_mirror_sync_interval)
+    )
+    repair_pages = asyncio.create_task(repair_pages_periodically(settings.page_repair_interval))
+    if settings.debug_token:
+        loop_monitor.start()
+    yield
+    loop_monitor.stop()
+    repair_pages.cancel()
+    sync_mirror.cancel()
+    prewarm_profiles.cancel()
+    await wait_background_tasks(timeout=settings.submit_book_budget)
+    await outbox.stop(timeout=settings.outbox_drain_timeout)
+    await http_clients.aclose()
+    await slack_api.aclose()
+    flush_metrics.cancel()
+    registry.flush()
+
+
+app = FastAPI(lifespan=lifespan)
+app.include_router(debug_router)
+
+
+@app.middleware("http")
+async def measure_request(request: Request, call_next):
+    # 라우팅 전에는 어떤 핸들러인지 모르므로 경로로 구분하고, 등록되지 않은 경로는 라벨 하나로 묶는다
+    handler = next((r.name for r in app.routes if isinstance(r, APIRoute) and r.path == request.url.path), "unknown")
+    in_flight_requests.inc(handler=handler)
+    try:
+        with request_duration.time(handler=handler):
+            return await call_next(request)
+    except Exception as e:
+        errors.inc(source=handler, error=type(e).__name__)
+        handler_outcomes.inc(handler=handler, outcome="exception")
+        raise
+    finally:
+        in_flight_requests.dec(handler=handler)
+
+
+@app.get("/metrics")
+async def metrics() -> Response:
+    return Response(content=registry.render(), media_type=METRICS_CONTENT_TYPE)
+
 
 DIALOG_SUBMIT_DONE: str = "dialog_submission"
+UNSUPPORTED_BOOKSTORE_ERROR: str = f"첨부 가능한 서점 링크는 {'/'.join(store.name for store in bookstores)} 입니다."
 SUCCESS_MESSAGE: str = """
 📖 {recommender}님이 {category}도서를 추천했어요 📖
 
 {recommend_reason}
 {bookstore_url}
 """
+DUPLICATE_NOTE: str = "(이미 추천된 책이라 노션의 기존 페이지에 추천이유를 덧붙일게요)\n"
+ANNOUNCE_FAILED: str = "추천 메세지를 채널에 보내지 못했어요 ({error}). 잠시 뒤에 다시 추천해주세요.\n{bookstore_url}"
+SEARCH_USAGE: str = "검색어를 함께 입력해주세요. 예) /book-search 추월차선"
+SEARCH_NO_RESULT: str = "'{query}' 에 해당하는 추천 도서가 없어요."
+SEARCH_RESULT: str = "📖 <{url}|{title}> ({category}, {recommender}님 추천)\n{recommend_reason}"
 
 
 @app.post("/open-form/")
 async def open_form(trigger_id: Annotated[str, Form()]) -> Response:
-    response = CommonResponse.model_validate(
-        (
-            await slack_client.dialog_open(  # type: ignore
-                dialog=Dialog(
-                    title="책을 공유해주세요.",
-                    callback_id=uuid.uuid4().hex,
-                    elements=[
-                        DialogElement(
-                            label="카테고리",
-                            name="category",
-                            type="select",
-                            option_groups=DialogElement.get_book_category_ogs(),
-                        ),
-                        DialogElement(label="도서링크", name="bookstore_url", type="text", subtype="url"),
-                        DialogElement(label="추천이유", name="recommend_reason", type="textarea"),
-                    ],
-                ).model_dump(),
-                trigger_id=trigger_id,
-            )
-        ).data,
+    response = await slack_api.open_dialog(
+        taxonomy.dialog_request(trigger_id=trigger_id, callback_id=uuid.uuid4().hex),
+        headers={"Content-Type": JSON_CONTENT_TYPE},
     )
 
     if response.ok:
+        handler_outcomes.inc(handler="open_form", outcome="ok")
         return Response()
+    handler_outcomes.inc(handler="open_form", outcome="slack_error")
+    errors.inc(source="slack", error=response.error)
     return Response(content=response.error)
 
 
 @app.post("/submit-book/")
-async def submit_book(request: Request, background_tasks: BackgroundTasks) -> Response:
-    # json 형태의 폼 데이터는 pydantic 모델 타입으로 어노테이션 했을 때 장점을 누리기 어려우므로 Request 타입으로 어노테이션
-    form = await request.form()
-    payload: BookSubmitPayload = BookSubmitPayload.model_validate(json.loads(form.get("payload")))
+async def submit_book(
+    payload: Annotated[BookSubmitPayload, Depends(interaction_payload(BookSubmitPayload, handler="submit_book"))],
+    x_slack_retry_num: Annotated[Optional[str], Header()] = None,
+) -> Response:
+    # 슬랙은 3초 안에 응답을 받지 못하면 사용자에게 에러를 보여주므로 모든 단계는 이 기한 안에서 실행
+    deadline = Deadline(settings.submit_book_budget)
+
+    # 슬랙의 재전송이나 두 번 누른 제출은 외부 API 를 부르기 전에 걸러내고, 처리 중이면 그 결과를 기다린다
+    key = idempotency_key(payload.callback_id, payload.user.id, payload.submission.model_dump())
+    claimed, stored = await idempotency.claim(key, timeout=deadline.remaining())
+    if not claimed:
+        logger.info(f"dropped a duplicate submission of {payload.user.id} (retry {x_slack_retry_num})")
+        handler_outcomes.inc(handler="submit_book", outcome="duplicate_request")
+        return Response() if stored is None else Response(status_code=stored.status_code, content=stored.body)
+
+    try:
+        response = await handle_submission(payload, deadline)
+    except BaseException:
+        idempotency.release(key)
+        raise
+    if response.status_code == HTTPStatus.OK and not response.body:
+        # 다이얼로그가 닫힌 (제출이 끝난) 경우만 기록하고, 에러를 보여준 제출은 다시 제출할 수 있게 한다
+        idempotency.complete(key, response.status_code, response.body)
+    else:
+        idempotency.release(key)
+    return response
+
+
+async def handle_submission(payload: BookSubmitPayload, deadline: Deadline) -> Response:
+    with stage_duration.time(handler="submit_book", stage="validate"):
+        valid_link = payload.type == DIALOG_SUBMIT_DONE and payload.submission.validate_link()
+        supported = valid_link and payload.submission.able_to_get_opengraph_tags()
+        # 외부 API 를 부르기 전에, 이미 추천된 책인지 로컬 색인에서 확인
+        duplicate = supported and notion_mirror.is_recommended(product_key(payload.submission.bookstore_url))
+
     if payload.type != DIALOG_SUBMIT_DONE:
+        handler_outcomes.inc(handler="submit_book", outcome="bad_request")
         return Response(status_code=HTTPStatus.BAD_REQUEST)
 
-    if not payload.submission.validate_link():
+    if not valid_link:
+        handler_outcomes.inc(handler="submit_book", outcome="invalid_link")
         return Response(
             headers={"content-type": "application/json"},
             content=json.dumps({"errors": [{"name": "bookstore_url", "error": "유효하지 않은 URL입니다."}]}),
         )
 
-    if not payload.submission.able_to_get_opengraph_tags():
+    if not supported:
+        handler_outcomes.inc(handler="submit_book", outcome="unsupported_bookstore")
         return Response(
             headers={"content-type": "application/json"},
-            content=json.dumps({"errors": [{"name": "bookstore_url", "error": "첨부 가능한 서점 링크는 리디북스/예스24 입니다."}]}),
+            content=json.dumps({"errors": [{"name": "bookstore_url", "error": UNSUPPORTED_BOOKSTORE_ERROR}]}),
         )
 
-    user_profile_res: UserProfileResponse = UserProfileResponse.model_validate(
-        (await slack_client.users_profile_get(user=payload.user.id)).data,
-    )
-    book: Book = Book(
-        category=payload.submission.category,
-        bookstore_url=payload.submission.bookstore_url,
-        recommend_reason=payload.submission.recommend_reason,
-        recommender=user_profile_res.profile.real_name,
-    )
+    if not duplicate:
+        # 노션 아카이빙에 필요한 오픈그래프 태그를 미리 조회해서, 컨슈머가 작업을 가져갈 때는 캐시에서 바로 읽도록 함
+        run_in_background(get_open_graph(payload.submission.bookstore_url))
+
+    if settings.submit_book_deferred_reply:
+        # 검증이 끝나면 바로 응답하고, 메세지 전송은 응답 뒤에 한다 (슬랙 API 가 느려도 다이얼로그가 타임아웃되지 않음)
+        run_in_background(announce_later(payload, duplicate=duplicate))
+        handler_outcomes.inc(handler="submit_book", outcome="deferred")
+        return Response()
+
+    book: Book = payload.submission.book(recommender=await get_recommender(payload.user, deadline))
+
+    announcement = run_in_background(announce_book(book, channel=payload.channel.id, duplicate=duplicate))
+    try:
+        with stage_duration.time(handler="submit_book", stage="announce"):
+            error = await deadline.run(announcement)
+    except asyncio.TimeoutError:
+        # 메세지 전송과 아카이빙은 백그라운드에서 계속 진행하고 슬랙에는 먼저 응답. 실패는 끝난 뒤에 추천한 사람에게 알린다
+        logger.warning(f"announcing {book.bookstore_url} exceeded {settings.submit_book_budget}s")
+        handler_outcomes.inc(handler="submit_book", outcome="timeout")
+        run_in_background(report_late_announcement(payload, announcement))
+        return Response()
 
-    post_message_res = CommonResponse.model_validate(
-        (
-            await slack_client.chat_postMessage(
-                channel=payload.channel.id, text=SUCCESS_MESSAGE.format(**book.model_dump())
+    if error:
+        handler_outcomes.inc(handler="submit_book", outcome="slack_error")
+        errors.inc(source="slack", error=error)
+        return Response(content=error)
+    handler_outcomes.inc(handler="submit_book", outcome="duplicate" if duplicate else "ok")
+    return Response()
+
+
+@app.post("/search-books/")
+async def search_books(text: Annotated[str, Form()] = "") -> Response:
+    # /book-search <검색어> 슬래시 커맨드. 결과는 명령을 입력한 사람에게만 보인다
+    query = text.strip()
+    if not query:
+        handler_outcomes.inc(handler="search_books", outcome="bad_request")
+        return slack_message(SEARCH_USAGE)
+
+    with stage_duration.time(handler="search_books", stage="search"):
+        books = notion_mirror.search(query, limit=settings.search_result_limit)
+
+    handler_outcomes.inc(handler="search_books", outcome="ok" if books else "no_result")
+    if not books:
+        return slack_message(SEARCH_NO_RESULT.format(query=slack_escape(query)))
+    return slack_message(
+        "\n\n".join(
+            SEARCH_RESULT.format(
+                title=slack_escape(book.title or book.url),
+                url=book.url,
+                recommender=slack_escape(book.recommender),
+                category=slack_escape(book.categories[0] if book.categories else ""),
+                recommend_reason=slack_escape(book.recommend_reason),
             )
-        ).data,
+            for book in books
+        )
     )
+
+
+def slack_escape(text: str) -> str:
+    # 슬랙 메세지에서 링크/멘션으로 해석되는 문자
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def slack_message(text: str) -> Response:
+    return Response(
+        headers={"content-type": "application/json"},
+        content=json.dumps({"response_type": "ephemeral", "text": text}, ensure_ascii=False),
+    )
+
+
+async def get_recommender(user: Identifier, deadline: Deadline) -> str:
+    try:
+        with stage_duration.time(handler="submit_book", stage="profile_lookup"):
+            return await deadline.run(profile_cache.get_real_name(user.id), budget=settings.profile_lookup_budget)
+    except asyncio.TimeoutError:
+        logger.warning(f"profile lookup of {user.id} exceeded {settings.profile_lookup_budget}s")
+        errors.inc(source="submit_book", error="profile_lookup_timeout")
+        return user.name or user.id
+
+
+async def announce_later(payload: BookSubmitPayload, duplicate: bool) -> None:
+    # 이미 응답을 보냈으므로 실패는 추천한 사람에게만 보이는 메세지로 알린다
+    try:
+        book = payload.submission.book(
+            recommender=await get_recommender(payload.user, Deadline(settings.profile_lookup_budget))
+        )
+        with stage_duration.time(handler="submit_book", stage="announce"):
+            error = await announce_book(book, channel=payload.channel.id, duplicate=duplicate)
+    except Exception as e:
+        logger.exception(f"failed to announce {payload.submission.bookstore_url}")
+        error = type(e).__name__
+    await report_announce_failure(payload, error)
+
+
+async def report_late_announcement(payload: BookSubmitPayload, announcement: "asyncio.Future[Optional[str]]") -> None:
+    # 기한을 넘겨 응답한 뒤에 끝난 메세지 전송 (예외는 run_in_background 가 로그로 남긴다)
+    try:
+        error = await announcement
+    except Exception as e:
+        error = type(e).__name__
+    await report_announce_failure(payload, error)
+
+
+async def report_announce_failure(payload: BookSubmitPayload, error: Optional[str]) -> None:
+    if error:
+        errors.inc(source="slack", error=error)
+        await notify_submitter(
+            payload, ANNOUNCE_FAILED.format(error=error, bookstore_url=payload.submission.bookstore_url)
+        )
+
+
+async def notify_submitter(payload: BookSubmitPayload, text: str) -> None:
+    # 다이얼로그 제출에 딸려 오는 response_url 로 보내고, 없으면 chat.postEphemeral 을 쓴다
+    try:
+        if payload.response_url:
+            with track_upstream("slack", "response_url"):
+                response = await http_clients.get(payload.response_url).post(
+                    payload.response_url,
+                    json={"response_type": "ephemeral", "replace_original": False, "text": text},
+                    timeout=settings.submit_book_budget,
+                )
+                response.raise_for_status()
+        else:
+            await slack_api.chat_post_ephemeral(channel=payload.channel.id, user=payload.user.id, text=text)
+    except Exception as e:
+        logger.error(f"failed to notify {payload.user.id} of a failed submission: {e!r}")
+
+
+async def announce_book(book: Book, channel: str, duplicate: bool = False) -> Optional[str]:
+    text = SUCCESS_MESSAGE.format(**book.model_dump()) + (DUPLICATE_NOTE if duplicate else "")
+    post_message_res = await slack_api.chat_post_message(channel=channel, text=text)
     if not post_message_res.ok:
-        return Response(content=post_message_res.error)
+        return post_message_res.error
 
-    background_tasks.add_task(post_book_to_notion, book)
-    return Response()
+    outbox.enqueue(ARCHIVE_BOOK, book.model_dump())
+    return None
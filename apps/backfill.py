@@ -0,0 +1,281 @@
+import argparse
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from slack import WebClient
+
+from bookstores import bookstores, parse_book_link, product_key
+from dtos.internal.book import Book
+from dtos.slack.api_repsponse import Message
+from functions import post_book_to_notion
+from http_clients import http_clients
+from notion import NotionClient, notion_client
+from notion_mirror import NotionMirror, notion_mirror
+from profile_cache import ProfileCache
+from settings import settings
+from shared_cache import shared_cache
+from slack_api import SlackApi
+
+
+logger = logging.getLogger(__name__)
+
+# 북크북크가 생기기 전에, 또는 노션 장애로 아카이빙되지 못한 #books 채널의 추천 도서를 노션에 채워 넣는다.
+#   python backfill.py [--oldest 1609426800] [--category 미분류] [--restart]
+# conversations.history 를 커서로 끝까지 훑으면서 서점 링크를 찾고, 봇과 같은 경로(post_book_to_notion) 로 아카이빙한다.
+# - 찾은 링크는 다음 커서와 같은 트랜잭션에서 SQLite 에 기록하므로, 중간에 멈춰도 다시 실행하면 이어서 진행한다
+# - 채널을 훑는 동안 concurrency 개의 워커가 찾은 링크를 바로 아카이빙한다 (노션 API 제한은 notion_client 가 지킴)
+# - 이미 노션에 있는 책은 노션 사본의 책 키 색인으로 확인해서 건너뛴다
+
+PENDING: str = "pending"
+DONE: str = "done"
+SKIPPED: str = "skipped"
+FAILED: str = "failed"
+
+DEFAULT_CATEGORY: str = "미분류"
+
+# 슬랙 메세지 본문의 링크 <https://...> 또는 <https://...|보이는 글자>
+_SLACK_LINK = re.compile(r"<(https?://[^|>\s]+)(?:\|[^>]*)?>")
+# 북크북크가 보낸 추천 메세지 (app.SUCCESS_MESSAGE) 의 첫 줄
+_ANNOUNCEMENT = re.compile(r"📖 (?P<recommender>.+?)님이 (?P<category>.+?)도서를 추천했어요 📖")
+
+Item = Tuple[str, Book]
+
+
+def book_links(text: str) -> List[str]:
+    links = []
+    for match in _SLACK_LINK.finditer(text):
+        url = match.group(1).replace("&amp;", "&")
+        link = parse_book_link(url)
+        if link is not None and bookstores.for_link(link) is not None and url not in links:
+            links.append(url)
+    return links
+
+
+class Backfill:
+    def __init__(
+        self,
+        path: str,
+        channel: str,
+        slack: SlackApi,
+        notion: NotionClient,
+        mirror: NotionMirror,
+        concurrency: int,
+        page_size: int = 200,
+        category: str = DEFAULT_CATEGORY,
+    ):
+        self.path = path
+        self.channel = channel
+        self.slack = slack
+        self.notion = notion
+        self.mirror = mirror
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self.category = category
+
+        # 같은 서버의 봇 워커들이 모아둔 프로필을 함께 쓴다
+        self.profile_cache = ProfileCache(slack=slack, cache=shared_cache, ttl=settings.profile_cache_ttl)
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                " channel TEXT NOT NULL,"
+                " ts TEXT NOT NULL,"
+                " url TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " last_error TEXT,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (channel, ts, url))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS items_status ON items (channel, status)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints (channel TEXT PRIMARY KEY, cursor TEXT, completed INTEGER)"
+            )
+        return self._conn
+
+    def checkpoint(self) -> Tuple[Optional[str], bool]:
+        # (다음에 받을 conversations.history 커서, 채널을 끝까지 훑었는지)
+        row = self._connection.execute(
+            "SELECT cursor, completed FROM checkpoints WHERE channel = ?", (self.channel,)
+        ).fetchone()
+        return (row[0], bool(row[1])) if row else (None, False)
+
+    def restart(self) -> None:
+        # 채널을 처음부터 다시 훑는다. 이미 처리한 메세지는 기록이 남아 있으므로 다시 아카이빙하지 않는다
+        self._connection.execute("DELETE FROM checkpoints WHERE channel = ?", (self.channel,))
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connection.execute(
+            "SELECT status, COUNT(*) FROM items WHERE channel = ? GROUP BY status", (self.channel,)
+        ).fetchall()
+        return dict(rows)
+
+    async def run(self, oldest: Optional[str] = None) -> Dict[str, int]:
+        # 이미 아카이빙된 책을 알 수 있도록 노션 사본부터 최신으로 맞춘다
+        await self.mirror.sync(self.notion)
+
+        queue: "asyncio.Queue[Optional[Item]]" = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.ensure_future(self._archive_from(queue)) for _ in range(self.concurrency)]
+        try:
+            try:
+                # 지난번에 처리하지 못한 링크부터
+                for item in self._unfinished():
+                    await queue.put(item)
+                async for item in self._crawl(oldest):
+                    await queue.put(item)
+            finally:
+                # 채널을 훑다가 실패해도 이미 찾은 링크는 마저 처리한다
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+        return self.counts()
+
+    def _unfinished(self) -> Iterator[Item]:
+        rows = self._connection.execute(
+            "SELECT ts, payload FROM items WHERE channel = ? AND status IN (?, ?) ORDER BY ts",
+            (self.channel, PENDING, FAILED),
+        ).fetchall()
+        for ts, payload in rows:
+            yield ts, Book.model_validate_json(payload)
+
+    async def _crawl(self, oldest: Optional[str]) -> AsyncIterator[Item]:
+        cursor, completed = self.checkpoint()
+        while not completed:
+            params: dict = {"limit": self.page_size}
+            if cursor:
+                params["cursor"] = cursor
+            if oldest:
+                params["oldest"] = oldest
+            # conversations.history 의 rate limit 은 SlackApi 가 맞춘다
+            response = await self.slack.conversations_history(channel=self.channel, **params)
+
+            found = [(message.ts, book) for message in response.messages for book in await self._books(message)]
+            cursor = response.response_metadata.next_cursor if response.has_more else ""
+            completed = not cursor
+            for item in self._record(found, cursor, completed):
+                yield item
+
+    async def _books(self, message: Message) -> List[Book]:
+        links = book_links(message.text)
+        if not links:
+            return []
+
+        header, _, body = message.text.strip().partition("\n")
+        announcement = _ANNOUNCEMENT.search(header)
+        if announcement:
+            recommender, category = announcement.group("recommender"), announcement.group("category")
+        else:
+            recommender, category, body = await self._real_name(message.user), self.category, message.text
+        reason = _SLACK_LINK.sub("", body).strip()
+        return [
+            Book(category=category, bookstore_url=url, recommend_reason=reason, recommender=recommender)
+            for url in links
+        ]
+
+    async def _real_name(self, user_id: Optional[str]) -> str:
+        if not user_id:
+            return ""
+        try:
+            return await self.profile_cache.get_real_name(user_id)
+        except Exception as e:
+            logger.warning(f"failed to get real name of {user_id}: {e!r}")
+            return user_id
+
+    def _record(self, found: List[Item], cursor: str, completed: bool) -> List[Item]:
+        # 찾은 링크와 다음 커서를 한 트랜잭션으로 남겨서, 어디서 멈춰도 링크를 잃거나 두 번 처리하지 않는다
+        conn, now, recorded = self._connection, time.time(), []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for ts, book in found:
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO items (channel, ts, url, payload, status, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.channel, ts, book.bookstore_url, book.model_dump_json(), PENDING, now),
+                ).rowcount
+                if inserted:
+                    recorded.append((ts, book))
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (channel, cursor, completed) VALUES (?, ?, ?)",
+                (self.channel, cursor, int(completed)),
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return recorded
+
+    async def _archive_from(self, queue: "asyncio.Queue[Optional[Item]]") -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            ts, book = item
+            if self.mirror.is_recommended(product_key(book.bookstore_url)):
+                self._finish(ts, book, SKIPPED)
+                continue
+
+            try:
+                archived, error = await post_book_to_notion(book), "not archived"
+            except Exception as e:
+                logger.exception(f"failed to archive {book.bookstore_url} of message {ts}")
+                archived, error = False, repr(e)
+            self._finish(ts, book, DONE if archived else FAILED, None if archived else error)
+
+    def _finish(self, ts: str, book: Book, status: str, error: Optional[str] = None) -> None:
+        self._connection.execute(
+            "UPDATE items SET status = ?, attempts = attempts + 1, last_error = ?, updated_at = ?"
+            " WHERE channel = ? AND ts = ? AND url = ?",
+            (status, error, time.time(), self.channel, ts, book.bookstore_url),
+        )
+
+
+async def main(args: argparse.Namespace) -> None:
+    # 봇과 따로 도는 프로세스이므로 rate limit 을 나눠 쓰지 않는다 (봇은 conversations.history 를 부르지 않음)
+    slack = SlackApi(
+        WebClient(token=settings.slack_api_token, base_url=settings.slack_api_base_url, run_async=True),
+        max_retries=settings.slack_max_retries,
+    )
+    backfill = Backfill(
+        path=settings.backfill_path,
+        channel=args.channel,
+        slack=slack,
+        notion=notion_client,
+        mirror=notion_mirror,
+        concurrency=args.concurrency,
+        category=args.category,
+    )
+    if args.restart:
+        backfill.restart()
+    await slack.open_session()
+    try:
+        counts = await backfill.run(oldest=args.oldest)
+    finally:
+        await slack.aclose()
+        await http_clients.aclose()
+    print(", ".join(f"{status} {counts.get(status, 0)}" for status in (DONE, SKIPPED, FAILED, PENDING)))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="슬랙 채널의 예전 추천 도서를 노션에 채워 넣기")
+    parser.add_argument("--channel", default=settings.books_channel)
+    parser.add_argument("--oldest", help="이 시각(unix timestamp) 이후의 메세지만")
+    parser.add_argument("--category", default=DEFAULT_CATEGORY, help="봇이 보내지 않은 메세지의 카테고리")
+    parser.add_argument("--concurrency", type=int, default=settings.backfill_concurrency)
+    parser.add_argument("--restart", action="store_true", help="채널을 처음부터 다시 훑기 (처리한 메세지는 건너뜀)")
+    asyncio.run(main(parser.parse_args()))
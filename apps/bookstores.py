@@ -0,0 +1,207 @@
+import re
+from typing import Dict, Iterator, List, NamedTuple, Optional, Pattern, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+# 서점별 처리(호스트 판별, 링크 정규화, 상품 id 추출, 표지 이미지 주소 변환) 를 한 곳에 모은 어댑터.
+# 새 서점(알라딘, 교보문고 등) 을 지원하려면 BookStore 를 상속한 어댑터를 만들어 bookstores 에 등록하면 된다.
+
+# 서점 링크에 붙는 검색/추적용 파라미터는 같은 책이어도 매번 달라지므로 정규화할 때 제외
+_TRACKING_PARAM_PREFIXES = ("_", "utm_")
+
+_SCHEMES = ("https://", "http://")
+_HOST = re.compile(r"[a-z0-9.\-]*")
+
+
+class BookLink(NamedTuple):
+    scheme: str
+    host: str
+    port: str
+    path: str
+    query: str
+    fragment: str
+
+
+def _is_valid_host(host: str) -> bool:
+    # [a-z0-9]+([-.][a-z0-9]+)*\.[a-z]{2,5}
+    labels = host.split(".")
+    if len(labels) < 2:
+        return False
+    tld = labels.pop()
+    if not (2 <= len(tld) <= 5 and tld.isalpha()):
+        return False
+    return all(part for label in labels for part in label.split("-"))
+
+
+def parse_book_link(link: str) -> Optional[BookLink]:
+    # 예전에 쓰던 정규식과 같은 링크만 받아들이지만, 백트래킹 없이 한 번만 훑으면서 구성요소까지 나눈다
+    # ^(http://www\.|https://www\.|http://|https://)?[a-z0-9]+([\-\.]{1}[a-z0-9]+)*\.[a-z]{2,5}(:[0-9]{1,5})?(/.*)?$
+    if link.endswith("\n"):
+        # 정규식의 $ 는 문자열 끝의 줄바꿈 바로 앞에서도 일치한다
+        link = link[:-1]
+
+    scheme = ""
+    for prefix in _SCHEMES:
+        if link.startswith(prefix):
+            scheme, _, link = link.partition("://")
+            break
+
+    host_end = _HOST.match(link).end()
+    host, rest = link[:host_end], link[host_end:]
+    if not _is_valid_host(host) or "\n" in rest:
+        return None
+
+    port = ""
+    if rest.startswith(":"):
+        port, slash, path = rest[1:].partition("/")
+        if not (1 <= len(port) <= 5 and port.isascii() and port.isdigit()):
+            return None
+        rest = slash + path
+    if rest and not rest.startswith("/"):
+        return None
+
+    rest, _, fragment = rest.partition("#")
+    path, _, query = rest.partition("?")
+    return BookLink(scheme=scheme, host=host, port=port, path=path, query=query, fragment=fragment)
+
+
+def _canonical_url(host: str, path: str, query: str) -> str:
+    params = sorted(
+        (key, value)
+        for key, value in parse_qsl(query, keep_blank_values=True)
+        if not key.startswith(_TRACKING_PARAM_PREFIXES)
+    )
+    return urlunsplit(("https", host, path.rstrip("/") or "/", urlencode(params), ""))
+
+
+def isbn_key(isbn: str) -> Optional[str]:
+    # ISBN-10 은 ISBN-13 으로 바꿔서 같은 책이 같은 키를 갖도록 한다
+    digits = isbn.replace("-", "").replace(" ", "").upper()
+    if len(digits) == 10 and digits[:9].isdigit() and (digits[9].isdigit() or digits[9] == "X"):
+        body = "978" + digits[:9]
+        check = -sum(int(digit) * (3 if i % 2 else 1) for i, digit in enumerate(body)) % 10
+        digits = body + str(check)
+    if len(digits) != 13 or not digits.isdigit():
+        return None
+    return f"isbn:{digits}"
+
+
+class BookStore:
+    name: str = ""
+    # 첫 번째 호스트를 정규화된 링크에 사용
+    hosts: Tuple[str, ...] = ()
+    image_hosts: Tuple[str, ...] = ()
+    # 상품 상세 페이지 경로. id 그룹으로 상품 id 를 꺼낸다
+    product_path: Optional[Pattern[str]] = None
+    # 상품 상세 페이지의 정규화된 경로 (첫 번째 호스트 기준)
+    product_url_path: str = "/{id}"
+
+    def product_id(self, path: str) -> Optional[str]:
+        matched = self.product_path.match(path) if self.product_path else None
+        return matched.group("id") if matched else None
+
+    def product_url(self, product_id: str) -> str:
+        return _canonical_url(self.hosts[0], self.product_url_path.format(id=product_id), "")
+
+    def canonicalize(self, path: str, query: str) -> str:
+        # 같은 책의 상세 페이지는 쿼리나 경로 형태(모바일 등) 와 상관없이 하나의 링크로 모은다
+        product_id = self.product_id(path)
+        if product_id is not None:
+            return self.product_url(product_id)
+        return _canonical_url(self.hosts[0], path, query)
+
+    def rewrite_cover(self, image_url: str) -> str:
+        return image_url
+
+
+class Ridibooks(BookStore):
+    name = "리디북스"
+    hosts = ("ridibooks.com", "www.ridibooks.com")
+    image_hosts = ("img.ridicdn.net",)
+    product_path = re.compile(r"/books/(?P<id>\d+)(?:/|$)")
+    product_url_path = "/books/{id}"
+
+    def rewrite_cover(self, image_url: str) -> str:
+        # https://img.ridicdn.net/cover/1354000126/xxlarge#1 -> https://img.ridicdn.net/cover/1354000126/xxlarge1.png
+        return image_url.replace("xxlarge#1", "xxlarge1.png")
+
+
+class Yes24(BookStore):
+    name = "예스24"
+    hosts = ("yes24.com", "www.yes24.com", "m.yes24.com")
+    image_hosts = ("image.yes24.com",)
+    product_path = re.compile(r"/(?:Product/Goods|24/goods|Goods/Detail)/(?P<id>\d+)(?:/|$)", re.IGNORECASE)
+
+    def product_url(self, product_id: str) -> str:
+        # 상품 페이지만 www 호스트로 정규화한다
+        return f"https://www.yes24.com/Product/Goods/{product_id}"
+
+    def rewrite_cover(self, image_url: str) -> str:
+        # https://image.yes24.com/goods/142763152/XL -> https://image.yes24.com/goods/142763152/XL.png
+        return image_url + ".png" if image_url.endswith("/XL") else image_url
+
+
+class BookStoreRegistry:
+    def __init__(self):
+        self._stores: List[BookStore] = []
+        self._by_host: Dict[str, BookStore] = {}
+        self._by_image_host: Dict[str, BookStore] = {}
+
+    def register(self, store: BookStore) -> BookStore:
+        self._stores.append(store)
+        self._by_host.update(dict.fromkeys(store.hosts, store))
+        self._by_image_host.update(dict.fromkeys(store.image_hosts, store))
+        return store
+
+    def __iter__(self) -> Iterator[BookStore]:
+        return iter(self._stores)
+
+    def for_host(self, host: str) -> Optional[BookStore]:
+        return self._by_host.get(host)
+
+    def for_link(self, link: BookLink) -> Optional[BookStore]:
+        # 포트가 붙은 링크는 서점 링크로 보지 않는다
+        return None if link.port else self._by_host.get(link.host)
+
+    def _split(self, book_link: str) -> Tuple[Optional[BookStore], str, str, str]:
+        # parse_book_link 가 받아들이는 링크(스킴이 없는 ridibooks.com/books/1 등) 는 그 결과를 그대로 쓰고,
+        # 그 밖의 링크만 urlsplit 으로 나눈다
+        link = parse_book_link(book_link.strip())
+        if link is not None:
+            host = f"{link.host}:{link.port}" if link.port else link.host
+            return self.for_link(link), host, link.path, link.query
+        parts = urlsplit(book_link.strip())
+        host = parts.netloc.lower()
+        return self._by_host.get(host), host, parts.path, parts.query
+
+    def canonicalize_url(self, book_link: str) -> str:
+        store, host, path, query = self._split(book_link)
+        return self._canonicalize(store, host, path, query)
+
+    def product_key(self, book_link: str) -> str:
+        # 같은 책인지 판단하는 키. 상품 상세 페이지면 서점과 상품 id, 아니면 정규화된 링크
+        store, host, path, query = self._split(book_link)
+        product_id = store.product_id(path) if store is not None else None
+        if product_id is None:
+            return self._canonicalize(store, host, path, query)
+        return f"{store.hosts[0]}/{product_id}"
+
+    @staticmethod
+    def _canonicalize(store: Optional[BookStore], host: str, path: str, query: str) -> str:
+        if store is not None:
+            return store.canonicalize(path, query)
+        if host.startswith("www."):
+            host = host[4:]
+        return _canonical_url(host, path, query)
+
+    def rewrite_cover(self, image_url: str) -> str:
+        store = self._by_image_host.get(urlsplit(image_url).netloc.lower())
+        return image_url if store is None else store.rewrite_cover(image_url)
+
+
+bookstores = BookStoreRegistry()
+bookstores.register(Ridibooks())
+bookstores.register(Yes24())
+
+canonicalize_url = bookstores.canonicalize_url
+product_key = bookstores.product_key
@@ -0,0 +1,121 @@
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Iterator
+
+from metrics import circuit_open, errors
+from settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+# 업스트림(opengraph.io, 노션) 이 죽었을 때 요청마다 타임아웃까지 기다리지 않고 바로 실패하게 한다.
+# - closed: 최근 window 번의 호출 중 실패 비율이 failure_threshold 이상이면 open 으로
+# - open: open_duration 동안 호출하지 않고 CircuitOpenError 를 던진다
+# - half_open: 그 뒤에는 probes 개의 호출만 흘려보내서, 성공하면 closed 로 돌아가고 실패하면 다시 open
+# 상태는 워커마다 따로 가진다 (워커 네 개가 각자 몇 번씩만 실패해보면 되므로 공유하지 않음)
+
+CLOSED: str = "closed"
+OPEN: str = "open"
+HALF_OPEN: str = "half_open"
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"circuit of {name} is open, retry in {retry_in:.1f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: float,
+        window: int,
+        minimum_calls: int,
+        open_duration: float,
+        probes: int = 1,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.minimum_calls = minimum_calls
+        self.open_duration = open_duration
+        self.probes = probes
+
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = 0
+        self._probed_at = 0.0
+        self._results: Deque[bool] = deque(maxlen=window)
+
+    @property
+    def state(self) -> str:
+        now = time.monotonic()
+        if self._state == OPEN and now >= self._opened_at + self.open_duration:
+            self._state, self._probing = HALF_OPEN, 0
+        elif self._state == HALF_OPEN and now >= self._probed_at + self.open_duration:
+            # 결과를 알려주지 않고 끝난 (취소된) 시험 호출이 자리를 계속 차지하지 않도록
+            self._probing = 0
+        return self._state
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == CLOSED:
+            return
+        if state == HALF_OPEN and self._probing < self.probes:
+            self._probing += 1
+            self._probed_at = time.monotonic()
+            return
+        errors.inc(source=self.name, error="circuit_open")
+        raise CircuitOpenError(self.name, max(0.0, self._opened_at + self.open_duration - time.monotonic()))
+
+    def record_success(self) -> None:
+        if self._state == HALF_OPEN:
+            logger.info(f"circuit of {self.name} is closed")
+            self._results.clear()
+            self._set_state(CLOSED)
+        self._results.append(True)
+
+    def record_failure(self) -> None:
+        if self._state == HALF_OPEN:
+            self._open()
+            return
+        self._results.append(False)
+        failures = self._results.count(False)
+        if len(self._results) >= self.minimum_calls and failures / len(self._results) >= self.failure_threshold:
+            self._open()
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        # 예외가 나면 실패로 기록한다. 응답 코드로 실패를 판단해야 하면 before_call/record_* 를 직접 호출
+        self.before_call()
+        try:
+            yield
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+
+    def _open(self) -> None:
+        if self._state != OPEN:
+            logger.warning(f"circuit of {self.name} is open for {self.open_duration}s")
+        self._opened_at = time.monotonic()
+        self._results.clear()
+        self._set_state(OPEN)
+
+    def _set_state(self, state: str) -> None:
+        self._state = state
+        circuit_open.set(0 if state == CLOSED else 1, upstream=self.name)
+
+
+def circuit_breaker(name: str) -> CircuitBreaker:
+    return CircuitBreaker(
+        name=name,
+        failure_threshold=settings.circuit_failure_threshold,
+        window=settings.circuit_window,
+        minimum_calls=settings.circuit_minimum_calls,
+        open_duration=settings.circuit_open_duration,
+        probes=settings.circuit_half_open_probes,
+    )
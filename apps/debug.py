@@ -0,0 +1,186 @@
+import asyncio
+import gc
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from http import HTTPStatus
+from types import FrameType
+from typing import Deque, Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from starlette.requests import Request
+
+from settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+# 운영 중인 워커가 무엇을 하고 있는지 보기 위한 엔드포인트. settings.debug_token 이 있어야 켜지고,
+# Authorization: Bearer <debug_token> 헤더로 인증한다. gunicorn 워커마다 따로 응답하므로 결과에 pid 를 함께 담는다.
+# - /debug/profile: N초 동안 이벤트 루프 스레드의 스택을 주기적으로 샘플링해서 flamegraph.pl / speedscope 가 읽는
+#   collapsed stack 형식(한 줄에 "바깥;...;안쪽 횟수") 으로 돌려준다. 별도 스레드에서 샘플링하므로 루프는 계속 돈다
+# - /debug/slow-callbacks: 이벤트 루프가 threshold 이상 멈췄던 기록과 그때 실행 중이던 스택
+# - /debug/heap: 워커의 메모리 사용량과, tracemalloc 을 켜둔 경우 메모리를 가장 많이 할당한 위치
+
+COLLAPSED_CONTENT_TYPE: str = "text/plain; charset=utf-8"
+MAX_PROFILE_SECONDS: float = 60
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse(frame: Optional[FrameType]) -> str:
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def sample_stacks(thread_id: int, seconds: float, interval: float) -> Counter:
+    # 다른 스레드에서 호출해야 한다 (sys._current_frames 는 GIL 을 잡은 순간의 각 스레드 스택)
+    stacks: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            stacks[collapse(frame)] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def render_collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def rss_bytes() -> Optional[int]:
+    # 리눅스에서만 (/proc 이 없으면 None)
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class LoopMonitor:
+    # 감시 스레드가 interval 마다 이벤트 루프에 콜백을 넣고, threshold 안에 실행되지 않으면 루프가 멈춘 것으로 보고
+    # 그 순간 루프 스레드의 스택(멈추게 만든 코드) 을 기록한다. 루프 디버그 모드와 달리 콜백마다 비용이 들지 않는다
+    def __init__(self, threshold: float, interval: float, history: int = 100):
+        self.threshold = threshold
+        self.interval = interval
+        self.slow_callbacks: Deque[dict] = deque(maxlen=history)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread_id = 0
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._stopped.clear()
+        threading.Thread(target=self._watch, name="loop-monitor", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.interval):
+            ran = threading.Event()
+            scheduled_at = time.monotonic()
+            try:
+                self._loop.call_soon_threadsafe(ran.set)
+            except RuntimeError:
+                # 루프가 닫힘
+                return
+            if ran.wait(self.threshold):
+                continue
+
+            stack = collapse(sys._current_frames().get(self._thread_id))
+            ran.wait()
+            self.slow_callbacks.append(
+                {"at": time.time(), "duration": round(time.monotonic() - scheduled_at, 4), "stack": stack}
+            )
+
+
+loop_monitor = LoopMonitor(threshold=settings.debug_slow_callback_threshold, interval=settings.debug_monitor_interval)
+_profiling = threading.Lock()
+
+
+def authorize(request: Request) -> None:
+    if not settings.debug_token:
+        # 켜지 않았으면 엔드포인트가 없는 것처럼
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND)
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), settings.debug_token.encode()):
+        raise HTTPException(status_code=HTTPStatus.UNAUTHORIZED)
+
+
+router = APIRouter(prefix="/debug", dependencies=[Depends(authorize)])
+
+
+@router.get("/profile")
+async def profile(
+    seconds: float = Query(default=10, gt=0, le=MAX_PROFILE_SECONDS),
+    interval: float = Query(default=0.005, ge=0.001, le=1),
+) -> Response:
+    if not _profiling.acquire(blocking=False):
+        raise HTTPException(status_code=HTTPStatus.CONFLICT, detail="another profile is running on this worker")
+    try:
+        loop = asyncio.get_running_loop()
+        stacks = await loop.run_in_executor(None, sample_stacks, threading.get_ident(), seconds, interval)
+    finally:
+        _profiling.release()
+    return Response(
+        content=render_collapsed(stacks),
+        media_type=COLLAPSED_CONTENT_TYPE,
+        headers={"X-Worker-Pid": str(os.getpid()), "X-Samples": str(sum(stacks.values()))},
+    )
+
+
+@router.get("/slow-callbacks")
+async def slow_callbacks() -> dict:
+    return {
+        "pid": os.getpid(),
+        "threshold": loop_monitor.threshold,
+        "slow_callbacks": list(loop_monitor.slow_callbacks),
+    }
+
+
+@router.get("/heap")
+async def heap(top: int = Query(default=20, gt=0, le=200)) -> dict:
+    report: Dict[str, object] = {
+        "pid": os.getpid(),
+        "rss_bytes": rss_bytes(),
+        "gc_counts": gc.get_count(),
+        "objects": len(gc.get_objects()),
+        "tracing": tracemalloc.is_tracing(),
+    }
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        statistics = tracemalloc.take_snapshot().statistics("lineno")[:top]
+        report.update(
+            traced_bytes=current,
+            traced_peak_bytes=peak,
+            top_allocations=[
+                {"site": str(stat.traceback[0]), "size_bytes": stat.size, "count": stat.count} for stat in statistics
+            ],
+        )
+    return report
+
+
+@router.post("/heap/tracing")
+async def trace_heap(enable: bool, frames: int = Query(default=1, gt=0, le=25)) -> dict:
+    # tracemalloc 은 켜져 있는 동안 할당마다 비용이 드므로 필요할 때만 켠다
+    if enable and not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    elif not enable and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    logger.info(f"tracemalloc is {'on' if tracemalloc.is_tracing() else 'off'} in worker {os.getpid()}")
+    return {"pid": os.getpid(), "tracing": tracemalloc.is_tracing()}
@@ -2,7 +2,7 @@ from typing import Optional
 
 from pydantic import BaseModel
 
-from enums import BookCategories
+from taxonomy import taxonomy
 
 
 class Book(BaseModel):
@@ -13,9 +13,4 @@ class Book(BaseModel):
 
     @property
     def parent_category(self) -> Optional[str]:
-        for category in BookCategories:
-            main, subs = category.value
-            for s in subs:
-                if s == self.category:
-                    return main
-        return None
+        return taxonomy.parent_of(self.category)
@@ -1,28 +1,16 @@
 from typing import Any
-from urllib.parse import urlparse
 
 from pydantic import BaseModel
 
-from enums import BookStoreImageDomain
+from bookstores import bookstores
 
 
 class ImageUrl(BaseModel):
     url: str
 
-    @property
-    def _image_domain(self) -> BookStoreImageDomain:
-        parsed_url = urlparse(self.url)
-        for domain in BookStoreImageDomain:
-            if domain in parsed_url.netloc or domain in parsed_url.path:
-                return domain
-
     def model_post_init(self, __context: Any):
-        if self._image_domain is BookStoreImageDomain.RIDI:
-            # https://img.ridicdn.net/cover/1354000126/xxlarge#1 -> https://img.ridicdn.net/cover/1354000126/xxlarge1.png
-            self.url = self.url.replace("xxlarge#1", "xxlarge1.png")
-        elif self._image_domain is BookStoreImageDomain.YES_TWENTY_FOUR:
-            # https://image.yes24.com/goods/142763152/XL -> https://image.yes24.com/goods/142763152/XL.png
-            self.url = self.url.replace("XL", "XL.png")
+        # 노션이 확장자로 이미지 형식을 판단하므로 서점별 표지 이미지 주소를 바꿔준다
+        self.url = bookstores.rewrite_cover(self.url)
 
 
 class Image(BaseModel):
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+
+from dtos.notion.text import TextContent
+
+
+class Paragraph(BaseModel):
+    rich_text: list[TextContent]
+
+
+class ParagraphBlock(BaseModel):
+    object: str = "block"
+    paragraph: Paragraph
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel, Field
 
 
@@ -8,6 +10,8 @@ class ImageUrl(BaseModel):
 class OpenGraph(BaseModel):
     title: str
     image: ImageUrl
+    # 서점 페이지의 books:isbn 태그 (리디북스 등 일부 서점만 제공)
+    isbn: Optional[str] = None
 
 
 class OpenGraphIOResponse(BaseModel):
@@ -14,3 +14,35 @@ class UserProfile(BaseModel):
 
 class UserProfileResponse(CommonResponse):
     profile: UserProfile
+
+
+class MemberProfile(BaseModel):
+    real_name: str = ""
+
+
+class Member(BaseModel):
+    id: str
+    deleted: bool = False
+    profile: MemberProfile
+
+
+class ResponseMetadata(BaseModel):
+    next_cursor: str = ""
+
+
+class UsersListResponse(CommonResponse):
+    members: list[Member] = []
+    response_metadata: ResponseMetadata = ResponseMetadata()
+
+
+class Message(BaseModel):
+    ts: str
+    text: str = ""
+    user: Optional[str] = None
+    subtype: Optional[str] = None
+
+
+class ConversationsHistoryResponse(CommonResponse):
+    messages: list[Message] = []
+    has_more: bool = False
+    response_metadata: ResponseMetadata = ResponseMetadata()
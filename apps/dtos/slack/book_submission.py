@@ -1,16 +1,9 @@
-from re import match
 from typing import Optional
-from urllib.parse import urlparse
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
-from enums import BookStoreDomain
-
-
-_LINK_REGEX = (
-    r"^(http:\/\/www\.|https:\/\/www\.|http:\/\/|https:\/\/)?[a-z0-9]"
-    r"+([\-\.]{1}[a-z0-9]+)*\.[a-z]{2,5}(:[0-9]{1,5})?(\/.*)?$"
-)
+from bookstores import BookLink, BookStore, bookstores, parse_book_link
+from dtos.internal.book import Book
 
 
 class BookSubmission(BaseModel):
@@ -18,28 +11,43 @@ class BookSubmission(BaseModel):
     bookstore_url: str
     recommend_reason: str
 
+    # 링크는 한 번만 파싱해서 서점 판별에도 재사용
+    _link: Optional[BookLink] = PrivateAttr(default=None)
+
     def validate_link(self) -> Optional[str]:
-        matched = match(_LINK_REGEX, self.bookstore_url)
-        if not matched:
+        self._link = parse_book_link(self.bookstore_url)
+        if self._link is None:
             return None
 
         self.bookstore_url = self.bookstore_url.strip()
         return self.bookstore_url
 
+    @property
+    def bookstore(self) -> Optional[BookStore]:
+        link = self._link or parse_book_link(self.bookstore_url)
+        return None if link is None else bookstores.for_link(link)
+
     def able_to_get_opengraph_tags(self) -> bool:
-        parsed_link = urlparse(self.bookstore_url)
-        for domain in BookStoreDomain:
-            if domain in parsed_link.netloc or domain in parsed_link.path:
-                return True
-        return False
+        return self.bookstore is not None
+
+    def book(self, recommender: str) -> Book:
+        return Book(
+            category=self.category,
+            bookstore_url=self.bookstore_url,
+            recommend_reason=self.recommend_reason,
+            recommender=recommender,
+        )
 
 
 class Identifier(BaseModel):
     id: str
+    name: Optional[str] = None
 
 
 class BookSubmitPayload(BaseModel):
     type: str
     submission: BookSubmission
+    callback_id: Optional[str] = None
     user: Identifier
     channel: Identifier
+    response_url: Optional[str] = None
@@ -2,8 +2,6 @@ from typing import List, Optional
 
 from pydantic import BaseModel
 
-from dtos.internal.book import BookCategories
-
 
 class DialogOption(BaseModel):
     label: str
@@ -22,15 +20,6 @@ class DialogElement(BaseModel):
     option_groups: Optional[List[DialogOptionGroup]] = None
     subtype: Optional[str] = None
 
-    @classmethod
-    def get_book_category_ogs(cls) -> List[DialogOptionGroup]:
-        option_groups = []
-        for category in BookCategories:
-            main, subs = category.value
-            group = DialogOptionGroup(label=main, options=[DialogOption(label=sub, value=sub) for sub in subs])
-            option_groups.append(group)
-        return option_groups
-
 
 class Dialog(BaseModel):
     title: str
@@ -14,13 +14,3 @@ class BookCategories(Enum):
     MATH_SCIENCE_ENGINEERING = "수학/과학/공학", ("수학", "공학", "자연과학", "응용과학")
     COMPUTER_IT = "컴퓨터/IT", ("IT자격증", "IT비즈니스", "컴퓨터공학/이론", "개발/프로그래밍")
     HEALTH_HOBBY = "건강/취미", ("생활습관", "음식/요리", "운동/스포츠", "기타")
-
-
-class BookStoreDomain(str, Enum):
-    RIDI = "ridibooks.com"
-    YES_TWENTY_FOUR = "yes24.com"
-
-
-class BookStoreImageDomain(str, Enum):
-    RIDI = "img.ridicdn.net"
-    YES_TWENTY_FOUR = "image.yes24.com"
@@ -1,75 +1,251 @@
+import asyncio
+import json
 import logging
+import sqlite3
 from http import HTTPStatus
+from typing import Dict, List, Optional
 
 import httpx
-from urllib.parse import quote_plus, urljoin
+from urllib.parse import quote_plus
 
-from httpx import HTTPError
-
-from dtos.notion.book_submission import BookSubmission, BookSubmissionProperties
-from dtos.notion.database import Database
+from circuit_breaker import OPEN, CircuitOpenError, circuit_breaker
 from dtos.notion.image_block import ImageBlock, Image, ImageUrl
-from dtos.notion.text import (
-    Title,
-    TextContent,
-    Content,
-    BookUrl,
-    Category,
-    CategoryName,
-    Recommender,
-    RecommendReason,
-)
+from dtos.notion.paragraph_block import Paragraph, ParagraphBlock
+from dtos.notion.text import Title, TextContent, Content
 from dtos.opengraph import OpenGraphIOResponse, OpenGraph
+from hedging import hedge
+from http_clients import http_clients
+from metrics import errors, track_upstream
+from notion import NotionError, notion_client
+from notion_mirror import REPAIR_LEASE, notion_mirror
+from notion_payloads import book_page
+from bookstores import canonicalize_url, isbn_key, product_key
+from og_cache import og_cache
+from og_scraper import is_scrapable, scrape_open_graph
 from settings import settings
 from dtos.internal.book import Book
 
-OPEN_GRAPH_BASE_URL: str = "https://opengraph.io/api/1.1/site/{book_link}"
-NOTION_API_BASE_URL = "https://api.notion.com"
+OPEN_GRAPH_BASE_URL: str = settings.og_api_base_url + "/api/1.1/site/{book_link}"
 
 
 logger = logging.getLogger(__name__)
 
+# 같은 책에 대한 조회가 동시에 들어오면 (추천 직후 미리 조회 + outbox 컨슈머) 한 번만 요청한다
+_open_graph_lookups: Dict[str, "asyncio.Future[Optional[OpenGraph]]"] = {}
+
+opengraph_breaker = circuit_breaker("opengraph")
+# 서점 페이지를 먼저 읽는 조회와 opengraph.io 만 쓰는 조회는 지연시간 분포가 달라서 따로 배운다
+bookstore_hedge = hedge("bookstore")
+opengraph_hedge = hedge("opengraph")
+
 
 async def get_og_tags(book_link: str) -> dict:
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
+    with track_upstream("opengraph", "site"), opengraph_breaker.guard():
+        response = await http_clients.get(OPEN_GRAPH_BASE_URL).get(
             OPEN_GRAPH_BASE_URL.format(book_link=quote_plus(book_link, encoding="UTF-8")),
             params={"app_id": settings.og_app_id},
-            timeout=60,
+            timeout=settings.og_api_timeout,
         )
+        if response.status_code >= 500:
+            response.raise_for_status()
+    if not response.is_success:
+        errors.inc(source="opengraph", error=f"http_{response.status_code}")
     return response.json()
 
 
+async def get_open_graph_io(book_link: str) -> OpenGraph:
+    return OpenGraphIOResponse.model_validate(await get_og_tags(book_link)).open_graph
+
+
+async def get_open_graph(book_link: str) -> Optional[OpenGraph]:
+    key = canonicalize_url(book_link)
+    lookup = _open_graph_lookups.get(key)
+    if lookup is None:
+        lookup = asyncio.ensure_future(_lookup_open_graph(book_link))
+        _open_graph_lookups[key] = lookup
+        lookup.add_done_callback(lambda _: _open_graph_lookups.pop(key, None))
+    return await asyncio.shield(lookup)
+
+
+async def _lookup_open_graph(book_link: str) -> Optional[OpenGraph]:
+    try:
+        hit, og = og_cache.get(book_link)
+    except sqlite3.Error as e:
+        # 캐시를 쓰지 못해도 (다른 워커가 오래 잠근 경우 등) 조회는 한다
+        logger.warning(f"failed to read opengraph cache of {book_link}: {e}")
+        hit, og = False, None
+    if hit:
+        return og
+
+    try:
+        og = await _fetch_open_graph(book_link)
+        if og is None:
+            logger.error(f"no opengraph tags found for {book_link}")
+    except CircuitOpenError as e:
+        # 링크 문제가 아니므로 실패를 캐시하지 않는다
+        logger.warning(f"skipped opengraph lookup of {book_link}: {e}")
+        return None
+    except (httpx.HTTPError, ValueError) as e:
+        logger.error(f"failed to get opengraph tags of {book_link}: {e}")
+        og = None
+
+    _cache_open_graph(book_link, og)
+    return og
+
+
+def _cache_open_graph(book_link: str, og: Optional[OpenGraph]) -> None:
+    try:
+        if og is None:
+            og_cache.set_failure(book_link)
+        else:
+            og_cache.set(book_link, og)
+    except sqlite3.Error as e:
+        logger.warning(f"failed to write opengraph cache of {book_link}: {e}")
+
+
+async def _fetch_open_graph(book_link: str) -> Optional[OpenGraph]:
+    if settings.og_scraper_enabled and is_scrapable(book_link):
+        # 서점 페이지에 태그가 없으면 바로, 서점이 느리면 기다리다가 opengraph.io 에도 보내서 먼저 온 결과를 쓴다
+        return await bookstore_hedge.first(
+            lambda: scrape_open_graph(book_link), lambda: get_open_graph_io(book_link), fallback=True
+        )
+    return await opengraph_hedge.first(lambda: get_open_graph_io(book_link), lambda: get_open_graph_io(book_link))
+
+
+async def archive_book(payload: dict) -> bool:
+    return await post_book_to_notion(Book.model_validate(payload))
+
+
 async def post_book_to_notion(book: Book) -> bool:
-    response = await get_og_tags(book.bookstore_url)
-    og: OpenGraph = (OpenGraphIOResponse.model_validate(response)).open_graph
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                urljoin(NOTION_API_BASE_URL, "v1/pages/"),
-                headers={"Authorization": f"Bearer {settings.notion_secret_key}", "Notion-Version": "2022-06-28"},
-                json=BookSubmission(
-                    parent=Database(),
-                    properties=BookSubmissionProperties(
-                        title=Title(title=[TextContent(text=Content(content=og.title))]),
-                        URL=BookUrl(url=book.bookstore_url),
-                        category=Category(
-                            multi_select=[CategoryName(name=book.category), CategoryName(name=book.parent_category)],
-                        ),
-                        recommender=Recommender(rich_text=[TextContent(text=Content(content=book.recommender))]),
-                        recommend_reason=RecommendReason(
-                            rich_text=[TextContent(text=Content(content=book.recommend_reason))],
-                        ),
-                    ),
-                    children=[ImageBlock(image=Image(external=ImageUrl(url=og.image.url)))],
-                ).model_dump(by_alias=True),
+    # 이미 노션에 있는 책이면 새 페이지를 만들지 않고 기존 페이지에 추천이유를 덧붙인다
+    key = product_key(book.bookstore_url)
+    page_id, claimed = notion_mirror.claim(key, lease=settings.book_claim_lease)
+    if page_id is not None:
+        return await append_recommendation(page_id, book)
+    if not claimed:
+        # 다른 워커가 같은 책의 페이지를 만들고 있으면 outbox 가 나중에 다시 시도한다
+        logger.info(f"{key} is being archived by another worker")
+        return False
+
+    try:
+        return await create_book_page(book, key)
+    finally:
+        notion_mirror.release(key)
+
+
+async def create_book_page(book: Book, key: str) -> bool:
+    og: Optional[OpenGraph] = await get_open_graph(book.bookstore_url)
+    if og is None:
+        # 오픈그래프 태그를 얻지 못해도 (opengraph.io 장애 등) 제목/표지 없이 페이지를 만들고, repair_pages 가 나중에 채운다
+        logger.warning(f"archiving {book.bookstore_url} without opengraph tags")
+        errors.inc(source="archive_book", error="degraded")
+
+    # 다른 서점 링크로 이미 추천된 같은 책
+    isbn = isbn_key(og.isbn) if og and og.isbn else None
+    page_id = notion_mirror.find_key(isbn) if isbn else None
+    if page_id is not None:
+        notion_mirror.link_keys([key], page_id)
+        return await append_recommendation(page_id, book)
+
+    page = book_page(book, og)
+    try:
+        created = await notion_client.create_page(page, dedupe_key=canonicalize_url(book.bookstore_url))
+    except (httpx.HTTPError, NotionError) as e:
+        logger.error(f"exception occurred while posting notion: {e}")
+        return False
+
+    try:
+        # 노션 응답에 속성이 빠져 있으면 보낸 값으로 채운다
+        notion_mirror.upsert(
+            created if "properties" in created else {"properties": json.loads(page)["properties"], **created}
+        )
+        notion_mirror.link_keys([k for k in (key, isbn) if k], created["id"])
+    except sqlite3.Error as e:
+        # 로컬 사본은 다음 동기화 때 맞춰지므로 아카이빙은 성공으로 처리
+        logger.warning(f"failed to write {created.get('id')} through to notion mirror: {e}")
+    return True
+
+
+def title_property(og: Optional[OpenGraph]) -> Title:
+    return Title(title=[TextContent(text=Content(content=og.title))] if og else [])
+
+
+def cover_blocks(og: Optional[OpenGraph]) -> List[ImageBlock]:
+    return [ImageBlock(image=Image(external=ImageUrl(url=og.image.url)))] if og else []
+
+
+async def repair_page(page_id: str, book_link: str) -> bool:
+    # 오픈그래프 태그 없이 만든 페이지에 표지와 제목을 채운다. 제목이 채워져야 다 고친 것으로 보므로 표지를 먼저 붙인다
+    og = await get_open_graph(book_link)
+    if og is None:
+        _repair_failed(page_id)
+        return False
+    try:
+        # 지난번에 표지만 붙이고 제목을 바꾸지 못했으면 표지를 또 붙이지 않는다
+        if not notion_mirror.cover_added(page_id):
+            await notion_client.append_block_children(
+                page_id, [block.model_dump(by_alias=True) for block in cover_blocks(og)]
             )
-        except HTTPError as e:
-            logger.error(f"exception occurred while posting notion: {e}")
-            return False
+            notion_mirror.mark_cover_added(page_id)
+        title = title_property(og).model_dump(by_alias=True)
+        updated = await notion_client.update_page(page_id, {"properties": {"title": title}})
+    except (httpx.HTTPError, NotionError) as e:
+        logger.error(f"exception occurred while repairing {page_id}: {e}")
+        _repair_failed(page_id)
+        return False
 
-        if response.status_code != HTTPStatus.OK:
-            logger.error(f"unexpected response from Notion API server: {response.text}")
-            return False
+    try:
+        notion_mirror.upsert({**updated, "properties": {**updated.get("properties", {}), "title": title}})
+        notion_mirror.repaired(page_id)
+    except sqlite3.Error as e:
+        logger.warning(f"failed to write {page_id} through to notion mirror: {e}")
+    return True
+
+
+def _repair_failed(page_id: str) -> None:
+    notion_mirror.repair_failed(
+        page_id, base_delay=settings.page_repair_interval, max_delay=settings.page_repair_max_delay
+    )
+
+
+async def repair_pages(limit: int) -> int:
+    repaired = 0
+    for book in notion_mirror.untitled(limit):
+        if opengraph_breaker.state == OPEN:
+            # opengraph.io 가 아직 죽어 있으면 다음 주기에 (half-open 이면 시험 호출을 겸한다)
+            break
+        repaired += await repair_page(book.id, book.url)
+    return repaired
 
+
+async def repair_pages_periodically(interval: float) -> None:
+    while True:
+        try:
+            if notion_mirror.try_lease(interval, name=REPAIR_LEASE):
+                repaired = await repair_pages(settings.page_repair_batch)
+                if repaired:
+                    logger.info(f"filled in opengraph tags of {repaired} pages")
+        except Exception:
+            logger.exception("failed to repair pages created without opengraph tags")
+        await asyncio.sleep(interval)
+
+
+async def append_recommendation(page_id: str, book: Book) -> bool:
+    try:
+        await notion_client.append_block_children(
+            page_id,
+            [
+                ParagraphBlock(
+                    paragraph=Paragraph(
+                        rich_text=[TextContent(text=Content(content=f"{book.recommender}: {book.recommend_reason}"))]
+                    )
+                ).model_dump()
+            ],
+        )
+    except (httpx.HTTPError, NotionError) as e:
+        logger.error(f"exception occurred while appending recommendation to {page_id}: {e}")
+        if isinstance(e, NotionError) and e.status_code == HTTPStatus.NOT_FOUND:
+            # 노션에서 지워진 페이지면 잊어버리고, 재시도할 때 새 페이지를 만든다
+            notion_mirror.forget(page_id)
+        return False
     return True
@@ -1,5 +1,29 @@
+import gc
 import os
 
 workers = 4
 worker_class = "uvicorn.workers.UvicornH11Worker"
 bind = "0.0.0.0:{}".format(os.getenv("PORT"))
+# 종료 시 outbox 를 비우는 시간(settings.outbox_drain_timeout) 보다 길게
+graceful_timeout = 30
+# 마스터에서 앱을 한 번 읽고 fork 한다. 카테고리/서점 색인, 노션 페이지 템플릿 같은 읽기 전용 객체를 워커마다 다시 만들지 않고
+# copy-on-write 로 나눠 쓴다. 모듈을 읽는 동안에는 파일(SQLite)/소켓/스레드/이벤트 루프를 만들지 않아야 한다 (모두 lifespan 이나 처음 쓸 때 생성)
+preload_app = True
+
+
+def on_starting(server):
+    # 지난 실행의 워커별 메트릭 스냅샷을 지운다 (pid 가 재사용되면 값이 섞임)
+    from metrics import registry
+
+    registry.clear()
+
+
+def when_ready(server):
+    # 미리 읽은 객체를 GC 대상에서 빼서, 워커의 GC 가 참조 정보를 건드려 공유하던 메모리 페이지를 복사하지 않게 한다
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    from metrics import registry
+
+    registry.mark_process_dead(worker.pid)
@@ -0,0 +1,122 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Optional, Set, TypeVar
+
+from metrics import hedged_requests
+from settings import settings
+
+
+T = TypeVar("T")
+
+# 꼬리 지연시간을 줄이는 hedged request. 먼저 보낸 요청이 최근 지연시간의 percentile 분위수 안에 끝나지 않으면
+# 다른 경로로 한 번 더 보내고, 먼저 온 유효한 결과(None 이 아니고 예외도 아닌 것) 를 쓰고 나머지는 취소한다.
+# - 추가 요청은 먼저 보낸 요청 수의 max_ratio 비율(과 burst 개) 까지만 보낸다. 업스트림 부하가 두 배가 되지 않도록
+# - 지연시간은 워커마다 최근 window 개를 기억하고, min_samples 개가 모이기 전에는 initial_delay 를 쓴다
+# - fallback 이면 먼저 보낸 요청이 결과 없이 끝났을 때 (delay 전이든 후든) 다른 경로로 보낸다. 이건 비율 제한에 세지 않는다
+
+
+class Hedge:
+    def __init__(
+        self,
+        name: str,
+        percentile: float,
+        window: int,
+        min_samples: int,
+        initial_delay: float,
+        min_delay: float,
+        max_ratio: float,
+        burst: float,
+    ):
+        self.name = name
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_ratio = max_ratio
+        self.burst = burst
+
+        self._latencies: Deque[float] = deque(maxlen=window)
+        # 조회할 때마다 max_ratio 씩 쌓이고 추가 요청마다 1 씩 쓴다
+        self._credits = 0.0
+
+    @property
+    def delay(self) -> float:
+        if len(self._latencies) < self.min_samples:
+            return self.initial_delay
+        latencies = sorted(self._latencies)
+        return max(self.min_delay, latencies[min(len(latencies) - 1, int(len(latencies) * self.percentile))])
+
+    def _take_credit(self) -> bool:
+        if self._credits < 1:
+            hedged_requests.inc(upstream=self.name, result="throttled")
+            return False
+        self._credits -= 1
+        hedged_requests.inc(upstream=self.name, result="sent")
+        return True
+
+    async def first(
+        self,
+        primary: Callable[[], Awaitable[Optional[T]]],
+        alternate: Callable[[], Awaitable[Optional[T]]],
+        fallback: bool = False,
+    ) -> Optional[T]:
+        self._credits = min(self.burst, self._credits + self.max_ratio)
+        delay = self.delay
+        started = time.monotonic()
+        first = asyncio.ensure_future(primary())
+        # 다른 경로가 이겨서 취소된 요청도 그때까지 걸린 시간을 기록한다 (느린 요청이 빠지면 분위수가 낮게 잡힌다)
+        first.add_done_callback(lambda _: self._latencies.append(time.monotonic() - started))
+        second: Optional[asyncio.Future] = None
+        pending: Set[asyncio.Future] = {first}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done and self._take_credit():
+                second = asyncio.ensure_future(alternate())
+                pending.add(second)
+            while True:
+                # 같이 끝난 요청의 예외도 꺼내 둔다 (안 꺼내면 asyncio 가 "exception was never retrieved" 를 남긴다)
+                for task, result in [(task, _result(task)) for task in done]:
+                    if result is not None:
+                        if task is second and first in pending:
+                            hedged_requests.inc(upstream=self.name, result="won")
+                        return result
+                if fallback and second is None and first.done():
+                    # 먼저 보낸 요청이 결과 없이 끝났으면 delay 전이든 후든 다른 경로로 보낸다 (추가 요청 한도와 무관)
+                    second = asyncio.ensure_future(alternate())
+                    pending.add(second)
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        # 둘 다 유효한 결과가 없으면 먼저 보낸 요청의 예외를, 그게 없으면 다른 경로의 예외를 던진다
+        error = _exception(first) or (second and _exception(second))
+        if error:
+            raise error
+        return None
+
+
+def _exception(task: asyncio.Future) -> Optional[BaseException]:
+    return None if task.cancelled() else task.exception()
+
+
+def _result(task: "asyncio.Future[Optional[T]]") -> Optional[T]:
+    if task.cancelled() or task.exception() is not None:
+        return None
+    return task.result()
+
+
+def hedge(name: str) -> Hedge:
+    return Hedge(
+        name=name,
+        percentile=settings.og_hedge_percentile,
+        window=settings.og_hedge_window,
+        min_samples=settings.og_hedge_min_samples,
+        initial_delay=settings.og_hedge_initial_delay,
+        min_delay=settings.og_hedge_min_delay,
+        max_ratio=settings.og_hedge_max_ratio,
+        burst=settings.og_hedge_burst,
+    )
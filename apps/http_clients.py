@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import ssl
+from typing import Dict, Iterable, Optional, Union
+from urllib.parse import urlparse
+
+import httpx
+
+from settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+def _origin(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+class HttpClientPool:
+    # 호스트(origin)마다 AsyncClient 를 하나씩 두어 호스트별로 커넥션 수를 제한하고 keep-alive 커넥션을 재사용
+    def __init__(
+        self,
+        max_connections_per_host: int,
+        max_keepalive_connections_per_host: int,
+        keepalive_expiry: float,
+        http2: bool = False,
+        verify: Union[bool, str] = True,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections_per_host,
+            max_keepalive_connections=max_keepalive_connections_per_host,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self.verify = verify
+        self.transport = transport
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._ssl_context: Optional[ssl.SSLContext] = None
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        origin = _origin(url)
+        client = self._clients.get(origin)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=self.limits, http2=self.http2, verify=self._verify(), transport=self.transport
+            )
+            self._clients[origin] = client
+        return client
+
+    def _verify(self) -> Union[bool, str, ssl.SSLContext]:
+        # 클라이언트마다 CA 인증서 묶음을 읽어 SSLContext 를 만들면 하나에 1MB 가까운 메모리와 수십 ms 가 드므로,
+        # 처음 클라이언트를 만들 때 하나만 만들어서 모든 호스트가 같이 쓴다
+        if self.verify is False or self.transport is not None:
+            return self.verify
+        if self._ssl_context is None:
+            self._ssl_context = httpx.create_ssl_context(verify=self.verify, http2=self.http2)
+        return self._ssl_context
+
+    async def prewarm(self, urls: Iterable[str], connections_per_host: int, timeout: float) -> None:
+        # 첫 요청이 DNS 조회/TCP/TLS 핸드셰이크 비용을 치르지 않도록 미리 커넥션을 열어둔다
+        requests = [self._touch(url, timeout) for url in urls for _ in range(connections_per_host)]
+        await asyncio.gather(*requests)
+
+    async def _touch(self, url: str, timeout: float) -> None:
+        try:
+            await self.get(url).head(_origin(url), timeout=timeout)
+        except httpx.HTTPError as e:
+            logger.warning(f"failed to prewarm connection to {_origin(url)}: {e!r}")
+
+    async def aclose(self) -> None:
+        clients, self._clients = list(self._clients.values()), {}
+        await asyncio.gather(*(client.aclose() for client in clients))
+
+
+http_clients = HttpClientPool(
+    max_connections_per_host=settings.http_max_connections_per_host,
+    max_keepalive_connections_per_host=settings.http_max_keepalive_connections_per_host,
+    keepalive_expiry=settings.http_keepalive_expiry,
+    http2=settings.http2_enabled,
+)
@@ -0,0 +1,125 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from settings import settings
+
+
+# 같은 인터랙션이 두 번 들어오는 경우 (슬랙이 느린 응답을 X-Slack-Retry-Num 을 붙여 다시 보내거나, 사용자가 제출을 두 번 누름)
+# 먼저 들어온 요청만 처리하고 나머지는 그 결과를 그대로 돌려준다.
+# - 키는 (다이얼로그 callback_id, 사용자, 제출 내용의 해시) 이고, 여러 gunicorn 워커가 같은 SQLite 파일을 공유한다
+# - 처리 중인 키는 lease 동안만 잡고 있으므로, 처리하던 워커가 죽으면 다음 요청이 이어받는다
+# - 처리가 끝난 결과는 ttl 동안 보관한다
+
+
+class StoredResponse(NamedTuple):
+    status_code: int
+    body: bytes
+
+
+def idempotency_key(*parts: object) -> str:
+    return hashlib.sha256(
+        json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(self, path: str, ttl: float, lease: float, poll_interval: float):
+        self.path = path
+        self.ttl = ttl
+        self.lease = lease
+        self.poll_interval = poll_interval
+
+        self._conn: Optional[sqlite3.Connection] = None
+        # 같은 워커에서 처리 중인 키는 폴링하지 않고 결과를 바로 기다린다
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            # status_code 가 NULL 이면 처리 중
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS idempotency_keys ("
+                " key TEXT PRIMARY KEY,"
+                " status_code INTEGER,"
+                " body BLOB,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idempotency_keys_expires_at ON idempotency_keys (expires_at)"
+            )
+        return self._conn
+
+    def try_claim(self, key: str) -> Tuple[bool, Optional[StoredResponse]]:
+        # (처리할 차례인지, 이미 끝난 요청의 결과)
+        conn, now = self._connection, time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT status_code, body FROM idempotency_keys WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                # 만료된 키 (처리하던 워커가 죽은 키 포함) 를 지우고 새로 잡는다
+                conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,))
+                conn.execute(
+                    "INSERT INTO idempotency_keys (key, status_code, body, expires_at) VALUES (?, NULL, NULL, ?)",
+                    (key, now + self.lease),
+                )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+        if row is None:
+            self._in_flight[key] = asyncio.get_running_loop().create_future()
+            return True, None
+        return False, None if row[0] is None else StoredResponse(row[0], row[1])
+
+    async def claim(self, key: str, timeout: float) -> Tuple[bool, Optional[StoredResponse]]:
+        # 다른 요청이 처리 중이면 timeout 동안 결과를 기다린다. 그래도 끝나지 않으면 (False, None)
+        claimed, stored = self.try_claim(key)
+        expires_at = time.monotonic() + timeout
+        while not claimed and stored is None:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                break
+            in_flight = self._in_flight.get(key)
+            if in_flight is not None:
+                await asyncio.wait({asyncio.shield(in_flight)}, timeout=remaining)
+            else:
+                await asyncio.sleep(min(self.poll_interval, remaining))
+            claimed, stored = self.try_claim(key)
+        return claimed, stored
+
+    def complete(self, key: str, status_code: int, body: bytes) -> None:
+        self._connection.execute(
+            "UPDATE idempotency_keys SET status_code = ?, body = ?, expires_at = ? WHERE key = ?",
+            (status_code, body, time.time() + self.ttl, key),
+        )
+        self._done(key)
+
+    def release(self, key: str) -> None:
+        # 실패한 요청은 기록하지 않아서, 다시 제출하면 처음부터 처리한다
+        self._connection.execute("DELETE FROM idempotency_keys WHERE key = ? AND status_code IS NULL", (key,))
+        self._done(key)
+
+    def _done(self, key: str) -> None:
+        in_flight = self._in_flight.pop(key, None)
+        if in_flight is not None and not in_flight.done():
+            in_flight.set_result(None)
+
+
+idempotency = IdempotencyStore(
+    path=settings.idempotency_path,
+    ttl=settings.idempotency_ttl,
+    lease=settings.idempotency_lease,
+    poll_interval=settings.idempotency_poll_interval,
+)
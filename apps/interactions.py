@@ -0,0 +1,69 @@
+import binascii
+import re
+from http import HTTPStatus
+from typing import Awaitable, Callable, Optional, Type, TypeVar, Union
+from urllib.parse import unquote_to_bytes
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from starlette.requests import Request
+
+from metrics import stage_duration
+
+
+# 슬랙 인터랙션(다이얼로그 제출, 버튼 클릭 등) 은 application/x-www-form-urlencoded 본문의 payload 필드에 JSON 을 담아 보낸다.
+# request.form() -> json.loads -> model_validate 를 거치면 같은 내용을 세 번 디코딩/복사하므로,
+# 본문에서 payload 필드만 바이트 그대로 잘라내서 pydantic 의 JSON 모드로 바로 검증한다.
+
+FORM_URLENCODED: str = "application/x-www-form-urlencoded"
+PAYLOAD_FIELD: bytes = b"payload"
+
+_MALFORMED_ESCAPE = re.compile(rb"%(?![0-9A-Fa-f]{2})")
+
+P = TypeVar("P", bound=BaseModel)
+
+
+def unquote_plus_bytes(value: bytes) -> bytes:
+    # 폼 인코딩에서 공백은 + 로 오고, 원래의 + 는 %2B 로 오므로 먼저 바꿔도 안전하다
+    value = value.replace(b"+", b" ")
+    if _MALFORMED_ESCAPE.search(value):
+        return unquote_to_bytes(value)
+    # 한글처럼 %XX 가 많은 본문은 unquote_to_bytes 가 파이썬 코드로 한 글자씩 처리해서 느리므로,
+    # %XX 를 quoted-printable 의 =XX 로 바꿔서 C 로 구현된 binascii.a2b_qp 로 디코딩한다 (원래의 = 는 =3D 로 보존)
+    return binascii.a2b_qp(value.replace(b"=", b"=3D").replace(b"%", b"="))
+
+
+def extract_payload(body: bytes) -> Optional[bytes]:
+    for field in body.split(b"&"):
+        name, _, value = field.partition(b"=")
+        if name == PAYLOAD_FIELD:
+            return unquote_plus_bytes(value)
+    return None
+
+
+async def read_payload(request: Request) -> Optional[Union[bytes, str]]:
+    if request.headers.get("content-type", "").startswith(FORM_URLENCODED):
+        return extract_payload(await request.body())
+    # 슬랙은 항상 urlencoded 로 보내지만, 그 외의 폼은 일반 파서로 처리
+    payload = (await request.form()).get("payload")
+    return payload if isinstance(payload, str) else None
+
+
+def interaction_payload(model: Type[P], handler: str) -> Callable[[Request], Awaitable[P]]:
+    # 인터랙션을 받는 엔드포인트에서 Depends(...) 로 사용
+    async def dependency(request: Request) -> P:
+        with stage_duration.time(handler=handler, stage="parse_form"):
+            payload = await read_payload(request)
+        if payload is None:
+            raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="payload is missing")
+
+        with stage_duration.time(handler=handler, stage="decode"):
+            try:
+                return model.model_validate_json(payload)
+            except ValidationError as e:
+                raise HTTPException(
+                    status_code=HTTPStatus.BAD_REQUEST,
+                    detail=e.errors(include_url=False, include_context=False, include_input=False),
+                )
+
+    return dependency
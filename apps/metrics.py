@@ -0,0 +1,282 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from settings import settings
+
+
+# 프로메테우스 텍스트 포맷(0.0.4) 으로 내보내는 최소한의 구현.
+# 값은 gunicorn 워커마다 메모리에 따로 쌓이므로, 각 워커가 주기적으로 <directory>/<pid>.json 에 스냅샷을 쓰고
+# /metrics 요청을 받은 워커가 모든 워커의 스냅샷을 합쳐서 응답한다. (다른 워커의 값은 flush 주기만큼 늦을 수 있음)
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE: str = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+LabelValues = Tuple[str, ...]
+M = TypeVar("M", bound="Metric")
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for v in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+class Metric:
+    type: str = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[LabelValues, object] = {}
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self) -> List[list]:
+        return [[list(key), value] for key, value in self.values.items()]
+
+    @staticmethod
+    def merge(left: object, right: object) -> object:
+        return left + right
+
+    def render(self, values: Dict[LabelValues, object]) -> Iterator[str]:
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: object) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), shared: bool = False):
+        # shared: outbox 깊이처럼 모든 워커가 같은 값을 보는 게이지. 워커별 값을 더하지 않고 응답하는 워커가 직접 읽는다
+        super().__init__(name, documentation, labelnames)
+        self.shared = shared
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels: object) -> None:
+        self.values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: object) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: object) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        # 라벨 없는 게이지의 값을 읽을 때마다 계산
+        self._function = function
+
+    def snapshot(self) -> List[list]:
+        if self._function is not None:
+            self.values[()] = self._function()
+        return super().snapshot()
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        state = self.values.get(key)
+        if state is None:
+            # 버킷별 개수는 누적하지 않고 저장하고, 내보낼 때 누적한다 (마지막 칸은 +Inf)
+            state = self.values[key] = {"buckets": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+        state["buckets"][bisect_left(self.buckets, value)] += 1
+        state["sum"] += value
+        state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    @staticmethod
+    def merge(left: dict, right: dict) -> dict:
+        return {
+            "buckets": [a + b for a, b in zip(left["buckets"], right["buckets"])],
+            "sum": left["sum"] + right["sum"],
+            "count": left["count"] + right["count"],
+        }
+
+    def render(self, values: Dict[LabelValues, object]) -> Iterator[str]:
+        for key, state in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), state["buckets"]):
+                cumulative += count
+                labels = _format_labels((*self.labelnames, "le"), (*key, _format_value(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(state['sum'])}"
+            yield f"{self.name}_count{labels} {state['count']}"
+
+
+class Registry:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: M) -> M:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def flush(self) -> None:
+        snapshot = {
+            name: metric.snapshot()
+            for name, metric in self.metrics.items()
+            if not (isinstance(metric, Gauge) and metric.shared)
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        # 다른 워커가 쓰다 만 파일을 읽지 않도록 임시 파일에 쓰고 교체
+        path = self._path(os.getpid())
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(snapshot, f)
+        os.replace(f"{path}.tmp", path)
+
+    async def flush_periodically(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.flush()
+            except OSError as e:
+                logger.warning(f"failed to flush metrics: {e!r}")
+
+    def mark_process_dead(self, pid: int) -> None:
+        # 종료된 워커의 카운터/히스토그램은 계속 합산하고(값이 줄어들면 rate() 가 틀어짐), 게이지만 제외
+        try:
+            with open(self._path(pid)) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return
+        for name, metric in self.metrics.items():
+            if isinstance(metric, Gauge):
+                snapshot.pop(name, None)
+        with open(self._path(pid), "w") as f:
+            json.dump(snapshot, f)
+
+    def clear(self) -> None:
+        # gunicorn 마스터가 뜰 때 지난 실행의 스냅샷을 지운다
+        if not os.path.isdir(self.directory):
+            return
+        for filename in os.listdir(self.directory):
+            if filename.endswith(".json"):
+                os.remove(os.path.join(self.directory, filename))
+
+    def collect(self) -> Dict[str, Dict[LabelValues, object]]:
+        self.flush()
+        merged: Dict[str, Dict[LabelValues, object]] = {name: {} for name in self.metrics}
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, samples in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                values = merged[name]
+                for key, value in samples:
+                    key = tuple(key)
+                    values[key] = metric.merge(values[key], value) if key in values else value
+
+        for name, metric in self.metrics.items():
+            if isinstance(metric, Gauge) and metric.shared:
+                metric.snapshot()
+                merged[name] = dict(metric.values)
+        return merged
+
+    def render(self) -> str:
+        lines = []
+        for name, values in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            lines.extend(metric.render(values))
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry(directory=settings.metrics_dir)
+
+request_duration = registry.register(
+    Histogram("bookk_request_duration_seconds", "Time spent handling a request.", ("handler",))
+)
+stage_duration = registry.register(
+    Histogram("bookk_stage_duration_seconds", "Time spent in each stage of a request handler.", ("handler", "stage"))
+)
+handler_outcomes = registry.register(
+    Counter("bookk_handler_outcomes_total", "Results of request handlers.", ("handler", "outcome"))
+)
+in_flight_requests = registry.register(
+    Gauge("bookk_in_flight_requests", "Requests currently being handled.", ("handler",))
+)
+upstream_duration = registry.register(
+    Histogram("bookk_upstream_duration_seconds", "Latency of calls to external APIs.", ("upstream", "operation"))
+)
+errors = registry.register(
+    Counter("bookk_errors_total", "Errors by where they happened and their class.", ("source", "error"))
+)
+outbox_jobs = registry.register(Counter("bookk_outbox_jobs_total", "Processed outbox jobs.", ("kind", "result")))
+outbox_depth = registry.register(Gauge("bookk_outbox_depth", "Jobs waiting in the outbox.", shared=True))
+outbox_dead_letters = registry.register(Gauge("bookk_outbox_dead_letters", "Jobs moved to dead letters.", shared=True))
+background_tasks = registry.register(Gauge("bookk_background_tasks", "Background tasks still running."))
+hedged_requests = registry.register(
+    Counter(
+        "bookk_hedged_requests_total",
+        "Requests sent to an alternate source because the first was slow.",
+        ("upstream", "result"),
+    )
+)
+circuit_open = registry.register(
+    Gauge("bookk_circuit_open", "Workers whose circuit breaker for the upstream is open.", ("upstream",))
+)
+
+
+@contextmanager
+def track_upstream(upstream: str, operation: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        errors.inc(source=upstream, error=type(e).__name__)
+        raise
+    finally:
+        upstream_duration.observe(time.perf_counter() - started, upstream=upstream, operation=operation)
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import time
+from http import HTTPStatus
+from typing import Dict, Optional, Union
+from urllib.parse import urljoin
+
+import httpx
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError, circuit_breaker
+from http_clients import HttpClientPool, http_clients
+from metrics import errors, track_upstream
+from ratelimit import AdaptiveConcurrencyLimit, TokenBucket
+from settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+NOTION_API_BASE_URL: str = settings.notion_api_base_url
+NOTION_VERSION: str = "2022-06-28"
+
+
+class NotionError(Exception):
+    def __init__(self, status_code: int, body: str):
+        super().__init__(f"unexpected response from Notion API server ({status_code}): {body}")
+        self.status_code = status_code
+        self.body = body
+
+
+def _is_idempotent(method: str, path: str) -> bool:
+    # 데이터베이스 조회는 POST 지만 읽기만 한다
+    return method != "POST" or path.endswith("/query")
+
+
+def _is_retryable(method: str, path: str, status_code: int) -> bool:
+    # 429, 409 는 노션이 요청을 처리하지 않은 것이지만, 5xx 는 처리한 뒤에 실패했을 수도 있다.
+    # 페이지 생성(POST v1/pages) 을 다시 보내면 같은 책의 페이지가 두 번 생길 수 있으므로 호출한 쪽(outbox) 에 맡긴다
+    if status_code in (HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.CONFLICT):
+        return True
+    return status_code >= 500 and _is_idempotent(method, path)
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+class NotionClient:
+    def __init__(
+        self,
+        secret_key: str,
+        pool: HttpClientPool,
+        rate: float,
+        burst: float,
+        max_concurrency: int,
+        latency_target: float,
+        max_retries: int,
+        breaker: CircuitBreaker,
+        base_url: str = NOTION_API_BASE_URL,
+        timeout: float = 30,
+    ):
+        self.secret_key = secret_key
+        self.pool = pool
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.breaker = breaker
+
+        self.bucket = TokenBucket(rate=rate, capacity=burst)
+        self.concurrency = AdaptiveConcurrencyLimit(
+            initial=1, minimum=1, maximum=max_concurrency, latency_target=latency_target
+        )
+        self._pending_writes: Dict[str, "asyncio.Future[dict]"] = {}
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.secret_key}", "Notion-Version": NOTION_VERSION}
+
+    async def create_page(self, page: Union[dict, bytes], dedupe_key: Optional[str] = None) -> dict:
+        # notion_payloads 로 미리 인코딩한 JSON 은 그대로 보낸다
+        body = {"content": page} if isinstance(page, bytes) else {"json": page}
+        return await self._coalesce(dedupe_key, lambda: self.request("POST", "v1/pages/", **body))
+
+    async def update_page(self, page_id: str, page: dict) -> dict:
+        return await self.request("PATCH", f"v1/pages/{page_id}", json=page)
+
+    async def append_block_children(self, block_id: str, children: list) -> dict:
+        return await self.request("PATCH", f"v1/blocks/{block_id}/children", json={"children": children})
+
+    async def query_database(self, database_id: str, query: dict) -> dict:
+        return await self.request("POST", f"v1/databases/{database_id}/query", json=query)
+
+    async def request(
+        self, method: str, path: str, json: Optional[dict] = None, content: Optional[bytes] = None
+    ) -> dict:
+        for attempt in range(self.max_retries + 1):
+            response = await self._send(method, path, json, content)
+            if response.is_success:
+                return response.json()
+            if not _is_retryable(method, path, response.status_code) or attempt == self.max_retries:
+                break
+
+            delay = _retry_after(response) or min(2**attempt, 30)
+            if response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+                # rate limit 은 integration 단위이므로 이 요청만이 아니라 모든 요청을 멈춘다
+                self.bucket.pause(delay)
+            logger.warning(f"retrying {method} {path} in {delay}s after {response.status_code}")
+            await asyncio.sleep(delay)
+
+        raise NotionError(response.status_code, response.text)
+
+    async def _send(self, method: str, path: str, json: Optional[dict], content: Optional[bytes]) -> httpx.Response:
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError as e:
+            # 노션이 죽어 있으면 기다리지 않고, 다른 노션 에러처럼 호출한 쪽(outbox 등) 에서 나중에 다시 시도하게 한다
+            raise NotionError(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+
+        await self.bucket.acquire()
+        await self.concurrency.acquire()
+        started, throttled = time.monotonic(), False
+        headers = self.headers if content is None else {**self.headers, "Content-Type": "application/json"}
+        try:
+            # 경로에 페이지/블록 id 가 들어가므로 첫 번째 구간(pages, blocks) 만 라벨로 사용
+            with track_upstream("notion", f"{method} {path.split('/')[1]}"):
+                response = await self.pool.get(self.base_url).request(
+                    method,
+                    urljoin(self.base_url, path),
+                    headers=headers,
+                    json=json,
+                    content=content,
+                    timeout=self.timeout,
+                )
+        except httpx.HTTPError:
+            self.breaker.record_failure()
+            raise
+        else:
+            if not response.is_success:
+                errors.inc(source="notion", error=f"http_{response.status_code}")
+            throttled = response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+            # 4xx 는 요청이 잘못된 것이고 429 는 rate limit 이므로, 5xx 만 노션이 죽은 것으로 본다
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return response
+        finally:
+            self.concurrency.release(time.monotonic() - started, throttled=throttled)
+
+    async def _coalesce(self, key: Optional[str], write) -> dict:
+        # 같은 책이 짧은 시간에 여러 번 추천되면 (버스트, 백필) 진행 중인 요청 하나로 합친다
+        if key is None:
+            return await write()
+        pending = self._pending_writes.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(write())
+            self._pending_writes[key] = pending
+            pending.add_done_callback(lambda _: self._pending_writes.pop(key, None))
+        return await asyncio.shield(pending)
+
+
+notion_client = NotionClient(
+    secret_key=settings.notion_secret_key,
+    pool=http_clients,
+    rate=settings.notion_rate_limit,
+    burst=settings.notion_rate_burst,
+    max_concurrency=settings.notion_max_concurrency,
+    latency_target=settings.notion_latency_target,
+    max_retries=settings.notion_max_retries,
+    breaker=circuit_breaker("notion"),
+)
@@ -0,0 +1,423 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import search
+from bookstores import canonicalize_url, product_key
+from http_clients import http_clients
+from notion import NotionClient, notion_client
+from settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+# 노션 추천 도서 데이터베이스를 로컬 SQLite 에 복제해둔 읽기 전용 사본.
+# 목록/개수/링크로 찾기 같은 조회는 노션 API 를 페이지 단위로 넘기지 않고 여기서 바로 읽는다.
+# - 증분 동기화: 마지막으로 본 last_edited_time 이후에 수정된 페이지만 가져온다
+# - 전체 동기화: 필요할 때만 (python notion_mirror.py --full) 실행하고, 노션에서 지워진 페이지도 반영한다
+# - 북크북크가 만든 페이지는 노션 응답으로 바로 기록한다 (write-through)
+# 같은 책이 다시 추천됐는지 알 수 있도록 책 키(서점+상품 id, ISBN) -> 페이지 id 색인도 함께 관리한다.
+
+SYNC_CURSOR: str = "last_edited_time"
+SYNC_LEASE: str = "sync_lease"
+REPAIR_LEASE: str = "repair_lease"
+
+
+class MirroredBook(NamedTuple):
+    id: str
+    title: str
+    url: str
+    categories: List[str]
+    recommender: str
+    recommend_reason: str
+    created_time: str
+    last_edited_time: str
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _plain_text(prop: Optional[dict]) -> str:
+    # 노션 응답은 plain_text 를, 페이지를 만들 때 보낸 본문은 text.content 를 갖고 있다
+    if not prop:
+        return ""
+    items = prop.get("title") if "title" in prop else prop.get("rich_text")
+    return "".join(item.get("plain_text") or item.get("text", {}).get("content", "") for item in items or ())
+
+
+def _row(page: dict) -> tuple:
+    properties = page.get("properties", {})
+    url = (properties.get("URL") or {}).get("url") or ""
+    categories = [option["name"] for option in (properties.get("category") or {}).get("multi_select") or ()]
+    return (
+        page["id"],
+        _plain_text(properties.get("title")),
+        url,
+        canonicalize_url(url) if url else "",
+        json.dumps(categories, ensure_ascii=False),
+        _plain_text(properties.get("recommender")),
+        _plain_text(properties.get("recommend reason")),
+        page.get("created_time") or _now_iso(),
+        page.get("last_edited_time") or _now_iso(),
+        time.time(),
+    )
+
+
+def _book(row: tuple) -> MirroredBook:
+    id_, title, url, categories, recommender, recommend_reason, created_time, last_edited_time = row
+    return MirroredBook(
+        id=id_,
+        title=title,
+        url=url,
+        categories=json.loads(categories),
+        recommender=recommender,
+        recommend_reason=recommend_reason,
+        created_time=created_time,
+        last_edited_time=last_edited_time,
+    )
+
+
+_BOOK_COLUMNS = "id, title, url, categories, recommender, recommend_reason, created_time, last_edited_time"
+
+
+class NotionMirror:
+    def __init__(self, path: str, database_id: str, page_size: int = 100):
+        self.path = path
+        self.database_id = database_id
+        self.page_size = page_size
+
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS books ("
+                " id TEXT PRIMARY KEY,"
+                " title TEXT NOT NULL,"
+                " url TEXT NOT NULL,"
+                " canonical_url TEXT NOT NULL,"
+                " categories TEXT NOT NULL,"
+                " recommender TEXT NOT NULL,"
+                " recommend_reason TEXT NOT NULL,"
+                " created_time TEXT NOT NULL,"
+                " last_edited_time TEXT NOT NULL,"
+                " synced_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS books_canonical_url ON books (canonical_url)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS books_created_time ON books (created_time)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            # book_id 가 없는 행은 어떤 워커가 그 책의 페이지를 만드는 중이라는 표시 (claimed_until 까지 유효)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS book_keys (key TEXT PRIMARY KEY, book_id TEXT, claimed_until REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS book_keys_book_id ON book_keys (book_id)")
+            # 제목/표지를 채우지 못한 페이지의 재시도 기록. 표지만 붙이고 실패했으면 다시 붙이지 않는다
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS page_repairs ("
+                " book_id TEXT PRIMARY KEY,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " retry_at REAL NOT NULL DEFAULT 0,"
+                " cover_added INTEGER NOT NULL DEFAULT 0)"
+            )
+            search.create_tables(self._conn)
+            self._reindex_if_needed()
+        return self._conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # 사본과 검색 색인은 항상 같이 바뀌어야 하므로 여러 문장을 한 트랜잭션으로 묶는다 (이미 열려 있으면 그대로 사용)
+        conn = self._connection
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def upsert(self, page: dict) -> None:
+        with self._transaction() as conn:
+            self._upsert(conn, page)
+
+    def _upsert(self, conn: sqlite3.Connection, page: dict) -> None:
+        if page.get("archived") or page.get("in_trash"):
+            self._remove(conn, page["id"])
+            return
+        # 동기화와 write-through 가 엇갈려도 더 최근에 수정된 내용을 남긴다
+        row = _row(page)
+        cursor = conn.execute(
+            "INSERT INTO books (id, title, url, canonical_url, categories, recommender, recommend_reason,"
+            " created_time, last_edited_time, synced_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (id) DO UPDATE SET"
+            " title = excluded.title, url = excluded.url, canonical_url = excluded.canonical_url,"
+            " categories = excluded.categories, recommender = excluded.recommender,"
+            " recommend_reason = excluded.recommend_reason, created_time = excluded.created_time,"
+            " last_edited_time = excluded.last_edited_time, synced_at = excluded.synced_at"
+            " WHERE excluded.last_edited_time >= books.last_edited_time",
+            row,
+        )
+        if cursor.rowcount:
+            self._index(conn, *row[:7])
+
+    def _index(
+        self,
+        conn: sqlite3.Connection,
+        id_: str,
+        title: str,
+        url: str,
+        canonical_url: str,
+        categories: str,
+        recommender: str,
+        recommend_reason: str,
+    ) -> None:
+        search.index_document(conn, id_, title, (recommender, *json.loads(categories), recommend_reason))
+        if url:
+            self._link_keys(conn, [product_key(url)], id_)
+
+    def _remove(self, conn: sqlite3.Connection, id_: str) -> None:
+        conn.execute("DELETE FROM books WHERE id = ?", (id_,))
+        conn.execute("DELETE FROM book_keys WHERE book_id = ?", (id_,))
+        conn.execute("DELETE FROM page_repairs WHERE book_id = ?", (id_,))
+        search.remove_document(conn, id_)
+
+    @staticmethod
+    def _link_keys(conn: sqlite3.Connection, keys: Iterable[str], book_id: str) -> None:
+        # 먼저 추천된 페이지를 남긴다. 만드는 중이라는 표시만 있으면 이 페이지로 바꾼다
+        conn.executemany(
+            "INSERT INTO book_keys (key, book_id) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET"
+            " book_id = excluded.book_id, claimed_until = NULL WHERE book_keys.book_id IS NULL",
+            [(key, book_id) for key in keys],
+        )
+
+    def is_recommended(self, key: str) -> bool:
+        # 이미 노션에 있거나, 다른 워커가 지금 페이지를 만들고 있는 책
+        return (
+            self._connection.execute(
+                "SELECT 1 FROM book_keys WHERE key = ? AND (book_id IS NOT NULL OR claimed_until > ?)",
+                (key, time.time()),
+            ).fetchone()
+            is not None
+        )
+
+    def find_key(self, key: str) -> Optional[str]:
+        row = self._connection.execute(
+            "SELECT book_id FROM book_keys WHERE key = ? AND book_id IS NOT NULL", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def claim(self, key: str, lease: float) -> Tuple[Optional[str], bool]:
+        # (이미 있는 페이지 id, 페이지를 만들 권한을 얻었는지). 여러 워커 중 하나만 같은 책의 페이지를 만든다
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT book_id, claimed_until FROM book_keys WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[0] is not None:
+                return row[0], False
+            if row is not None and row[1] > now:
+                return None, False
+            conn.execute(
+                "INSERT OR REPLACE INTO book_keys (key, book_id, claimed_until) VALUES (?, NULL, ?)", (key, now + lease)
+            )
+        return None, True
+
+    def link_keys(self, keys: Iterable[str], book_id: str) -> None:
+        with self._transaction() as conn:
+            self._link_keys(conn, keys, book_id)
+
+    def release(self, key: str) -> None:
+        # 페이지를 만들지 못했으면 다른 워커가 다시 시도할 수 있도록 표시를 지운다
+        self._connection.execute("DELETE FROM book_keys WHERE key = ? AND book_id IS NULL", (key,))
+
+    def forget(self, book_id: str) -> None:
+        # 노션에서 지워진 페이지
+        with self._transaction() as conn:
+            self._remove(conn, book_id)
+
+    def search(self, query: str, limit: int = 10) -> List[MirroredBook]:
+        ids = search.search(self._connection, query, limit)
+        if not ids:
+            return []
+        rows = {
+            row[0]: row
+            for row in self._connection.execute(
+                f"SELECT {_BOOK_COLUMNS} FROM books WHERE id IN ({', '.join('?' for _ in ids)})", ids
+            )
+        }
+        return [_book(rows[id_]) for id_ in ids]
+
+    def _reindex_if_needed(self) -> None:
+        # 검색 색인이나 책 키 색인이 생기기 전에 만들어진 사본이면 한 번 전체를 색인한다
+        books = self._conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+        indexed = self._conn.execute("SELECT COUNT(*) FROM search_documents").fetchone()[0]
+        keyed = self._conn.execute("SELECT COUNT(DISTINCT book_id) FROM book_keys").fetchone()[0]
+        if books == indexed and (keyed or not books):
+            return
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM search_documents")
+            conn.execute("DELETE FROM search_terms")
+            conn.execute("DELETE FROM book_keys WHERE book_id IS NOT NULL")
+            for row in conn.execute(
+                "SELECT id, title, url, canonical_url, categories, recommender, recommend_reason"
+                " FROM books ORDER BY created_time"
+            ).fetchall():
+                self._index(conn, *row)
+
+    def count(self, category: Optional[str] = None) -> int:
+        if category is None:
+            return self._connection.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+        return self._connection.execute(
+            "SELECT COUNT(*) FROM books WHERE EXISTS"
+            " (SELECT 1 FROM json_each(books.categories) WHERE json_each.value = ?)",
+            (category,),
+        ).fetchone()[0]
+
+    def recent(self, limit: int = 20, offset: int = 0, category: Optional[str] = None) -> List[MirroredBook]:
+        if category is None:
+            rows = self._connection.execute(
+                f"SELECT {_BOOK_COLUMNS} FROM books ORDER BY created_time DESC LIMIT ? OFFSET ?", (limit, offset)
+            ).fetchall()
+        else:
+            rows = self._connection.execute(
+                f"SELECT {_BOOK_COLUMNS} FROM books WHERE EXISTS"
+                " (SELECT 1 FROM json_each(books.categories) WHERE json_each.value = ?)"
+                " ORDER BY created_time DESC LIMIT ? OFFSET ?",
+                (category, limit, offset),
+            ).fetchall()
+        return [_book(row) for row in rows]
+
+    def find_by_url(self, book_link: str) -> List[MirroredBook]:
+        rows = self._connection.execute(
+            f"SELECT {_BOOK_COLUMNS} FROM books WHERE canonical_url = ? ORDER BY created_time",
+            (canonicalize_url(book_link),),
+        ).fetchall()
+        return [_book(row) for row in rows]
+
+    def untitled(self, limit: int) -> List[MirroredBook]:
+        # 오픈그래프 태그 없이 만들어서 제목/표지를 채워야 하는 페이지.
+        # 고치지 못한 페이지(링크가 죽은 책 등) 는 재시도 시각까지 건너뛰고, 덜 시도한 페이지부터 고친다
+        rows = self._connection.execute(
+            f"SELECT {_BOOK_COLUMNS} FROM books LEFT JOIN page_repairs ON page_repairs.book_id = books.id"
+            " WHERE title = '' AND COALESCE(retry_at, 0) <= ?"
+            " ORDER BY COALESCE(attempts, 0), created_time LIMIT ?",
+            (time.time(), limit),
+        ).fetchall()
+        return [_book(row) for row in rows]
+
+    def repair_failed(self, book_id: str, base_delay: float, max_delay: float) -> None:
+        # 실패할 때마다 재시도 간격을 두 배로 늘린다 (max_delay 까지)
+        self._connection.execute(
+            "INSERT INTO page_repairs (book_id, attempts, retry_at) VALUES (?, 1, ?)"
+            " ON CONFLICT (book_id) DO UPDATE SET attempts = attempts + 1,"
+            " retry_at = ? + MIN(? * (1 << attempts), ?)",
+            (book_id, time.time() + base_delay, time.time(), base_delay, max_delay),
+        )
+
+    def cover_added(self, book_id: str) -> bool:
+        row = self._connection.execute("SELECT cover_added FROM page_repairs WHERE book_id = ?", (book_id,)).fetchone()
+        return bool(row and row[0])
+
+    def mark_cover_added(self, book_id: str) -> None:
+        self._connection.execute(
+            "INSERT INTO page_repairs (book_id, cover_added) VALUES (?, 1)"
+            " ON CONFLICT (book_id) DO UPDATE SET cover_added = 1",
+            (book_id,),
+        )
+
+    def repaired(self, book_id: str) -> None:
+        self._connection.execute("DELETE FROM page_repairs WHERE book_id = ?", (book_id,))
+
+    def cursor(self) -> Optional[str]:
+        row = self._connection.execute("SELECT value FROM sync_state WHERE key = ?", (SYNC_CURSOR,)).fetchone()
+        return row[0] if row else None
+
+    def _set_cursor(self, last_edited_time: str) -> None:
+        self._connection.execute(
+            "INSERT INTO sync_state (key, value) VALUES (?, ?)"
+            " ON CONFLICT (key) DO UPDATE SET value = excluded.value WHERE excluded.value > sync_state.value",
+            (SYNC_CURSOR, last_edited_time),
+        )
+
+    async def sync(self, client: NotionClient, full: bool = False) -> int:
+        started_at, cursor = time.time(), None if full else self.cursor()
+        query: dict = {
+            "page_size": self.page_size,
+            "sorts": [{"timestamp": "last_edited_time", "direction": "ascending"}],
+        }
+        if cursor is not None:
+            # 노션의 last_edited_time 은 분 단위로 잘려서 같은 시각의 페이지가 또 올 수 있지만, upsert 라 그대로 덮어쓴다
+            query["filter"] = {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": cursor}}
+
+        synced = 0
+        while True:
+            response = await client.query_database(self.database_id, query)
+            pages = response.get("results", [])
+            with self._transaction() as conn:
+                for page in pages:
+                    self._upsert(conn, page)
+                if pages:
+                    # 오래된 순으로 받으므로 중간에 실패해도 여기까지는 다시 받지 않는다
+                    self._set_cursor(pages[-1]["last_edited_time"])
+            synced += len(pages)
+
+            if not response.get("has_more"):
+                break
+            query["start_cursor"] = response["next_cursor"]
+
+        if full:
+            # 이번 동기화에서 보지 못한 페이지는 노션에서 지워진 것
+            with self._transaction() as conn:
+                for (id_,) in conn.execute("SELECT id FROM books WHERE synced_at < ?", (started_at,)).fetchall():
+                    self._remove(conn, id_)
+        return synced
+
+    def try_lease(self, seconds: float, name: str = SYNC_LEASE) -> bool:
+        # 여러 gunicorn 워커 중 하나만 주기적인 작업(동기화, 페이지 보수) 을 실행한다
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value FROM sync_state WHERE key = ?", (name,)).fetchone()
+            leased = row is None or float(row[0]) <= now
+            if leased:
+                conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (name, str(now + seconds)))
+        return leased
+
+    async def sync_periodically(self, client: NotionClient, interval: float) -> None:
+        while True:
+            try:
+                if self.try_lease(interval):
+                    synced = await self.sync(client)
+                    logger.info(f"synced {synced} pages from notion database {self.database_id}")
+            except Exception:
+                logger.exception("failed to sync notion mirror")
+            await asyncio.sleep(interval)
+
+
+notion_mirror = NotionMirror(path=settings.notion_mirror_path, database_id=settings.notion_database_id)
+
+
+async def main(full: bool) -> None:
+    try:
+        synced = await notion_mirror.sync(notion_client, full=full)
+    finally:
+        await http_clients.aclose()
+    print(f"synced {synced} pages, {notion_mirror.count()} books in {notion_mirror.path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="노션 추천 도서 데이터베이스를 로컬 사본으로 동기화")
+    parser.add_argument("--full", action="store_true", help="처음부터 다시 받고, 노션에서 지워진 페이지도 반영")
+    asyncio.run(main(parser.parse_args().full))
@@ -0,0 +1,94 @@
+import json
+import re
+from typing import Dict, Iterable, List, Optional
+
+from dtos.internal.book import Book
+from dtos.notion.book_submission import BookSubmission, BookSubmissionProperties
+from dtos.notion.database import Database
+from dtos.notion.image_block import Image, ImageBlock, ImageUrl
+from dtos.notion.text import BookUrl, Category, CategoryName, Content, Recommender, RecommendReason, TextContent, Title
+from dtos.opengraph import OpenGraph
+from bookstores import bookstores
+
+# 책마다 pydantic 모델 열댓 개를 만들고 model_dump 한 뒤 다시 JSON 으로 바꾸는 대신,
+# 노션 페이지 모양을 DTO 로 한 번만 만들어 JSON 조각으로 쪼개두고 책마다 바뀌는 값만 끼워 넣는다.
+# 결과는 DTO 를 model_dump(by_alias=True) 해서 httpx 가 보내던 json.dumps 결과와 바이트 단위로 같다 (tests/test_notion_payloads.py)
+
+
+def _hole(name: str) -> str:
+    # 설정값이나 실제 내용과 겹치지 않도록 JSON 에 그대로 쓸 수 없는 문자로 감싼다
+    return f"\x00{name}\x00"
+
+
+def dumps(value) -> bytes:
+    # httpx 의 json= 과 같은 인코딩
+    return json.dumps(value).encode("utf-8")
+
+
+class Template:
+    def __init__(self, skeleton: dict, holes: Iterable[str]):
+        encoded = {json.dumps(_hole(name)): name for name in holes}
+        parts = re.split("(" + "|".join(re.escape(hole) for hole in encoded) + ")", json.dumps(skeleton))
+        self._literals: List[bytes] = [part.encode("utf-8") for part in parts[::2]]
+        self._holes: List[str] = [encoded[part] for part in parts[1::2]]
+
+    def render(self, values: Dict[str, bytes]) -> bytes:
+        # values 는 이미 JSON 으로 인코딩된 값
+        chunks = [self._literals[0]]
+        for name, literal in zip(self._holes, self._literals[1:]):
+            chunks.append(values[name])
+            chunks.append(literal)
+        return b"".join(chunks)
+
+
+def _list(items: Iterable[bytes]) -> bytes:
+    return b"[" + b", ".join(items) + b"]"
+
+
+_TEXT = Template(TextContent(text=Content(content=_hole("content"))).model_dump(by_alias=True), ["content"])
+_CATEGORY = Template(CategoryName(name=_hole("name")).model_dump(by_alias=True), ["name"])
+_COVER = Template(ImageBlock(image=Image(external=ImageUrl(url=_hole("url")))).model_dump(by_alias=True), ["url"])
+
+
+def _page_skeleton() -> dict:
+    skeleton = BookSubmission(
+        parent=Database(),
+        properties=BookSubmissionProperties(
+            title=Title(title=[]),
+            URL=BookUrl(url=_hole("url")),
+            category=Category(multi_select=[]),
+            recommender=Recommender(rich_text=[TextContent(text=Content(content=_hole("recommender")))]),
+            recommend_reason=RecommendReason(rich_text=[TextContent(text=Content(content=_hole("recommend_reason")))]),
+        ),
+        children=[],
+    ).model_dump(by_alias=True)
+    # 개수가 바뀌는 목록은 목록 전체를 하나의 값으로 채운다
+    properties = skeleton["properties"]
+    properties["title"]["title"] = _hole("title")
+    properties["category"]["multi_select"] = _hole("categories")
+    skeleton["children"] = _hole("children")
+    return skeleton
+
+
+_PAGE = Template(_page_skeleton(), ["title", "url", "categories", "recommender", "recommend_reason", "children"])
+
+
+def _text(content: str) -> bytes:
+    return _TEXT.render({"content": dumps(content)})
+
+
+def book_page(book: Book, og: Optional[OpenGraph]) -> bytes:
+    # functions.create_book_page 가 만들던 노션 페이지. 오픈그래프 태그가 없으면 제목/표지 없이
+    return _PAGE.render(
+        {
+            "title": _list([_text(og.title)] if og else []),
+            "url": dumps(book.bookstore_url),
+            # 예전 메세지를 채워 넣을 때는 카테고리 목록에 없는 카테고리가 올 수 있다
+            "categories": _list(
+                _CATEGORY.render({"name": dumps(name)}) for name in (book.category, book.parent_category) if name
+            ),
+            "recommender": dumps(book.recommender),
+            "recommend_reason": dumps(book.recommend_reason),
+            "children": _list([_COVER.render({"url": dumps(bookstores.rewrite_cover(og.image.url))})] if og else []),
+        }
+    )
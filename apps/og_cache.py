@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import time
+from typing import Optional, Tuple
+
+from bookstores import canonicalize_url
+from dtos.opengraph import OpenGraph
+from settings import settings
+
+
+class OpenGraphCache:
+    def __init__(self, path: str, ttl: int, negative_ttl: int, max_entries: int):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = 0
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # gunicorn 워커들이 같은 파일을 쓰고 조회할 때마다 accessed_at 을 갱신하므로, 쓰는 동안에도 읽을 수 있게 WAL 을 쓴다
+            self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=5)
+            self._pid = os.getpid()
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS open_graph ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT,"
+                " expires_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS open_graph_accessed_at ON open_graph (accessed_at)")
+        return self._conn
+
+    # (캐시 적중 여부, OpenGraph) 를 반환. 적중했는데 OpenGraph 가 None 이면 최근에 조회에 실패한 링크
+    def get(self, book_link: str) -> Tuple[bool, Optional[OpenGraph]]:
+        key, now = canonicalize_url(book_link), time.time()
+        row = self._connection.execute(
+            "SELECT value FROM open_graph WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return False, None
+
+        self._connection.execute("UPDATE open_graph SET accessed_at = ? WHERE key = ?", (now, key))
+        if row[0] is None:
+            self.negative_hits += 1
+            return True, None
+
+        self.hits += 1
+        return True, OpenGraph.model_validate_json(row[0])
+
+    def set(self, book_link: str, og: OpenGraph) -> None:
+        self._put(canonicalize_url(book_link), og.model_dump_json(), self.ttl)
+
+    def set_failure(self, book_link: str) -> None:
+        self._put(canonicalize_url(book_link), None, self.negative_ttl)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "negative_hits": self.negative_hits, "misses": self.misses}
+
+    def _put(self, key: str, value: Optional[str], ttl: int) -> None:
+        now = time.time()
+        conn = self._connection
+        conn.execute(
+            "INSERT OR REPLACE INTO open_graph (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, value, now + ttl, now),
+        )
+        conn.execute("DELETE FROM open_graph WHERE expires_at <= ?", (now,))
+        overflow = conn.execute("SELECT COUNT(*) FROM open_graph").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            # 가장 오래 조회되지 않은 항목부터 제거 (LRU)
+            conn.execute(
+                "DELETE FROM open_graph WHERE key IN (SELECT key FROM open_graph ORDER BY accessed_at LIMIT ?)",
+                (overflow,),
+            )
+
+
+og_cache = OpenGraphCache(
+    path=settings.og_cache_path,
+    ttl=settings.og_cache_ttl,
+    negative_ttl=settings.og_cache_negative_ttl,
+    max_entries=settings.og_cache_max_entries,
+)
@@ -0,0 +1,110 @@
+import codecs
+import logging
+from html.parser import HTMLParser
+from http import HTTPStatus
+from typing import Dict, Optional
+from urllib.parse import urljoin
+
+import httpx
+
+from dtos.opengraph import OpenGraph, ImageUrl
+from bookstores import BookLink, bookstores, parse_book_link
+from http_clients import http_clients
+from metrics import errors, track_upstream
+from settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+OG_TITLE: str = "og:title"
+OG_IMAGE: str = "og:image"
+BOOKS_ISBN: str = "books:isbn"
+REQUEST_HEADERS: dict = {
+    "User-Agent": "Mozilla/5.0 (compatible; bookk-bookk; +https://github.com/bookk-bookk/bookk-bookk)",
+    "Accept": "text/html",
+}
+
+
+class OpenGraphHeadParser(HTMLParser):
+    # <head> 안의 og:title, og:image, books:isbn 만 필요하므로 모두 찾았거나 <head> 가 끝나면 더 읽지 않는다
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tags: Dict[str, str] = {}
+        self.head_closed = False
+
+    @property
+    def done(self) -> bool:
+        return self.head_closed or (OG_TITLE in self.tags and OG_IMAGE in self.tags and BOOKS_ISBN in self.tags)
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag == "body":
+            self.head_closed = True
+            return
+        if tag != "meta":
+            return
+
+        attributes = dict(attrs)
+        name, content = attributes.get("property") or attributes.get("name"), attributes.get("content")
+        if name in (OG_TITLE, OG_IMAGE, BOOKS_ISBN) and content and name not in self.tags:
+            self.tags[name] = content.strip()
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "head":
+            self.head_closed = True
+
+
+def _bookstore_link(book_link: str) -> Optional[BookLink]:
+    link = parse_book_link(book_link.strip())
+    return link if link is not None and bookstores.for_link(link) is not None else None
+
+
+def is_scrapable(book_link: str) -> bool:
+    return _bookstore_link(book_link) is not None
+
+
+async def scrape_open_graph(book_link: str) -> Optional[OpenGraph]:
+    link = _bookstore_link(book_link)
+    if link is None:
+        return None
+    # 스킴 없이 입력한 링크(ridibooks.com/books/1) 는 https 로 요청한다
+    url = book_link.strip() if link.scheme else f"https://{book_link.strip()}"
+
+    try:
+        with track_upstream("bookstore", link.host):
+            async with http_clients.get(url).stream(
+                "GET", url, headers=REQUEST_HEADERS, timeout=settings.og_scraper_timeout, follow_redirects=True
+            ) as response:
+                if response.status_code != HTTPStatus.OK:
+                    logger.warning(f"unexpected response while scraping {book_link}: {response.status_code}")
+                    errors.inc(source="bookstore", error=f"http_{response.status_code}")
+                    return None
+                parser = await _parse_head(response)
+                page_url = str(response.url)
+    except httpx.HTTPError as e:
+        logger.warning(f"failed to scrape opengraph tags of {book_link}: {e!r}")
+        return None
+
+    if OG_TITLE not in parser.tags or OG_IMAGE not in parser.tags:
+        return None
+    # //img.ridicdn.net/... 처럼 스킴이나 호스트가 생략된 이미지 주소도 있음
+    return OpenGraph(
+        title=parser.tags[OG_TITLE],
+        image=ImageUrl(url=urljoin(page_url, parser.tags[OG_IMAGE])),
+        isbn=parser.tags.get(BOOKS_ISBN),
+    )
+
+
+async def _parse_head(response: httpx.Response) -> OpenGraphHeadParser:
+    parser = OpenGraphHeadParser()
+    try:
+        decoder = codecs.getincrementaldecoder(response.charset_encoding or "utf-8")(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    received = 0
+    # 필요한 태그를 찾으면 나머지 본문은 받지 않고 스트림을 닫는다
+    async for chunk in response.aiter_bytes():
+        received += len(chunk)
+        parser.feed(decoder.decode(chunk))
+        if parser.done or received >= settings.og_scraper_max_bytes:
+            break
+    return parser
@@ -0,0 +1,215 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from metrics import outbox_jobs
+from settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[dict], Awaitable[bool]]
+Job = Tuple[int, str, str, int]
+
+
+class Outbox:
+    # 노션 아카이빙처럼 응답 이후에 처리해도 되는 작업을 SQLite 에 먼저 기록해두고 별도 컨슈머가 처리한다.
+    # 여러 gunicorn 워커가 같은 파일을 공유하므로 작업은 lease 를 잡은 워커 하나만 처리한다.
+    def __init__(
+        self,
+        path: str,
+        concurrency: int,
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+        lease: float,
+        poll_interval: float,
+    ):
+        self.path = path
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease = lease
+        self.poll_interval = poll_interval
+
+        self._handlers: Dict[str, Handler] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._in_flight: Set[asyncio.Task] = set()
+        self._draining = False
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " kind TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " available_at REAL NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_error TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_available_at ON jobs (available_at)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS dead_letters ("
+                " id INTEGER PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " failed_at REAL NOT NULL,"
+                " last_error TEXT)"
+            )
+        return self._conn
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self._handlers[kind] = handler
+
+    def enqueue(self, kind: str, payload: dict) -> int:
+        now = time.time()
+        cursor = self._connection.execute(
+            "INSERT INTO jobs (kind, payload, available_at, created_at) VALUES (?, ?, ?, ?)",
+            (kind, json.dumps(payload, ensure_ascii=False), now, now),
+        )
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return cursor.lastrowid
+
+    def depth(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def dead_letter_count(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM dead_letters").fetchone()[0]
+
+    def dead_letters(self) -> List[dict]:
+        rows = self._connection.execute(
+            "SELECT id, kind, payload, attempts, last_error FROM dead_letters ORDER BY failed_at"
+        ).fetchall()
+        return [
+            {"id": id_, "kind": kind, "payload": json.loads(payload), "attempts": attempts, "last_error": last_error}
+            for id_, kind, payload, attempts, last_error in rows
+        ]
+
+    def start(self) -> None:
+        self._draining = False
+        self._wakeup = asyncio.Event()
+        self._consumer = asyncio.create_task(self._consume())
+
+    async def stop(self, timeout: float) -> None:
+        # 새 작업은 더 받지 않고, 지금 처리 가능한 작업을 모두 끝낸 뒤 종료 (timeout 이 지나면 남은 작업은 다음 기동 때 처리)
+        if self._consumer is None:
+            return
+        self._draining = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._consumer, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"outbox was not drained within {timeout}s, {self.depth()} jobs left")
+        self._consumer = None
+
+    async def drain(self) -> None:
+        self._draining = True
+        self._wakeup = asyncio.Event()
+        await self._consume()
+
+    async def _consume(self) -> None:
+        while True:
+            self._wakeup.clear()
+            slots = self.concurrency - len(self._in_flight)
+            jobs = self._claim(slots) if slots > 0 else []
+            for job in jobs:
+                task = asyncio.create_task(self._process(job))
+                self._in_flight.add(task)
+                task.add_done_callback(self._on_done)
+
+            if self._draining and not jobs and not self._in_flight:
+                return
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        self._in_flight.discard(task)
+        self._wakeup.set()
+
+    def _claim(self, limit: int) -> List[Job]:
+        now = time.time()
+        conn = self._connection
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            jobs = conn.execute(
+                "SELECT id, kind, payload, attempts FROM jobs WHERE available_at <= ? ORDER BY available_at LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET available_at = ? WHERE id = ?", [(now + self.lease, job[0]) for job in jobs]
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        return jobs
+
+    async def _process(self, job: Job) -> None:
+        job_id, kind, payload, attempts = job
+        error = None
+        try:
+            succeeded = await self._handlers[kind](json.loads(payload))
+        except Exception as e:
+            logger.exception(f"outbox job {job_id} ({kind}) raised")
+            succeeded, error = False, repr(e)
+
+        if succeeded:
+            self._connection.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            outbox_jobs.inc(kind=kind, result="done")
+        else:
+            self._retry_or_bury(job_id, kind, attempts + 1, error)
+
+    def _retry_or_bury(self, job_id: int, kind: str, attempts: int, error: Optional[str]) -> None:
+        now = time.time()
+        conn = self._connection
+        if attempts < self.max_attempts:
+            # exponential backoff + jitter: 여러 작업이 같은 시각에 한꺼번에 재시도하지 않도록 분산
+            delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+            conn.execute(
+                "UPDATE jobs SET attempts = ?, available_at = ?, last_error = ? WHERE id = ?",
+                (attempts, now + random.uniform(delay / 2, delay), error, job_id),
+            )
+            outbox_jobs.inc(kind=kind, result="retry")
+            return
+
+        logger.error(f"outbox job {job_id} moved to dead letters after {attempts} attempts")
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "INSERT INTO dead_letters (id, kind, payload, attempts, created_at, failed_at, last_error)"
+            " SELECT id, kind, payload, ?, created_at, ?, ? FROM jobs WHERE id = ?",
+            (attempts, now, error, job_id),
+        )
+        conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        conn.execute("COMMIT")
+        outbox_jobs.inc(kind=kind, result="dead")
+
+
+outbox = Outbox(
+    path=settings.outbox_path,
+    concurrency=settings.outbox_concurrency,
+    max_attempts=settings.outbox_max_attempts,
+    base_delay=settings.outbox_base_delay,
+    max_delay=settings.outbox_max_delay,
+    lease=settings.outbox_lease,
+    poll_interval=settings.outbox_poll_interval,
+)
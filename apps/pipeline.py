@@ -0,0 +1,53 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Optional, Set, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def run_in_background(awaitable: Awaitable[T]) -> "asyncio.Future[T]":
+    # 이벤트 루프는 태스크를 약한 참조로만 들고 있으므로, 끝날 때까지 참조를 유지해야 중간에 GC 되지 않는다
+    task = asyncio.ensure_future(awaitable)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    task.add_done_callback(_log_exception)
+    return task
+
+
+def _log_exception(task: asyncio.Future) -> None:
+    # 아무도 결과를 기다리지 않는 태스크의 예외는 asyncio 가 GC 될 때에야 "never retrieved" 로만 남긴다
+    if task.cancelled() or task.exception() is None:
+        return
+    logger.error(f"background task {task!r} failed", exc_info=task.exception())
+
+
+def pending_background_tasks() -> int:
+    return len(_background_tasks)
+
+
+async def wait_background_tasks(timeout: float) -> None:
+    if not _background_tasks:
+        return
+    _, pending = await asyncio.wait(set(_background_tasks), timeout=timeout)
+    if pending:
+        logger.warning(f"{len(pending)} background tasks did not finish within {timeout}s")
+
+
+class Deadline:
+    # 요청 전체에 주어진 시간(budget) 안에서 각 단계가 쓸 수 있는 시간을 나눠준다
+    def __init__(self, budget: float):
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    async def run(self, awaitable: Awaitable[T], budget: Optional[float] = None) -> T:
+        # 기한을 넘기면 asyncio.TimeoutError 를 던지지만, 단계 자체는 취소하지 않고 백그라운드에서 마저 진행
+        timeout = self.remaining() if budget is None else min(budget, self.remaining())
+        return await asyncio.wait_for(asyncio.shield(run_in_background(awaitable)), timeout)
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from shared_cache import SharedCache
+from slack_api import SlackApi
+
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX: str = "profile:"
+PREWARM_LEASE: str = "lease:profile_prewarm"
+
+
+class ProfileCache:
+    # 추천인 이름(real_name)만 필요하므로 user id -> real_name 만 보관. 워커들이 같은 캐시를 쓴다
+    def __init__(self, slack: SlackApi, cache: SharedCache, ttl: float, page_size: int = 200):
+        self.slack = slack
+        self.cache = cache
+        self.ttl = ttl
+        self.page_size = page_size
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str) -> Optional[str]:
+        real_name = self.cache.get(KEY_PREFIX + user_id)
+        if real_name is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return real_name
+
+    def set(self, user_id: str, real_name: str) -> None:
+        self.cache.set(KEY_PREFIX + user_id, real_name, ttl=self.ttl)
+
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        if user_id is None:
+            self.cache.clear(KEY_PREFIX)
+        else:
+            self.cache.delete(KEY_PREFIX + user_id)
+
+    async def get_real_name(self, user_id: str) -> str:
+        real_name = self.get(user_id)
+        if real_name is not None:
+            return real_name
+
+        response = await self.slack.users_profile_get(user=user_id)
+        self.set(user_id, response.profile.real_name)
+        return response.profile.real_name
+
+    async def prewarm(self) -> int:
+        # users.list 를 커서 기반으로 끝까지 순회하며 워크스페이스 멤버 이름을 채워둔다
+        cursor, count = None, 0
+        while True:
+            params = {"limit": self.page_size}
+            if cursor:
+                params["cursor"] = cursor
+            response = await self.slack.users_list(**params)
+            names = {
+                KEY_PREFIX + member.id: member.profile.real_name
+                for member in response.members
+                if not member.deleted and member.profile.real_name
+            }
+            # 한 페이지씩 한 트랜잭션으로
+            self.cache.set_many(names, ttl=self.ttl)
+            count += len(names)
+
+            cursor = response.response_metadata.next_cursor
+            if not cursor:
+                return count
+
+    async def prewarm_periodically(self, interval: float) -> None:
+        while True:
+            try:
+                # 캐시를 워커들이 함께 쓰므로 주기마다 한 워커만 채운다
+                if self.cache.add(PREWARM_LEASE, os.getpid(), ttl=interval):
+                    count = await self.prewarm()
+                    logger.info(f"prewarmed {count} slack user profiles")
+            except Exception as e:
+                logger.error(f"failed to prewarm slack user profiles: {e!r}")
+            await asyncio.sleep(interval)
@@ -0,0 +1,87 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque
+
+
+# asyncio.Lock/Condition 은 파이썬 3.9 에서 생성 시점의 이벤트 루프에 묶이므로, 모듈 전역에서 만들어도 안전하도록
+# 대기가 필요할 때만 실행 중인 루프에서 Future 를 만든다
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        # 업스트림이 Retry-After 로 알려준 시간 동안은 모든 요청을 멈춘다
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        # 멈춘 시간이 끝나면 한 번은 바로 보내고, 그 뒤로는 다시 rate 에 맞춘다
+        # (분당 몇 번뿐인 슬랙 tier 에서는 한 칸이 차기까지 몇 초씩 걸린다)
+        self.tokens = 1
+        self.updated_at = self.paused_until
+
+
+class AdaptiveConcurrencyLimit:
+    # AIMD: 빠르게 성공하면 동시 요청 수를 조금씩 늘리고, 느려지거나 429 를 받으면 크게 줄인다
+    def __init__(self, initial: int, minimum: int, maximum: int, latency_target: float):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> None:
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif not waiter.cancelled():
+                    # 깨워진 직후 취소되었다면 차례를 다음 대기자에게 넘긴다
+                    self._wake_waiters()
+                raise
+        self.in_flight += 1
+
+    def release(self, latency: float, throttled: bool = False) -> None:
+        if throttled:
+            self.limit = max(self.minimum, self.limit / 2)
+        elif latency > self.latency_target:
+            self.limit = max(self.minimum, self.limit * 0.9)
+        else:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+        self.in_flight -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        for _ in range(int(self.limit) - self.in_flight):
+            if not self._waiters:
+                break
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
@@ -0,0 +1,79 @@
+import re
+import sqlite3
+import unicodedata
+from typing import Iterable, List, Set
+
+
+# 아카이빙된 추천 도서(제목, 추천인, 카테고리, 추천이유) 의 검색 색인.
+# 한국어는 띄어쓰기/조사 때문에 단어 단위로 자르면 "추월차선" 으로 "부의 추월차선을" 을 찾지 못하므로,
+# 단어마다 글자 두 개씩(bigram) 잘라서 색인하고, 검색어의 bigram 을 모두 가진 문서 중 검색어가 실제로 들어 있는 문서만 고른다.
+# 색인은 notion_mirror 와 같은 SQLite 파일에 있고, 노션 사본이 바뀔 때마다 (동기화, write-through) 같은 트랜잭션에서 갱신한다.
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    # 전각/반각, 대소문자 차이를 없앤다
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def words(text: str) -> List[str]:
+    return _WORD.findall(normalize(text))
+
+
+def bigrams(words_: Iterable[str]) -> Set[str]:
+    # 한 글자 단어는 색인하지 않는다 (검색할 때는 본문에서 직접 찾음)
+    return {first + second for word in words_ for first, second in zip(word, word[1:])}
+
+
+def create_tables(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS search_documents (book_id TEXT PRIMARY KEY, title TEXT NOT NULL, text TEXT NOT NULL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS search_terms (term TEXT NOT NULL, book_id TEXT NOT NULL,"
+        " PRIMARY KEY (term, book_id)) WITHOUT ROWID"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS search_terms_book_id ON search_terms (book_id)")
+
+
+def index_document(conn: sqlite3.Connection, book_id: str, title: str, fields: Iterable[str]) -> None:
+    title, text = normalize(title), normalize("\n".join((title, *fields)))
+    remove_document(conn, book_id)
+    conn.execute("INSERT INTO search_documents (book_id, title, text) VALUES (?, ?, ?)", (book_id, title, text))
+    conn.executemany(
+        "INSERT INTO search_terms (term, book_id) VALUES (?, ?)",
+        ((term, book_id) for term in bigrams(_WORD.findall(text))),
+    )
+
+
+def remove_document(conn: sqlite3.Connection, book_id: str) -> None:
+    conn.execute("DELETE FROM search_documents WHERE book_id = ?", (book_id,))
+    conn.execute("DELETE FROM search_terms WHERE book_id = ?", (book_id,))
+
+
+def search(conn: sqlite3.Connection, query: str, limit: int) -> List[str]:
+    # 검색어의 모든 단어가 들어 있는 문서의 id 를, 제목에 들어 있는 단어가 많은 순 -> 최근 추천 순으로 반환
+    query_words = sorted(set(words(query)))
+    if not query_words:
+        return []
+
+    terms = sorted(bigrams(query_words))
+    contains = " AND ".join("instr(d.text, ?) > 0" for _ in query_words)
+    in_title = " + ".join("(instr(d.title, ?) > 0)" for _ in query_words)
+    if terms:
+        candidates = (
+            "d.book_id IN (SELECT book_id FROM search_terms WHERE term IN"
+            f" ({', '.join('?' for _ in terms)}) GROUP BY book_id HAVING COUNT(*) = ?) AND "
+        )
+        params = [*terms, len(terms)]
+    else:
+        # 한 글자 검색어만 있으면 색인을 쓸 수 없어 본문을 훑는다 (수만 건이어도 수 ms)
+        candidates, params = "", []
+
+    rows = conn.execute(
+        f"SELECT d.book_id FROM search_documents d JOIN books b ON b.id = d.book_id"
+        f" WHERE {candidates}{contains} ORDER BY {in_title} DESC, b.created_time DESC LIMIT ?",
+        (*params, *query_words, *query_words, limit),
+    ).fetchall()
+    return [row[0] for row in rows]
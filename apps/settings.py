@@ -1,20 +1,136 @@
 import os
+from typing import Optional
 
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
 
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
 class Settings(BaseSettings):
     slack_api_token: str = os.getenv("SLACK_API_TOKEN")
     og_app_id: str = os.getenv("OG_APP_ID")
     books_channel: str = os.getenv("BOOKS_CHANNEL")
 
+    # 부하 테스트(benchmarks/bench_load.py) 에서는 로컬 가짜 서버 주소로 바꿔서 실행
+    slack_api_base_url: str = "https://www.slack.com/api/"
+    notion_api_base_url: str = "https://api.notion.com"
+    og_api_base_url: str = "https://opengraph.io"
+
     notion_secret_key: str = os.getenv("NOTION_SECRET_KEY")
     notion_database_id: str = os.getenv("NOTION_DATABASE_ID")
+    # 노션 API 제한은 integration 당 평균 초당 3회이고, gunicorn 워커 4개가 나눠 쓴다
+    notion_rate_limit: float = 3 / 4
+    notion_rate_burst: float = 3
+    notion_max_concurrency: int = 3
+    # 응답이 이보다 느려지면 동시 요청 수를 줄인다
+    notion_latency_target: float = 2
+    notion_max_retries: int = 3
+
+    # 노션 데이터베이스의 로컬 사본 (조회용)
+    notion_mirror_path: str = os.path.join(BASE_DIR, ".data", "notion_mirror.sqlite3")
+    notion_mirror_sync_interval: float = 60 * 10
+    search_result_limit: int = 10
+    # 같은 책의 노션 페이지를 만드는 워커가 이 시간 안에 끝내지 못하면 다른 워커가 대신 만든다
+    book_claim_lease: float = 60 * 5
+
+    og_api_timeout: float = 10
+
+    # 업스트림(opengraph.io, 노션) 별 서킷 브레이커. 최근 호출 중 실패 비율이 이 이상이면 한동안 호출하지 않고 바로 실패
+    circuit_failure_threshold: float = 0.5
+    circuit_window: int = 20
+    circuit_minimum_calls: int = 5
+    circuit_open_duration: float = 30
+    circuit_half_open_probes: int = 1
+    # 오픈그래프 태그 없이 만든 노션 페이지에 제목/표지를 채우는 주기
+    page_repair_interval: float = 60 * 5
+    page_repair_batch: int = 20
+    # 고치지 못한 페이지는 page_repair_interval 부터 두 배씩 늘려서 이 간격까지 기다렸다가 다시 시도한다
+    page_repair_max_delay: float = 60 * 60 * 24
+
+    og_cache_path: str = os.path.join(BASE_DIR, ".cache", "opengraph.sqlite3")
+    og_cache_ttl: int = 60 * 60 * 24 * 30
+    og_cache_negative_ttl: int = 60 * 10
+    og_cache_max_entries: int = 10000
+
+    # 서점 페이지에서 직접 오픈그래프 태그를 읽고, 실패했을 때만 opengraph.io 를 사용
+    og_scraper_enabled: bool = True
+    og_scraper_timeout: float = 5
+    og_scraper_max_bytes: int = 256 * 1024
+    # 오픈그래프 조회가 최근 지연시간의 이 분위수 안에 끝나지 않으면 다른 경로(서점 페이지가 느리면 opengraph.io,
+    # opengraph.io 가 느리면 opengraph.io 재요청) 로 한 번 더 보내고 먼저 온 결과를 쓴다
+    og_hedge_percentile: float = 0.95
+    og_hedge_window: int = 200
+    og_hedge_min_samples: int = 20
+    og_hedge_initial_delay: float = 2
+    og_hedge_min_delay: float = 0.3
+    # 추가 요청은 조회 수의 이 비율까지만 보낸다 (0 이면 끔)
+    og_hedge_max_ratio: float = 0.1
+    og_hedge_burst: float = 2
+
+    http_max_connections_per_host: int = 20
+    http_max_keepalive_connections_per_host: int = 10
+    http_keepalive_expiry: float = 60
+    # HTTP/2 를 사용하려면 h2 패키지가 필요 (pip install httpx[http2])
+    http2_enabled: bool = False
+    http_prewarm_connections_per_host: int = 2
+    http_prewarm_timeout: float = 3
+
+    # 슬랙 Web API 의 메소드별 rate limit 중 이 프로세스가 쓰는 몫 (gunicorn 워커 4개가 나눠 쓴다)
+    slack_rate_share: float = 1 / 4
+    slack_max_retries: int = 3
+
+    # 슬랙 인터랙션 응답 기한(3초) 에서 네트워크 왕복 시간을 뺀 값
+    submit_book_budget: float = 2.5
+    profile_lookup_budget: float = 1
+    # 켜면 submit_book 은 검증만 하고 바로 응답하고, 채널 메세지는 응답 뒤에 보낸다 (실패하면 추천한 사람에게만 알림)
+    submit_book_deferred_reply: bool = False
+
+    # 같은 인터랙션(슬랙 재전송, 두 번 누른 제출) 을 한 번만 처리하기 위한 기록
+    idempotency_path: str = os.path.join(BASE_DIR, ".data", "idempotency.sqlite3")
+    idempotency_ttl: float = 60 * 60
+    # 처리 중인 요청이 이 시간 안에 끝나지 않으면 (워커 재시작 등) 같은 요청을 다시 처리한다
+    idempotency_lease: float = 60
+    idempotency_poll_interval: float = 0.05
+
+    # 워커들이 함께 쓰는 캐시 (슬랙 프로필 등)
+    shared_cache_path: str = os.path.join(BASE_DIR, ".cache", "shared.sqlite3")
+    profile_cache_ttl: float = 60 * 60 * 6
+    profile_prewarm_interval: float = 60 * 60
+
+    outbox_path: str = os.path.join(BASE_DIR, ".data", "outbox.sqlite3")
+    # 워커 하나가 동시에 처리하는 작업 수
+    outbox_concurrency: int = 4
+    outbox_max_attempts: int = 8
+    outbox_base_delay: float = 30
+    outbox_max_delay: float = 60 * 60
+    # 작업을 가져간 워커가 이 시간 안에 끝내지 못하면 (워커 재시작 등) 다른 워커가 다시 처리
+    outbox_lease: float = 60 * 5
+    outbox_poll_interval: float = 5
+    outbox_drain_timeout: float = 25
+
+    # 채널의 예전 메세지를 노션에 채워 넣는 backfill.py 의 진행 상황
+    backfill_path: str = os.path.join(BASE_DIR, ".data", "backfill.sqlite3")
+    backfill_concurrency: int = 3
+
+    # 도서 카테고리 JSON 파일. 없으면 enums.BookCategories 를 사용하고, 파일이 바뀌면 재시작 없이 다시 읽는다
+    book_categories_path: Optional[str] = None
+    book_categories_reload_interval: float = 10
+
+    # gunicorn 워커들이 메트릭 스냅샷을 공유하는 디렉토리 (마스터가 뜰 때 비움)
+    metrics_dir: str = os.path.join(BASE_DIR, ".data", "metrics")
+    metrics_flush_interval: float = 5
+
+    # 설정하면 /debug 엔드포인트(프로파일링, 느린 콜백, 힙) 를 켠다. Authorization: Bearer <debug_token> 로 호출
+    debug_token: Optional[str] = os.getenv("DEBUG_TOKEN")
+    # 이벤트 루프가 이 시간 이상 멈추면 그때 실행 중이던 스택을 기록한다
+    debug_slow_callback_threshold: float = 0.1
+    debug_monitor_interval: float = 0.5
 
 
 if os.getenv("BOOKK_ENV") != "test":
-    env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+    env_path = os.path.join(BASE_DIR, ".env")
     load_dotenv(dotenv_path=env_path)
 
 settings = Settings()
@@ -0,0 +1,94 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from settings import settings
+
+
+# 같은 서버의 gunicorn 워커(와 backfill.py 같은 다른 프로세스) 가 함께 쓰는 캐시.
+# 워커마다 따로 캐시하면 같은 내용을 네 번 조회하고 네 번 들고 있게 되므로, 로컬 SQLite 파일 하나에 모은다.
+# - 값은 JSON 으로 저장하고, 만료 시각은 프로세스끼리 비교할 수 있도록 벽시계(time.time) 기준
+# - 파일은 mmap 으로 읽으므로 워커들이 OS 페이지 캐시의 같은 페이지를 공유한다
+# - preload_app 으로 마스터에서 모듈을 읽은 뒤 fork 해도 되도록 연결은 프로세스마다 따로 연다
+
+MMAP_SIZE: int = 64 * 1024 * 1024
+
+
+class SharedCache:
+    def __init__(self, path: str):
+        self.path = path
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = 0
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            # fork 전에 연 연결은 자식 프로세스에서 쓰면 안 된다 (닫지도 않고 버린다)
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=5)
+            self._pid = os.getpid()
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+        return self._conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connection
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._connection.execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, items: Dict[str, Any], ttl: float) -> None:
+        # 한 트랜잭션으로 쓰므로 다른 워커는 전부 바뀌기 전이나 후만 본다
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                [(key, json.dumps(value), now + ttl) for key, value in items.items()],
+            )
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+
+    def add(self, key: str, value: Any, ttl: float) -> bool:
+        # 키가 없거나 만료되었을 때만 쓴다. 여러 워커 중 하나만 실행할 작업의 lease 로도 쓴다
+        now = time.time()
+        cursor = self._connection.execute(
+            "INSERT INTO cache (key, value, expires_at) VALUES (?, ?, ?)"
+            " ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at"
+            " WHERE cache.expires_at <= ?",
+            (key, json.dumps(value), now + ttl, now),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key: str) -> None:
+        self._connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self, prefix: str = "") -> None:
+        self._connection.execute("DELETE FROM cache WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+
+shared_cache = SharedCache(path=settings.shared_cache_path)
@@ -0,0 +1,159 @@
+import logging
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional, Type, TypeVar
+
+import aiohttp
+from slack import WebClient
+from slack.errors import SlackApiError
+from slack.web.slack_response import SlackResponse
+
+from dtos.slack.api_repsponse import (
+    CommonResponse,
+    ConversationsHistoryResponse,
+    UserProfileResponse,
+    UsersListResponse,
+)
+from metrics import errors, track_upstream
+from ratelimit import TokenBucket
+
+
+logger = logging.getLogger(__name__)
+
+# 슬랙 Web API 호출을 메소드별 rate limit tier 에 맞춰 줄 세우고, ratelimited 응답을 받으면 Retry-After 만큼 쉬었다 다시 보낸다.
+# 한도를 넘는 버스트(백필, 추천이 몰리는 날) 는 실패하지 않고 기다리게 된다.
+# https://api.slack.com/apis/rate-limits
+
+R = TypeVar("R", bound=CommonResponse)
+
+
+class Limit(NamedTuple):
+    per_minute: float
+    burst: float
+    # chat.postMessage 처럼 채널마다 따로 세는 메소드
+    per_channel: bool = False
+
+
+TIER_1 = Limit(per_minute=1, burst=1)
+TIER_2 = Limit(per_minute=20, burst=3)
+TIER_3 = Limit(per_minute=50, burst=5)
+TIER_4 = Limit(per_minute=100, burst=10)
+# chat.postMessage 는 tier 가 아니라 채널마다 초당 1회 (짧은 버스트는 허용)
+POST_MESSAGE = Limit(per_minute=60, burst=3, per_channel=True)
+
+METHOD_LIMITS: Dict[str, Limit] = {
+    "dialog.open": TIER_4,
+    "users.profile.get": TIER_4,
+    "users.list": TIER_2,
+    "conversations.history": TIER_3,
+    "chat.postMessage": POST_MESSAGE,
+    "chat.postEphemeral": TIER_4,
+}
+DEFAULT_RETRY_AFTER: float = 1
+
+
+def _is_ratelimited(response: SlackResponse) -> bool:
+    return response.status_code == 429 or response.data.get("error") == "ratelimited"
+
+
+def _retry_after(response: SlackResponse) -> float:
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+
+class SlackApi:
+    def __init__(
+        self,
+        client: WebClient,
+        rate_share: float = 1,
+        max_retries: int = 3,
+        limits: Dict[str, Limit] = METHOD_LIMITS,
+    ):
+        # rate_share: 한 워크스페이스의 한도를 여러 프로세스(gunicorn 워커) 가 나눠 쓸 때 이 프로세스의 몫
+        self.client = client
+        self.rate_share = rate_share
+        self.max_retries = max_retries
+        self.limits = limits
+
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    async def open_dialog(self, body: bytes, headers: dict) -> CommonResponse:
+        # 요청 본문(trigger_id 와 카테고리 목록이 담긴 다이얼로그) 은 taxonomy.dialog_request 가 미리 JSON 으로 만들어둔다
+        return await self.call("dialog.open", lambda: self.client.api_call("dialog.open", data=body, headers=headers))
+
+    async def users_profile_get(self, user: str) -> UserProfileResponse:
+        return await self.call(
+            "users.profile.get", lambda: self.client.users_profile_get(user=user), response_type=UserProfileResponse
+        )
+
+    async def users_list(self, **params) -> UsersListResponse:
+        return await self.call("users.list", lambda: self.client.users_list(**params), response_type=UsersListResponse)
+
+    async def conversations_history(self, channel: str, **params) -> ConversationsHistoryResponse:
+        return await self.call(
+            "conversations.history",
+            lambda: self.client.conversations_history(channel=channel, **params),
+            response_type=ConversationsHistoryResponse,
+        )
+
+    async def chat_post_message(self, channel: str, text: str) -> CommonResponse:
+        return await self.call(
+            "chat.postMessage", lambda: self.client.chat_postMessage(channel=channel, text=text), channel=channel
+        )
+
+    async def chat_post_ephemeral(self, channel: str, user: str, text: str) -> CommonResponse:
+        return await self.call(
+            "chat.postEphemeral", lambda: self.client.chat_postEphemeral(channel=channel, user=user, text=text)
+        )
+
+    async def call(
+        self,
+        method: str,
+        send: Callable[[], Awaitable[SlackResponse]],
+        response_type: Type[R] = CommonResponse,
+        channel: Optional[str] = None,
+    ) -> R:
+        # ok=False 응답은 CommonResponse 로 받는 호출(메세지 전송 등) 이면 그대로 돌려주고,
+        # 데이터가 필요한 호출이면 SlackApiError 를 던진다
+        bucket = self._bucket(method, channel)
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            try:
+                with track_upstream("slack", method):
+                    response = await send()
+            except SlackApiError as e:
+                # WebClient 는 ok=False 응답을 예외로 던진다
+                response = e.response
+            if not _is_ratelimited(response) or attempt == self.max_retries:
+                break
+
+            delay = _retry_after(response)
+            errors.inc(source="slack", error="ratelimited")
+            logger.warning(f"{method} is rate limited, retrying in {delay}s")
+            # 같은 메소드(채널) 를 기다리는 다른 호출도 함께 멈춘다
+            bucket.pause(delay)
+
+        if not response.data.get("ok") and response_type is not CommonResponse:
+            raise SlackApiError(f"{method} failed: {response.data.get('error')}", response)
+        return response_type.model_validate(response.data)
+
+    async def open_session(self) -> None:
+        # WebClient 는 세션을 주지 않으면 호출마다 aiohttp 세션(과 커넥션) 을 새로 만든다
+        if self.client.session is None or self.client.session.closed:
+            self.client.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.client.timeout))
+
+    async def aclose(self) -> None:
+        session, self.client.session = self.client.session, None
+        if session is not None:
+            await session.close()
+
+    def _bucket(self, method: str, channel: Optional[str]) -> TokenBucket:
+        limit = self.limits.get(method, TIER_3)
+        key = f"{method}:{channel}" if limit.per_channel and channel else method
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            # 지속 속도만 나눠 갖고, 슬랙이 짧게 허용하는 버스트는 프로세스마다 그대로 둔다
+            bucket = self._buckets[key] = TokenBucket(
+                rate=limit.per_minute / 60 * self.rate_share, capacity=limit.burst
+            )
+        return bucket
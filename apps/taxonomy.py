@@ -0,0 +1,138 @@
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from dtos.slack.dialog import Dialog, DialogElement, DialogOption, DialogOptionGroup
+from enums import BookCategories
+from settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+# 도서 카테고리(상위 카테고리 -> 하위 카테고리들) 와, 그걸로 만드는 /book 다이얼로그를 워커가 뜰 때 한 번만 만들어둔다.
+# 요청마다 바뀌는 건 trigger_id, callback_id 뿐이라 미리 직렬화한 다이얼로그 바이트에 이 둘만 끼워서 보낸다.
+
+Categories = List[Tuple[str, Tuple[str, ...]]]
+
+JSON_CONTENT_TYPE: str = "application/json;charset=utf-8"
+DIALOG_TITLE: str = "책을 공유해주세요."
+
+
+def default_categories() -> Categories:
+    return [category.value for category in BookCategories]
+
+
+def load_categories(path: str) -> Categories:
+    # {"경영/경제": ["경영일반", "경제일반", ...], ...} 형식의 JSON 파일
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not data:
+        raise ValueError("categories must be a non-empty object")
+    categories = []
+    for main, subs in data.items():
+        if not isinstance(subs, list) or not subs or not all(isinstance(sub, str) for sub in subs):
+            raise ValueError(f"sub categories of {main} must be a non-empty list of strings")
+        categories.append((main, tuple(subs)))
+    return categories
+
+
+def build_dialog(categories: Categories, callback_id: str) -> Dialog:
+    return Dialog(
+        title=DIALOG_TITLE,
+        callback_id=callback_id,
+        elements=[
+            DialogElement(
+                label="카테고리",
+                name="category",
+                type="select",
+                option_groups=[
+                    DialogOptionGroup(label=main, options=[DialogOption(label=sub, value=sub) for sub in subs])
+                    for main, subs in categories
+                ],
+            ),
+            DialogElement(label="도서링크", name="bookstore_url", type="text", subtype="url"),
+            DialogElement(label="추천이유", name="recommend_reason", type="textarea"),
+        ],
+    )
+
+
+def _json_string(value: str) -> bytes:
+    return json.dumps(value, ensure_ascii=False).encode()
+
+
+class Taxonomy:
+    def __init__(self, categories: Categories, path: Optional[str] = None, reload_interval: float = 0):
+        # path 가 있으면 그 파일을 읽고, 파일이 바뀌면 재시작 없이 다시 읽는다 (워커마다 reload_interval 마다 확인)
+        self.path = path
+        self.reload_interval = reload_interval
+        self._mtime: Optional[int] = None
+        self._checked_at = float("-inf")
+        self._build(categories)
+        self.reload_if_changed()
+
+    def _build(self, categories: Categories) -> None:
+        parents: Dict[str, str] = {}
+        for main, subs in categories:
+            for sub in subs:
+                # 여러 상위 카테고리에 같은 이름이 있으면 먼저 나온 쪽을 사용
+                parents.setdefault(sub, main)
+
+        dialog = build_dialog(categories, callback_id="").model_dump()
+        del dialog["callback_id"]
+        # 맨 앞의 { 를 뺀 나머지. 요청마다 {"callback_id":...,  뒤에 그대로 붙인다
+        dialog_tail = json.dumps(dialog, ensure_ascii=False, separators=(",", ":")).encode()[1:]
+
+        # 요청 처리 중에 반쯤 바뀐 상태를 보지 않도록 다 만든 다음 한 번에 바꾼다
+        self.categories, self._parents, self._dialog_tail = categories, parents, dialog_tail
+
+    def reload_if_changed(self) -> bool:
+        if self.path is None:
+            return False
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return False
+        self._checked_at = now
+
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        # 잘못된 파일이면 기존 카테고리를 계속 쓰고, 파일이 다시 바뀔 때까지 같은 파일을 다시 읽지 않는다
+        self._mtime = mtime
+        try:
+            categories = load_categories(self.path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"failed to load book categories from {self.path}: {e}")
+            return False
+        self._build(categories)
+        return True
+
+    def parent_of(self, category: str) -> Optional[str]:
+        self.reload_if_changed()
+        return self._parents.get(category)
+
+    def dialog_request(self, trigger_id: str, callback_id: str) -> bytes:
+        # dialog.open 요청 본문 {"trigger_id": ..., "dialog": {"callback_id": ..., ...}}
+        self.reload_if_changed()
+        return b"".join(
+            (
+                b'{"trigger_id":',
+                _json_string(trigger_id),
+                b',"dialog":{"callback_id":',
+                _json_string(callback_id),
+                b",",
+                self._dialog_tail,
+                b"}",
+            )
+        )
+
+
+taxonomy = Taxonomy(
+    default_categories(),
+    path=settings.book_categories_path,
+    reload_interval=settings.book_categories_reload_interval,
+)
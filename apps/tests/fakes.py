@@ -0,0 +1,216 @@
+import asyncio
+import random
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+# 외부 API 를 흉내내는 로컬 서버들. 테스트에서는 httpx.ASGITransport 로, 부하 테스트에서는 uvicorn 으로 실행한다
+
+
+class FakeUpstream:
+    # 응답 지연(latency ± jitter) 과 무작위 실패(error_rate) 를 주입할 수 있다
+    error_status_code: int = 503
+
+    def __init__(self, latency: float = 0, jitter: float = 0, error_rate: float = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests: List[Tuple[str, str]] = []
+        self.failures = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._failures: Deque[Tuple[int, Optional[float]]] = deque()
+
+        self.app = FastAPI()
+        self.app.add_api_route("/_stats", self.stats, methods=["GET"])
+
+    def fail_next(self, status_code: int, times: int = 1, retry_after: Optional[float] = None) -> None:
+        self._failures.extend([(status_code, retry_after)] * times)
+
+    def error_body(self, status_code: int) -> dict:
+        raise NotImplementedError
+
+    async def stats(self) -> dict:
+        return {"requests": len(self.requests), "failures": self.failures, "max_in_flight": self.max_in_flight}
+
+    def _next_failure(self) -> Optional[Tuple[int, Optional[float]]]:
+        if self._failures:
+            return self._failures.popleft()
+        if self.error_rate and random.random() < self.error_rate:
+            return self.error_status_code, None
+        return None
+
+    async def _handle(self, request: Request, respond: Callable[[dict], dict]) -> JSONResponse:
+        self.requests.append((request.method, request.url.path))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+            failure = self._next_failure()
+            if failure:
+                status_code, retry_after = failure
+                self.failures += 1
+                return JSONResponse(
+                    self.error_body(status_code),
+                    status_code=status_code,
+                    headers={} if retry_after is None else {"Retry-After": str(retry_after)},
+                )
+            return JSONResponse(respond(await self._body(request)))
+        finally:
+            self.in_flight -= 1
+
+    @staticmethod
+    async def _body(request: Request) -> dict:
+        content_type = request.headers.get("content-type", "")
+        if content_type.startswith("application/json"):
+            return await request.json()
+        if content_type.startswith(("application/x-www-form-urlencoded", "multipart/form-data")):
+            return dict(await request.form())
+        return dict(request.query_params)
+
+
+class FakeNotion(FakeUpstream):
+    # 노션 API 중 북크북크가 쓰는 엔드포인트만 흉내낸다
+    def __init__(self, latency: float = 0, jitter: float = 0, error_rate: float = 0):
+        super().__init__(latency=latency, jitter=jitter, error_rate=error_rate)
+        # 페이지를 만들 때 받은 본문, 그리고 그걸로 만든 (데이터베이스 조회 결과로 돌려줄) 페이지
+        self.pages: List[dict] = []
+        self.database: Dict[str, dict] = {}
+
+        self.app.add_api_route("/v1/pages/", self.create_page, methods=["POST"])
+        self.app.add_api_route("/v1/pages/{page_id}", self.update_page, methods=["PATCH"])
+        self.app.add_api_route("/v1/blocks/{block_id}/children", self.append_block_children, methods=["PATCH"])
+        self.app.add_api_route("/v1/databases/{database_id}/query", self.query_database, methods=["POST"])
+
+    def error_body(self, status_code: int) -> dict:
+        return {"object": "error", "status": status_code, "code": "rate_limited", "message": "fake failure"}
+
+    async def create_page(self, request: Request) -> JSONResponse:
+        return await self._handle(request, lambda body: self._create(body))
+
+    async def update_page(self, page_id: str, request: Request) -> JSONResponse:
+        return await self._handle(request, lambda body: self._update(page_id, body))
+
+    async def append_block_children(self, block_id: str, request: Request) -> JSONResponse:
+        return await self._handle(request, lambda body: {"object": "list", "results": body["children"]})
+
+    async def query_database(self, database_id: str, request: Request) -> JSONResponse:
+        return await self._handle(request, self._query)
+
+    def _create(self, body: dict) -> dict:
+        self.pages.append(body)
+        page_id = str(uuid.uuid4())
+        page = {
+            "object": "page",
+            "id": page_id,
+            "url": f"https://www.notion.so/{page_id.replace('-', '')}",
+            "created_time": _timestamp(),
+            "last_edited_time": _timestamp(),
+            "archived": False,
+            "properties": {name: _read_property(value) for name, value in body.get("properties", {}).items()},
+        }
+        self.database[page_id] = page
+        return page
+
+    def _update(self, page_id: str, body: dict) -> dict:
+        page = self.database.setdefault(page_id, {"object": "page", "id": page_id, "properties": {}})
+        page["properties"].update({name: _read_property(value) for name, value in body.get("properties", {}).items()})
+        page["archived"] = body.get("archived", page.get("archived", False))
+        page["last_edited_time"] = _timestamp()
+        return page
+
+    def _query(self, body: dict) -> dict:
+        after = body.get("filter", {}).get("last_edited_time", {}).get("on_or_after", "")
+        # 보관(archived) 된 페이지는 조회 결과에 나오지 않는다
+        pages = sorted(
+            (page for page in self.database.values() if not page["archived"] and page["last_edited_time"] >= after),
+            key=lambda page: page["last_edited_time"],
+        )
+        start = int(body.get("start_cursor") or 0)
+        end = start + body.get("page_size", 100)
+        has_more = end < len(pages)
+        return {
+            "object": "list",
+            "results": pages[start:end],
+            "has_more": has_more,
+            "next_cursor": str(end) if has_more else None,
+        }
+
+
+def _timestamp() -> str:
+    # 실제 노션은 분 단위로 자르지만, 테스트에서 순서를 구분할 수 있도록 마이크로초까지 남긴다
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _read_property(value):
+    # 페이지를 만들 때 보낸 rich text 에 조회 응답처럼 plain_text 를 붙인다
+    for key in ("title", "rich_text"):
+        if isinstance(value, dict) and key in value:
+            return {**value, key: [{**item, "plain_text": item["text"]["content"]} for item in value[key]]}
+    return value
+
+
+class FakeSlack(FakeUpstream):
+    # 슬랙 Web API (https://www.slack.com/api/<method>) 중 북크북크가 쓰는 메소드만 흉내낸다
+    error_status_code = 500
+
+    def __init__(self, latency: float = 0, jitter: float = 0, error_rate: float = 0, members: int = 100):
+        super().__init__(latency=latency, jitter=jitter, error_rate=error_rate)
+        self.messages: List[dict] = []
+        self.members = [{"id": f"U{n:08d}", "profile": {"real_name": f"member-{n}"}} for n in range(members)]
+
+        self.responses: List[dict] = []
+
+        self.app.add_api_route("/api/{method}", self.call, methods=["GET", "POST"])
+        # 인터랙션 페이로드의 response_url (https://hooks.slack.com/app/...)
+        self.app.add_api_route("/response/{token:path}", self.response_url, methods=["POST"])
+
+    def error_body(self, status_code: int) -> dict:
+        return {"ok": False, "error": "fatal_error"}
+
+    async def call(self, method: str, request: Request) -> JSONResponse:
+        respond = {
+            "dialog.open": lambda body: {"ok": True},
+            "chat.postMessage": self._post_message,
+            "chat.postEphemeral": lambda body: {"ok": True, "message_ts": f"{time.time():.6f}"},
+            "users.profile.get": lambda body: {"ok": True, "profile": {"real_name": f"member-{body.get('user')}"}},
+            "users.list": lambda body: {"ok": True, "members": self.members, "response_metadata": {"next_cursor": ""}},
+        }.get(method, lambda body: {"ok": False, "error": "unknown_method"})
+        return await self._handle(request, respond)
+
+    async def response_url(self, token: str, request: Request) -> JSONResponse:
+        return await self._handle(request, lambda body: self.responses.append(body) or {"ok": True})
+
+    def _post_message(self, body: dict) -> dict:
+        self.messages.append(body)
+        return {"ok": True, "channel": body.get("channel"), "ts": f"{time.time():.6f}"}
+
+
+class FakeOpenGraph(FakeUpstream):
+    # opengraph.io 의 /api/1.1/site/<url> 응답을 흉내낸다
+    error_status_code = 502
+
+    def __init__(self, latency: float = 0, jitter: float = 0, error_rate: float = 0):
+        super().__init__(latency=latency, jitter=jitter, error_rate=error_rate)
+        self.app.add_api_route("/api/1.1/site/{book_link:path}", self.site, methods=["GET"])
+
+    def error_body(self, status_code: int) -> dict:
+        return {"error": {"code": status_code, "message": "fake failure"}}
+
+    async def site(self, book_link: str, request: Request) -> JSONResponse:
+        return await self._handle(
+            request,
+            lambda body: {
+                "openGraph": {
+                    "title": f"fake title of {book_link}",
+                    "image": {"url": f"https://img.ridicdn.net/cover/{abs(hash(book_link))}/xxlarge"},
+                    "url": book_link,
+                }
+            },
+        )
@@ -1,10 +1,162 @@
 from typing import Callable
 
 from http import HTTPStatus
+from unittest.mock import AsyncMock, patch
+
+import httpx
 import pytest
 from slack.web.slack_response import SlackResponse
 
-from app import slack_client
+from app import slack_client, profile_cache as app_profile_cache, ARCHIVE_BOOK
+from circuit_breaker import CircuitBreaker
+from functions import archive_book
+from hedging import Hedge
+from http_clients import HttpClientPool
+from idempotency import IdempotencyStore
+from notion import NotionClient
+from notion_mirror import NotionMirror
+from og_cache import OpenGraphCache
+from outbox import Outbox
+from profile_cache import ProfileCache
+from shared_cache import SharedCache
+from slack_api import SlackApi
+from tests.fakes import FakeNotion
+
+
+@pytest.fixture(autouse=True)
+def og_cache(tmp_path) -> OpenGraphCache:
+    # 테스트마다 비어있는 캐시를 사용
+    cache = OpenGraphCache(path=str(tmp_path / "opengraph.sqlite3"), ttl=60, negative_ttl=60, max_entries=100)
+    with patch("functions.og_cache", cache):
+        yield cache
+
+
+@pytest.fixture(autouse=True)
+def notion_mirror(tmp_path) -> NotionMirror:
+    mirror = NotionMirror(path=str(tmp_path / "notion_mirror.sqlite3"), database_id="test-database", page_size=2)
+    with patch("functions.notion_mirror", mirror), patch("app.notion_mirror", mirror):
+        yield mirror
+
+
+def circuit_breaker(name: str) -> CircuitBreaker:
+    return CircuitBreaker(name=name, failure_threshold=0.5, window=10, minimum_calls=4, open_duration=60)
+
+
+@pytest.fixture(autouse=True)
+def opengraph_breaker() -> CircuitBreaker:
+    breaker = circuit_breaker("opengraph")
+    with patch("functions.opengraph_breaker", breaker):
+        yield breaker
+
+
+def hedge(name: str, max_ratio: float = 1) -> Hedge:
+    return Hedge(
+        name=name,
+        percentile=0.5,
+        window=10,
+        min_samples=4,
+        initial_delay=0.05,
+        min_delay=0.01,
+        max_ratio=max_ratio,
+        burst=1,
+    )
+
+
+@pytest.fixture(autouse=True)
+def bookstore_hedge() -> Hedge:
+    # 지연시간 기록과 추가 요청 한도를 테스트마다 새로 센다
+    with patch("functions.bookstore_hedge", hedge("bookstore")) as bookstore:
+        yield bookstore
+
+
+@pytest.fixture(autouse=True)
+def opengraph_hedge() -> Hedge:
+    with patch("functions.opengraph_hedge", hedge("opengraph")) as opengraph:
+        yield opengraph
+
+
+@pytest.fixture
+def fake_notion() -> FakeNotion:
+    return FakeNotion()
+
+
+@pytest.fixture(autouse=True)
+def notion_client(fake_notion) -> NotionClient:
+    # 노션 API 는 모두 로컬 가짜 서버로 보낸다
+    client = NotionClient(
+        secret_key="test",
+        pool=HttpClientPool(
+            max_connections_per_host=10,
+            max_keepalive_connections_per_host=10,
+            keepalive_expiry=5,
+            transport=httpx.ASGITransport(app=fake_notion.app),
+        ),
+        rate=1000,
+        burst=1000,
+        max_concurrency=10,
+        latency_target=1,
+        max_retries=2,
+        breaker=circuit_breaker("notion"),
+    )
+    with patch("functions.notion_client", client):
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def scrape_open_graph() -> AsyncMock:
+    # 서점 페이지 직접 조회는 test_og_scraper 에서만 검증하고, 나머지 테스트는 opengraph.io 로 fallback 한다
+    with patch("functions.scrape_open_graph", AsyncMock(return_value=None)) as mock_scrape:
+        yield mock_scrape
+
+
+@pytest.fixture(autouse=True)
+def prefetch_open_graph() -> AsyncMock:
+    # submit_book 이 응답과 별개로 시작하는 오픈그래프 미리 조회
+    with patch("app.get_open_graph", AsyncMock(return_value=None)) as mock_prefetch:
+        yield mock_prefetch
+
+
+@pytest.fixture(autouse=True)
+def outbox(tmp_path) -> Outbox:
+    queue = Outbox(
+        path=str(tmp_path / "outbox.sqlite3"),
+        concurrency=2,
+        max_attempts=3,
+        base_delay=0,
+        max_delay=0,
+        lease=60,
+        poll_interval=0.01,
+    )
+    queue.register(ARCHIVE_BOOK, archive_book)
+    with patch("app.outbox", queue):
+        yield queue
+
+
+@pytest.fixture(autouse=True)
+def idempotency(tmp_path) -> IdempotencyStore:
+    store = IdempotencyStore(path=str(tmp_path / "idempotency.sqlite3"), ttl=60, lease=60, poll_interval=0.01)
+    with patch("app.idempotency", store):
+        yield store
+
+
+@pytest.fixture(autouse=True)
+def slack_api() -> SlackApi:
+    # 테스트마다 rate limit 을 새로 센다
+    api = SlackApi(slack_client)
+    with patch("app.slack_api", api), patch.object(app_profile_cache, "slack", api):
+        yield api
+
+
+@pytest.fixture(autouse=True)
+def shared_cache(tmp_path) -> SharedCache:
+    cache = SharedCache(path=str(tmp_path / "shared.sqlite3"))
+    with patch.object(app_profile_cache, "cache", cache), patch("backfill.shared_cache", cache):
+        yield cache
+
+
+@pytest.fixture(autouse=True)
+def profile_cache(shared_cache) -> ProfileCache:
+    return app_profile_cache
 
 
 @pytest.fixture
@@ -0,0 +1,139 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+# 앱을 새 프로세스에서 읽는 데 드는 시간/메모리를 재는 도구. tests/test_startup.py 와 benchmarks/bench_startup.py 가 같이 쓴다.
+# gunicorn 은 preload_app 으로 마스터에서 한 번 읽고 fork 하므로, 콜드 스타트는 이 시간에 워커 기동 시간을 더한 것이고
+# 워커마다 따로 드는 메모리는 fork 뒤에 새로 쓴 페이지(private) 뿐이다.
+
+APPS_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 합의한 예산. 넘으면 tests/test_startup.py 와 bench_startup.py --check 가 실패한다
+IMPORT_SECONDS_BUDGET: float = 2.5
+IMPORT_RSS_BUDGET: int = 100 * 1024 * 1024
+WORKER_PRIVATE_BUDGET: int = 32 * 1024 * 1024
+
+_MEASURE_IMPORT = """
+import json, os, sys, threading, time
+started = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - started
+with open("/proc/self/status") as f:
+    rss = int(f.read().split("VmRSS:")[1].split()[0]) * 1024
+files = []
+for fd in os.listdir("/proc/self/fd"):
+    try:
+        files.append(os.readlink(f"/proc/self/fd/{{fd}}"))
+    except OSError:
+        pass
+print(json.dumps({{
+    "seconds": seconds,
+    "rss_bytes": rss,
+    "modules": len(sys.modules),
+    "threads": threading.active_count(),
+    "files": sorted(path for path in files if path.endswith((".sqlite3", "-wal", "-shm")) or path.startswith("socket:")),
+}}))
+"""
+
+
+def measure_import(module: str = "app", runs: int = 3, env: Optional[Dict[str, str]] = None) -> dict:
+    # 매번 새 인터프리터에서 읽는다. 시간은 디스크 캐시 등의 영향을 줄이려고 가장 빠른 값을 쓴다
+    samples: List[dict] = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _MEASURE_IMPORT.format(module=module)],
+            cwd=APPS_DIR,
+            env={**os.environ, **(env or {})},
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        "seconds": min(sample["seconds"] for sample in samples),
+        "seconds_median": statistics.median(sample["seconds"] for sample in samples),
+        "rss_bytes": min(sample["rss_bytes"] for sample in samples),
+        "modules": samples[-1]["modules"],
+        "threads": max(sample["threads"] for sample in samples),
+        "files": samples[-1]["files"],
+    }
+
+
+_MEASURE_WORKER = """
+import gc, json, os, sys
+from tests.startup import process_memory
+import app
+# gunicorn.ini.py 의 when_ready 처럼 마스터에서 얼린 뒤 fork 한다
+gc.freeze()
+pid = os.fork()
+if pid == 0:
+    from fastapi.testclient import TestClient
+    # lifespan 없이 요청 하나를 처리해서 워커가 처음 건드리는 페이지를 복사하게 한다
+    TestClient(app.app).get("/metrics")
+    gc.collect()
+    print(json.dumps(process_memory(os.getpid())), flush=True)
+    os._exit(0)
+os.waitpid(pid, 0)
+"""
+
+
+def measure_worker(env: Optional[Dict[str, str]] = None) -> Dict[str, int]:
+    # preload_app 처럼 앱을 읽은 프로세스에서 fork 한 워커가 따로 쓰는 메모리. 실제 워커보다 적게 잡히므로 (lifespan 의
+    # 백그라운드 작업이 없음) 회귀를 잡는 용도이고, 실제 값은 benchmarks/bench_startup.py 로 잰다
+    output = subprocess.run(
+        [sys.executable, "-c", _MEASURE_WORKER],
+        cwd=APPS_DIR,
+        env={**os.environ, **(env or {})},
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+_CHECK_FORK = """
+import json, os
+from og_cache import og_cache
+from shared_cache import shared_cache
+# 마스터에서 (preload_app 중이나 when_ready 에서) 연결을 연 뒤에 fork 된 워커
+caches = {"og_cache": og_cache, "shared_cache": shared_cache}
+inherited = {name: cache._connection for name, cache in caches.items()}
+pid = os.fork()
+if pid == 0:
+    og_cache.get("https://ridibooks.com/books/1354000126")
+    shared_cache.get("profile:U1")
+    print(json.dumps(sorted(name for name, cache in caches.items() if cache._connection is inherited[name])), flush=True)
+    os._exit(0)
+os.waitpid(pid, 0)
+"""
+
+
+def inherited_connections(env: Optional[Dict[str, str]] = None) -> List[str]:
+    # fork 전에 연 SQLite 연결을 워커가 그대로 쓰는 저장소. 같은 연결을 두 프로세스가 쓰면 파일이 깨질 수 있다
+    output = subprocess.run(
+        [sys.executable, "-c", _CHECK_FORK],
+        cwd=APPS_DIR,
+        env={**os.environ, **(env or {})},
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def process_memory(pid: int) -> Dict[str, int]:
+    # rss 는 다른 프로세스와 공유하는 페이지까지, pss 는 공유 페이지를 나눠서, private 은 이 프로세스만 쓰는 페이지
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if value.strip().endswith("kB"):
+                fields[name] = int(value.split()[0]) * 1024
+    return {
+        "rss_bytes": fields["Rss"],
+        "pss_bytes": fields["Pss"],
+        "private_bytes": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
@@ -0,0 +1,135 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from backfill import DONE, FAILED, SKIPPED, Backfill, book_links
+from dtos.opengraph import ImageUrl, OpenGraph
+from slack_api import SlackApi
+
+
+ANNOUNCEMENT = """
+📖 김북크님이 경제일반도서를 추천했어요 📖
+
+젊어서 부자가 되는 길
+<https://ridibooks.com/books/1354000126>
+"""
+
+
+def history(*messages: dict, next_cursor: str = "") -> dict:
+    return {
+        "ok": True,
+        "messages": list(messages),
+        "has_more": bool(next_cursor),
+        "response_metadata": {"next_cursor": next_cursor},
+    }
+
+
+@pytest.fixture
+def channel_history(ok_response_from_slack):
+    # 커서마다 conversations.history 응답 (최신 메세지부터)
+    pages = {
+        None: history(
+            {"ts": "3.0", "user": "U2", "text": "<https://www.google.com|구글> 링크는 무시"},
+            {
+                "ts": "2.0",
+                "user": "U2",
+                "text": "이 책 좋아요 <https://www.yes24.com/Product/Goods/106369008?pid=1&amp;x=1>",
+            },
+            next_cursor="page-2",
+        ),
+        "page-2": history({"ts": "1.0", "bot_id": "B1", "subtype": "bot_message", "text": ANNOUNCEMENT}),
+    }
+
+    async def conversations_history(**params):
+        page = pages[params.get("cursor")]
+        if isinstance(page, Exception):
+            raise page
+        return ok_response_from_slack(page)
+
+    slack_client = MagicMock()
+    slack_client.conversations_history = AsyncMock(side_effect=conversations_history)
+    slack_client.users_profile_get = AsyncMock(
+        return_value=ok_response_from_slack({"ok": True, "profile": {"real_name": "이북크"}})
+    )
+    slack_client.pages = pages
+    return slack_client
+
+
+@pytest.fixture
+def backfill(tmp_path, channel_history, notion_client, notion_mirror, og_cache) -> Backfill:
+    for url in ("https://ridibooks.com/books/1354000126", "https://www.yes24.com/Product/Goods/106369008"):
+        og_cache.set(url, OpenGraph(title="부의 추월차선", image=ImageUrl(url="https://image.yes24.com/goods/1/XL")))
+    return Backfill(
+        path=str(tmp_path / "backfill.sqlite3"),
+        channel="C1",
+        slack=SlackApi(channel_history),
+        notion=notion_client,
+        mirror=notion_mirror,
+        concurrency=2,
+    )
+
+
+def archived(fake_notion) -> list:
+    return sorted(
+        (
+            page["properties"]["URL"]["url"],
+            page["properties"]["recommender"]["rich_text"][0]["text"]["content"],
+            [option["name"] for option in page["properties"]["category"]["multi_select"]],
+        )
+        for page in fake_notion.pages
+    )
+
+
+@pytest.mark.asyncio
+class TestBackfill:
+    async def test_book_links(self):
+        assert book_links(
+            "<https://ridibooks.com/books/1|부의 추월차선> <https://ridibooks.com/books/1> <https://a.com>"
+        ) == ["https://ridibooks.com/books/1"]
+
+    async def test_backfill_channel(self, backfill, fake_notion):
+        # When
+        assert await backfill.run() == {DONE: 2}
+
+        # Then: 봇이 보낸 메세지는 추천인/카테고리를 읽고, 사람이 보낸 메세지는 프로필 이름과 기본 카테고리를 쓴다
+        assert archived(fake_notion) == [
+            ("https://ridibooks.com/books/1354000126", "김북크", ["경제일반", "경영/경제"]),
+            ("https://www.yes24.com/Product/Goods/106369008?pid=1&x=1", "이북크", ["미분류"]),
+        ]
+        assert fake_notion.pages[0]["properties"]["recommend reason"]["rich_text"][0]["text"]["content"] in (
+            "젊어서 부자가 되는 길",
+            "이 책 좋아요",
+        )
+
+        # When: 다시 실행하면 채널을 다시 훑지 않는다
+        assert await backfill.run() == {DONE: 2}
+        assert backfill.slack.client.conversations_history.await_count == 2
+        assert len(fake_notion.pages) == 2
+
+    async def test_skip_archived_books(self, backfill, notion_mirror, fake_notion):
+        # Given: 이미 노션에 있는 책
+        notion_mirror.link_keys(["ridibooks.com/1354000126"], "page-1")
+
+        assert await backfill.run() == {DONE: 1, SKIPPED: 1}
+        assert [url for url, _, _ in archived(fake_notion)] == [
+            "https://www.yes24.com/Product/Goods/106369008?pid=1&x=1"
+        ]
+        assert not any(path.startswith("/v1/blocks/") for _, path in fake_notion.requests)
+
+    async def test_resume(self, backfill, channel_history, fake_notion):
+        # Given: 노션 저장에 실패하고, 두 번째 페이지를 받다가 멈춤
+        channel_history.pages["page-2"], page_2 = ConnectionError("stopped"), channel_history.pages["page-2"]
+        with patch("backfill.post_book_to_notion", AsyncMock(return_value=False)), pytest.raises(ConnectionError):
+            await backfill.run()
+        assert backfill.checkpoint() == ("page-2", False)
+        assert backfill.counts() == {FAILED: 1}
+
+        # When: 다시 실행하면
+        channel_history.pages["page-2"] = page_2
+        assert await backfill.run() == {DONE: 2}
+
+        # Then: 멈춘 곳부터 이어서 훑고, 실패한 링크는 다시 시도한다
+        cursors = [call.kwargs.get("cursor") for call in channel_history.conversations_history.await_args_list]
+        assert cursors == [None, "page-2", "page-2"]
+        assert len(fake_notion.pages) == 2
+        assert backfill.checkpoint() == ("", True)
@@ -0,0 +1,177 @@
+import random
+import re
+
+import pytest
+
+from bookstores import (
+    BookStore,
+    BookStoreRegistry,
+    bookstores,
+    canonicalize_url,
+    isbn_key,
+    parse_book_link,
+    product_key,
+)
+from dtos.notion.image_block import ImageUrl
+
+
+# BookSubmission.validate_link 가 예전에 쓰던 정규식. parse_book_link 는 이 정규식과 같은 링크만 받아들여야 한다
+LEGACY_LINK_REGEX = (
+    r"^(http:\/\/www\.|https:\/\/www\.|http:\/\/|https:\/\/)?[a-z0-9]"
+    r"+([\-\.]{1}[a-z0-9]+)*\.[a-z]{2,5}(:[0-9]{1,5})?(\/.*)?$"
+)
+
+FUZZ_PIECES = [
+    "https://", "http://", "http//", "www.", "a", "z", "0", "9", "ab", "com", "co.kr", "abcdef", ".", "..", "-", ":",
+    "80", "123456", "/", "//", "?", "#", "=", "&", "\n", "\r", " ", "A", "COM", "_", "한", "%20", "²", "@",
+]  # fmt: skip
+
+
+@pytest.mark.asyncio
+class TestParseBookLink:
+    @pytest.mark.parametrize(
+        "link",
+        [
+            "https://ridibooks.com/books/1354000008?_s=search&_q=부의+추월차선#reviews",
+            "ridibooks.com",
+            "http://www.yes24.com:8080",
+            "https://a-b.c-d.kr/\n",
+            "https://www.example.com##",
+            "https://a.com:123456/",
+            "https://a.com:/",
+            "https://a--b.com",
+            "https://a.c0m",
+            "https://a.com/x\n\n",
+            "HTTPS://ridibooks.com",
+        ],
+    )
+    async def test_same_as_legacy_regex(self, link):
+        assert (parse_book_link(link) is not None) == (re.match(LEGACY_LINK_REGEX, link) is not None)
+
+    async def test_fuzz_against_legacy_regex(self):
+        rng = random.Random(11)
+        for _ in range(30000):
+            link = "".join(rng.choice(FUZZ_PIECES) for _ in range(rng.randint(0, 10)))
+            assert (parse_book_link(link) is not None) == (re.match(LEGACY_LINK_REGEX, link) is not None), repr(link)
+
+    async def test_components(self):
+        link = parse_book_link("http://www.yes24.com:8080/Product/Goods/106369008?pid=1#top")
+
+        assert link.scheme == "http"
+        assert link.host == "www.yes24.com"
+        assert link.port == "8080"
+        assert link.path == "/Product/Goods/106369008"
+        assert link.query == "pid=1"
+        assert link.fragment == "top"
+
+    async def test_long_input(self):
+        # 아주 긴 입력도 길이에 비례하는 시간 안에 거절한다
+        assert parse_book_link("https://" + "a-" * 100000 + "!") is None
+        assert parse_book_link("https://" + "a." * 100000 + "com/" + "x" * 100000) is not None
+
+
+@pytest.mark.asyncio
+class TestBookStores:
+    @pytest.mark.parametrize(
+        "link, store",
+        [
+            ("https://ridibooks.com/books/1", "리디북스"),
+            ("https://www.ridibooks.com/books/1", "리디북스"),
+            ("https://m.yes24.com/Goods/Detail/1", "예스24"),
+            ("https://www.yes24.com/Product/Search?query=1", "예스24"),
+            ("https://ridibooks.com.evil.com/books/1", None),
+            ("https://evil.com/ridibooks.com", None),
+            ("https://ridibooks.com:8080/books/1", None),
+        ],
+    )
+    async def test_dispatch_by_exact_host(self, link, store):
+        bookstore = bookstores.for_link(parse_book_link(link))
+        assert (bookstore.name if bookstore else None) == store
+
+    @pytest.mark.parametrize(
+        "link, canonical",
+        [
+            ("https://www.yes24.com/Product/Goods/106369008?pid=123&Acode=101", "https://www.yes24.com/Product/Goods/106369008"),
+            ("http://m.yes24.com/Goods/Detail/106369008", "https://www.yes24.com/Product/Goods/106369008"),
+            ("https://www.yes24.com/24/goods/106369008/", "https://www.yes24.com/Product/Goods/106369008"),
+            ("https://ridibooks.com/books/1354000126/reviews", "https://ridibooks.com/books/1354000126"),
+            ("https://www.yes24.com/Product/Search?query=abc&_t=1", "https://yes24.com/Product/Search?query=abc"),
+            ("https://www.aladin.co.kr/shop/wproduct.aspx?ItemId=1&utm_source=x", "https://aladin.co.kr/shop/wproduct.aspx?ItemId=1"),
+            # 스킴 없이 입력한 링크도 같은 링크로 모은다
+            ("ridibooks.com/books/1354000126", "https://ridibooks.com/books/1354000126"),
+            ("www.yes24.com/Product/Goods/106369008?pid=123", "https://www.yes24.com/Product/Goods/106369008"),
+            ("www.aladin.co.kr/shop/wproduct.aspx?ItemId=1", "https://aladin.co.kr/shop/wproduct.aspx?ItemId=1"),
+            ("https://example.com:8080/a/", "https://example.com:8080/a"),
+        ],
+    )  # fmt: skip
+    async def test_canonicalize_url(self, link, canonical):
+        assert canonicalize_url(link) == canonical
+
+    @pytest.mark.parametrize(
+        "link, key",
+        [
+            ("https://www.yes24.com/Product/Goods/106369008?pid=123", "yes24.com/106369008"),
+            ("http://m.yes24.com/Goods/Detail/106369008", "yes24.com/106369008"),
+            ("https://ridibooks.com/books/1354000126/reviews", "ridibooks.com/1354000126"),
+            ("https://www.yes24.com/Product/Search?query=abc", "https://yes24.com/Product/Search?query=abc"),
+            ("ridibooks.com/books/1354000126", "ridibooks.com/1354000126"),
+            ("m.yes24.com/Goods/Detail/106369008", "yes24.com/106369008"),
+        ],
+    )
+    async def test_product_key(self, link, key):
+        assert product_key(link) == key
+
+    @pytest.mark.parametrize(
+        "isbn, key",
+        [
+            ("9791191347572", "isbn:9791191347572"),
+            ("979-11-91347-57-2", "isbn:9791191347572"),
+            ("89-7914-069-8", "isbn:9788979140699"),
+            ("0-8044-2957-X", "isbn:9780804429573"),
+            ("not-an-isbn", None),
+        ],
+    )
+    async def test_isbn_key(self, isbn, key):
+        assert isbn_key(isbn) == key
+
+    @pytest.mark.parametrize(
+        "image_url, rewritten",
+        [
+            ("https://img.ridicdn.net/cover/1354000126/xxlarge#1", "https://img.ridicdn.net/cover/1354000126/xxlarge1.png"),
+            ("https://image.yes24.com/goods/106369008/XL", "https://image.yes24.com/goods/106369008/XL.png"),
+            ("https://image.yes24.com/goods/106369008/XL.png", "https://image.yes24.com/goods/106369008/XL.png"),
+            ("https://example.com/XL", "https://example.com/XL"),
+        ],
+    )  # fmt: skip
+    async def test_rewrite_cover(self, image_url, rewritten):
+        assert ImageUrl(url=image_url).url == rewritten
+
+    async def test_new_store_only_needs_an_adapter(self):
+        # Given: 알라딘 어댑터
+        class Aladin(BookStore):
+            name = "알라딘"
+            hosts = ("aladin.co.kr", "www.aladin.co.kr")
+
+        registry = BookStoreRegistry()
+        registry.register(Aladin())
+
+        # Then
+        assert registry.for_link(parse_book_link("https://www.aladin.co.kr/shop/wproduct.aspx?ItemId=1")).name == "알라딘"
+        assert registry.canonicalize_url("https://www.aladin.co.kr/shop/wproduct.aspx?ItemId=1") == (
+            "https://aladin.co.kr/shop/wproduct.aspx?ItemId=1"
+        )
+        assert registry.for_host("ridibooks.com") is None
+
+    async def test_default_product_url(self):
+        # Given: 상품 상세 페이지 경로만 정한 어댑터
+        class Aladin(BookStore):
+            name = "알라딘"
+            hosts = ("aladin.co.kr", "www.aladin.co.kr")
+            product_path = re.compile(r"/shop/book/(?P<id>\d+)")
+            product_url_path = "/shop/book/{id}"
+
+        registry = BookStoreRegistry()
+        registry.register(Aladin())
+
+        # Then: 첫 번째 호스트 기준으로 정규화한다
+        assert registry.canonicalize_url("www.aladin.co.kr/shop/book/1?x=1") == "https://aladin.co.kr/shop/book/1"
@@ -0,0 +1,232 @@
+import asyncio
+import time
+from http import HTTPStatus
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from dtos.internal.book import Book
+from dtos.opengraph import ImageUrl, OpenGraph
+from functions import get_open_graph, post_book_to_notion, repair_pages
+from http_clients import HttpClientPool
+from notion import NotionClient, NotionError
+from settings import settings
+
+
+def fail(breaker: CircuitBreaker) -> None:
+    with pytest.raises(ConnectionError), breaker.guard():
+        raise ConnectionError
+
+
+@pytest.fixture
+def breaker() -> CircuitBreaker:
+    return CircuitBreaker(name="test", failure_threshold=0.5, window=4, minimum_calls=4, open_duration=0.05)
+
+
+@pytest.fixture
+def opengraph_io():
+    # 장애가 난 opengraph.io
+    requests = []
+
+    def respond(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url)
+        return httpx.Response(HTTPStatus.BAD_GATEWAY, json={"error": {"message": "down"}})
+
+    pool = HttpClientPool(
+        max_connections_per_host=1,
+        max_keepalive_connections_per_host=1,
+        keepalive_expiry=5,
+        transport=httpx.MockTransport(respond),
+    )
+    with patch("functions.http_clients", pool):
+        yield requests
+
+
+@pytest.mark.asyncio
+class TestCircuitBreaker:
+    async def test_open_when_failure_rate_exceeds_threshold(self, breaker):
+        # Given: 최근 네 번 중 두 번 실패
+        for _ in range(2):
+            with breaker.guard():
+                pass
+        fail(breaker)
+        assert breaker.state == CLOSED
+        fail(breaker)
+
+        # Then: 호출하지 않고 바로 실패
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    async def test_half_open_probe(self, breaker):
+        for _ in range(4):
+            fail(breaker)
+        await asyncio.sleep(0.06)
+
+        # When: open_duration 이 지나면 한 번만 시험 호출을 보내고
+        assert breaker.state == HALF_OPEN
+        breaker.before_call()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+        # Then: 실패하면 다시 open, 성공하면 closed
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        await asyncio.sleep(0.06)
+        with breaker.guard():
+            pass
+        assert breaker.state == CLOSED
+
+    async def test_too_few_calls(self, breaker):
+        for _ in range(3):
+            fail(breaker)
+
+        assert breaker.state == CLOSED
+
+
+@pytest.mark.asyncio
+class TestUpstreamCircuits:
+    async def test_notion_fails_fast(self, fake_notion, breaker):
+        client = NotionClient(
+            secret_key="test",
+            pool=HttpClientPool(
+                max_connections_per_host=1,
+                max_keepalive_connections_per_host=1,
+                keepalive_expiry=5,
+                transport=httpx.ASGITransport(app=fake_notion.app),
+            ),
+            rate=1000,
+            burst=1000,
+            max_concurrency=1,
+            latency_target=1,
+            max_retries=0,
+            breaker=breaker,
+        )
+
+        # Given: 노션 장애
+        fake_notion.fail_next(HTTPStatus.SERVICE_UNAVAILABLE, times=4)
+        for _ in range(4):
+            with pytest.raises(NotionError):
+                await client.update_page("page-1", {})
+
+        # Then: 더 보내지 않고 바로 실패하고, 노션이 돌아오면 시험 호출로 확인한 뒤 다시 보낸다
+        with pytest.raises(NotionError) as e:
+            await client.update_page("page-1", {})
+        assert e.value.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+        assert len(fake_notion.requests) == 4
+
+        await asyncio.sleep(0.06)
+        await client.update_page("page-1", {})
+        assert breaker.state == CLOSED
+
+    async def test_client_errors_do_not_open_notion_circuit(self, fake_notion, notion_client):
+        fake_notion.fail_next(HTTPStatus.BAD_REQUEST, times=5)
+        for _ in range(5):
+            with pytest.raises(NotionError):
+                await notion_client.update_page("page-1", {})
+
+        assert notion_client.breaker.state == CLOSED
+
+    async def test_opengraph_fails_fast(self, opengraph_io, opengraph_breaker, og_cache):
+        requests = opengraph_io
+
+        # Given: opengraph.io 장애
+        for n in range(4):
+            assert await get_open_graph(f"https://ridibooks.com/books/{n}") is None
+
+        # Then: 더 요청하지 않고, 링크 문제가 아니므로 실패를 캐시하지도 않는다
+        assert opengraph_breaker.state == OPEN
+        assert await get_open_graph("https://ridibooks.com/books/4") is None
+        assert len(requests) == 4
+        assert og_cache.get("https://ridibooks.com/books/4") == (False, None)
+
+
+@pytest.mark.asyncio
+class TestDegradedArchiving:
+    async def test_archive_without_opengraph_and_repair(
+        self, opengraph_io, breaker, fake_notion, notion_mirror, og_cache
+    ):
+        book = Book(
+            category="경제일반",
+            bookstore_url="https://ridibooks.com/books/1354000126",
+            recommend_reason="재밌어요",
+            recommender="김북크",
+        )
+
+        # When: 오픈그래프 태그를 얻지 못해도
+        assert await post_book_to_notion(book)
+
+        # Then: 제목/표지 없이 페이지를 만든다
+        [page] = fake_notion.pages
+        assert page["properties"]["title"] == {"title": []}
+        assert page["children"] == []
+        [untitled] = notion_mirror.untitled(limit=10)
+
+        # When: opengraph.io 가 아직 죽어 있으면 고치지 못하고
+        with patch("functions.opengraph_breaker", breaker):
+            for _ in range(4):
+                breaker.record_failure()
+            assert await repair_pages(limit=10) == 0
+
+            # When: 돌아오면
+            await asyncio.sleep(0.06)
+            og_cache.set(
+                book.bookstore_url, OpenGraph(title="부의 추월차선", image=ImageUrl(url="https://img.ridicdn.net/1"))
+            )
+            assert await repair_pages(limit=10) == 1
+
+        # Then: 표지를 붙이고 제목을 채운다
+        assert fake_notion.requests[-2:] == [
+            ("PATCH", f"/v1/blocks/{untitled.id}/children"),
+            ("PATCH", f"/v1/pages/{untitled.id}"),
+        ]
+        assert fake_notion.database[untitled.id]["properties"]["title"]["title"][0]["plain_text"] == "부의 추월차선"
+        assert notion_mirror.untitled(limit=10) == []
+        assert [book.title for book in notion_mirror.find_by_url(book.bookstore_url)] == ["부의 추월차선"]
+
+    async def test_unrepairable_pages_do_not_hold_the_batch(self, fake_notion, notion_mirror, og_cache):
+        # Given: 링크가 죽은 오래된 페이지와 새 페이지
+        for id_, url, created_time in [
+            ("dead-page", "https://ridibooks.com/books/1", "2024-01-01T00:00:00.000Z"),
+            ("new-page", "https://ridibooks.com/books/2", "2024-01-02T00:00:00.000Z"),
+        ]:
+            notion_mirror.upsert({"id": id_, "created_time": created_time, "properties": {"URL": {"url": url}}})
+        og_cache.set_failure("https://ridibooks.com/books/1")
+        og_cache.set("https://ridibooks.com/books/2", OpenGraph(title="부의 추월차선", image=ImageUrl(url="https://a.b/1")))
+
+        # When: 한 번에 한 페이지씩 고치면
+        assert await repair_pages(limit=1) == 0
+        assert await repair_pages(limit=1) == 1
+
+        # Then: 고치지 못한 페이지는 재시도 시각까지 건너뛰고 새 페이지를 고친다
+        assert [book.id for book in notion_mirror.untitled(limit=10)] == []
+        with patch("notion_mirror.time.time", return_value=time.time() + settings.page_repair_interval):
+            assert [book.id for book in notion_mirror.untitled(limit=10)] == ["dead-page"]
+
+    async def test_cover_is_added_once_when_title_update_fails(
+        self, fake_notion, notion_client, notion_mirror, og_cache
+    ):
+        notion_mirror.upsert({"id": "page-1", "properties": {"URL": {"url": "https://ridibooks.com/books/1"}}})
+        og_cache.set("https://ridibooks.com/books/1", OpenGraph(title="부의 추월차선", image=ImageUrl(url="https://a.b/1")))
+        update_page, updates = notion_client.update_page, []
+
+        async def fail_first_update(page_id: str, body: dict) -> dict:
+            updates.append(page_id)
+            if len(updates) == 1:
+                raise httpx.ConnectError("connection reset")
+            return await update_page(page_id, body)
+
+        # Given: 표지를 붙인 뒤 제목을 바꾸다 실패
+        with (
+            patch.object(notion_client, "update_page", fail_first_update),
+            patch.object(notion_mirror, "repair_failed"),
+        ):
+            assert await repair_pages(limit=1) == 0
+            assert await repair_pages(limit=1) == 1
+
+        # Then: 다시 시도할 때는 표지를 또 붙이지 않고 제목만 바꾼다
+        assert updates == ["page-1", "page-1"]
+        assert fake_notion.requests == [("PATCH", "/v1/blocks/page-1/children"), ("PATCH", "/v1/pages/page-1")]
+        assert notion_mirror.untitled(limit=10) == []
@@ -0,0 +1,98 @@
+import asyncio
+import time
+import tracemalloc
+from http import HTTPStatus
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app import app
+from debug import LoopMonitor
+
+
+TOKEN: str = "debug-token"
+
+
+def blocking_work(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+async def get(path: str, token: str = TOKEN, **kwargs) -> httpx.Response:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as async_client:
+        return await async_client.get(path, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+
+
+@pytest.fixture
+def debug_token():
+    with patch("debug.settings.debug_token", TOKEN):
+        yield TOKEN
+
+
+@pytest.mark.asyncio
+class TestDebugEndpoints:
+    async def test_disabled_without_token(self):
+        response = await get("/debug/heap")
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    async def test_unauthorized(self, debug_token):
+        response = await get("/debug/heap", token="wrong")
+
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    async def test_profile_returns_collapsed_stacks(self, debug_token):
+        # Given: 프로파일링 중에 이벤트 루프를 잡고 있는 코드
+        async def busy():
+            await asyncio.sleep(0.05)
+            blocking_work(0.1)
+
+        # When
+        response, _ = await asyncio.gather(get("/debug/profile", params={"seconds": 0.3, "interval": 0.002}), busy())
+
+        # Then: "바깥;...;안쪽 횟수" 줄마다 하나의 스택
+        assert response.status_code == HTTPStatus.OK
+        lines = response.text.splitlines()
+        assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == int(response.headers["X-Samples"])
+        assert any("busy (test_debug.py" in line and line.split(";")[-1].startswith("blocking_work") for line in lines)
+
+    async def test_heap(self, debug_token):
+        tracemalloc.start()
+        try:
+            response = await get("/debug/heap", params={"top": 5})
+        finally:
+            tracemalloc.stop()
+
+        report = response.json()
+        assert report["tracing"] is True
+        assert report["rss_bytes"] > 0
+        assert len(report["top_allocations"]) == 5
+
+
+@pytest.mark.asyncio
+class TestLoopMonitor:
+    async def test_records_slow_callback(self):
+        monitor = LoopMonitor(threshold=0.05, interval=0.01)
+        monitor.start()
+        try:
+            # When: 이벤트 루프가 멈추면
+            await asyncio.sleep(0.05)
+            blocking_work(0.2)
+            await asyncio.sleep(0.05)
+        finally:
+            monitor.stop()
+
+        # Then: 멈춘 시간과 멈추게 만든 스택을 기록한다
+        [slow] = monitor.slow_callbacks
+        assert slow["duration"] >= 0.15
+        assert slow["stack"].split(";")[-1].startswith("blocking_work")
+
+    async def test_ignores_short_callbacks(self):
+        monitor = LoopMonitor(threshold=0.05, interval=0.01)
+        monitor.start()
+        try:
+            await asyncio.sleep(0.1)
+        finally:
+            monitor.stop()
+
+        assert list(monitor.slow_callbacks) == []
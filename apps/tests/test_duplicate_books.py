@@ -0,0 +1,166 @@
+import json
+from http import HTTPStatus
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import DUPLICATE_NOTE, SUCCESS_MESSAGE, app
+from dtos.internal.book import Book
+from dtos.opengraph import ImageUrl, OpenGraph
+from functions import post_book_to_notion
+from notion_mirror import NotionMirror
+
+
+client = TestClient(app)
+
+
+def book(bookstore_url: str, recommender: str = "김북크", recommend_reason: str = "재밌어요") -> Book:
+    return Book(
+        category="경제일반", bookstore_url=bookstore_url, recommend_reason=recommend_reason, recommender=recommender
+    )
+
+
+def open_graph(isbn=None) -> OpenGraph:
+    return OpenGraph(
+        title="부의 추월차선", image=ImageUrl(url="https://img.ridicdn.net/cover/1354000126/xxlarge#1"), isbn=isbn
+    )
+
+
+def appended(fake_notion) -> list:
+    return [path for method, path in fake_notion.requests if path.startswith("/v1/blocks/")]
+
+
+@pytest.mark.asyncio
+class TestDuplicateBooks:
+    async def test_same_product_is_archived_once(self, fake_notion, og_cache):
+        # Given: 모바일/PC 링크로 같은 책을 두 번 추천
+        og_cache.set("https://www.yes24.com/Product/Goods/106369008", open_graph())
+
+        # When
+        assert await post_book_to_notion(book("https://www.yes24.com/Product/Goods/106369008?pid=1"))
+        assert await post_book_to_notion(book("http://m.yes24.com/Goods/Detail/106369008", recommender="이북크"))
+
+        # Then: 페이지는 하나만 만들고, 두 번째 추천이유는 기존 페이지에 덧붙인다
+        assert len(fake_notion.pages) == 1
+        [page_id] = fake_notion.database
+        assert appended(fake_notion) == [f"/v1/blocks/{page_id}/children"]
+
+    async def test_same_product_with_and_without_scheme(self, fake_notion, og_cache):
+        og_cache.set("https://ridibooks.com/books/1354000126", open_graph())
+
+        # When: 같은 책을 스킴 없이 다시 추천
+        assert await post_book_to_notion(book("https://ridibooks.com/books/1354000126"))
+        assert await post_book_to_notion(book("ridibooks.com/books/1354000126", recommender="이북크"))
+
+        # Then: 새 페이지를 만들지 않고 추천이유를 덧붙인다
+        assert len(fake_notion.pages) == 1
+        assert len(appended(fake_notion)) == 1
+
+    async def test_same_isbn_from_other_bookstore(self, fake_notion, og_cache):
+        og_cache.set("https://ridibooks.com/books/1354000126", open_graph(isbn="979-11-91347-57-2"))
+        og_cache.set("https://www.yes24.com/Product/Goods/106369008", open_graph(isbn="9791191347572"))
+
+        assert await post_book_to_notion(book("https://ridibooks.com/books/1354000126"))
+        assert await post_book_to_notion(book("https://www.yes24.com/Product/Goods/106369008"))
+
+        assert len(fake_notion.pages) == 1
+        assert len(appended(fake_notion)) == 1
+
+    async def test_claim_is_shared_across_workers(self, notion_mirror, fake_notion, og_cache):
+        # Given: 같은 사본 파일을 쓰는 다른 워커가 이 책의 페이지를 만들고 있음
+        other_worker = NotionMirror(path=notion_mirror.path, database_id=notion_mirror.database_id)
+        assert other_worker.claim("ridibooks.com/1354000126", lease=60) == (None, True)
+        og_cache.set("https://ridibooks.com/books/1354000126", open_graph())
+
+        # When: 나중에 다시 시도하도록 실패 처리
+        assert not await post_book_to_notion(book("https://ridibooks.com/books/1354000126"))
+        assert fake_notion.requests == []
+
+        # When: 다른 워커가 페이지를 만들면
+        other_worker.link_keys(["ridibooks.com/1354000126"], "page-1")
+
+        # Then: 추천이유만 덧붙인다
+        assert await post_book_to_notion(book("https://ridibooks.com/books/1354000126"))
+        assert fake_notion.pages == []
+        assert appended(fake_notion) == ["/v1/blocks/page-1/children"]
+
+    async def test_failed_archive_releases_claim(self, notion_mirror, fake_notion, og_cache):
+        og_cache.set("https://ridibooks.com/books/1354000126", open_graph())
+        fake_notion.fail_next(HTTPStatus.BAD_REQUEST)
+
+        assert not await post_book_to_notion(book("https://ridibooks.com/books/1354000126"))
+        assert not notion_mirror.is_recommended("ridibooks.com/1354000126")
+        assert await post_book_to_notion(book("https://ridibooks.com/books/1354000126"))
+        assert notion_mirror.is_recommended("ridibooks.com/1354000126")
+
+    async def test_page_deleted_in_notion(self, notion_mirror, fake_notion, og_cache):
+        # Given: 노션에서 지워진 페이지
+        og_cache.set("https://ridibooks.com/books/1354000126", open_graph())
+        notion_mirror.link_keys(["ridibooks.com/1354000126"], "deleted-page")
+        fake_notion.fail_next(HTTPStatus.NOT_FOUND)
+
+        # Then: 잊어버리고 다시 시도할 때 새 페이지를 만든다
+        assert not await post_book_to_notion(book("https://ridibooks.com/books/1354000126"))
+        assert await post_book_to_notion(book("https://ridibooks.com/books/1354000126"))
+        assert len(fake_notion.pages) == 1
+
+    async def test_synced_pages_are_indexed(self, notion_mirror):
+        notion_mirror.upsert(
+            {
+                "id": "page-1",
+                "created_time": "2024-01-01T00:00:00.000Z",
+                "last_edited_time": "2024-01-01T00:00:00.000Z",
+                "properties": {"URL": {"url": "https://www.ridibooks.com/books/1354000126?_s=search"}},
+            }
+        )
+
+        assert notion_mirror.is_recommended("ridibooks.com/1354000126")
+        notion_mirror.upsert({"id": "page-1", "archived": True})
+        assert not notion_mirror.is_recommended("ridibooks.com/1354000126")
+
+
+@pytest.mark.asyncio
+class TestSubmitDuplicateBook:
+    @pytest.mark.parametrize(
+        "bookstore_url", ["https://ridibooks.com/books/1354000126", "ridibooks.com/books/1354000126"]
+    )
+    async def test_submit_duplicate_book(
+        self,
+        bookstore_url,
+        notion_mirror,
+        prefetch_open_graph,
+        book_submit_data,
+        user_profile_success_data,
+        chat_post_success_data,
+        ok_response_from_slack,
+    ):
+        # Given: 이미 노션에 있는 책
+        notion_mirror.link_keys(["ridibooks.com/1354000126"], "page-1")
+
+        # When
+        with (
+            patch(
+                "app.slack_client.users_profile_get",
+                AsyncMock(return_value=ok_response_from_slack(user_profile_success_data)),
+            ),
+            patch(
+                "app.slack_client.chat_postMessage",
+                AsyncMock(return_value=ok_response_from_slack(chat_post_success_data)),
+            ) as mock_post_message,
+        ):
+            submit_data = book_submit_data(bookstore_url=bookstore_url)
+            client.post(
+                "/submit-book/",
+                data={"payload": json.dumps(submit_data)},
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+            )
+
+        # Then: 오픈그래프 태그를 조회하지 않고, 이미 추천된 책이라고 알린다
+        prefetch_open_graph.assert_not_called()
+        announcement = SUCCESS_MESSAGE.format(
+            **submit_data["submission"], recommender=user_profile_success_data["profile"]["real_name"]
+        )
+        mock_post_message.assert_called_once_with(
+            text=announcement + DUPLICATE_NOTE, channel=submit_data["channel"]["id"]
+        )
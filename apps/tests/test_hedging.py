@@ -0,0 +1,165 @@
+import asyncio
+from typing import Callable, List, Optional
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from dtos.opengraph import OpenGraph
+from functions import get_open_graph
+from metrics import hedged_requests
+from tests.fixtures import hedge
+
+
+def source(result: Optional[str] = None, delay: float = 0, error: Optional[Exception] = None) -> Callable:
+    calls: List[str] = []
+
+    async def call() -> Optional[str]:
+        calls.append("started")
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            calls.append("cancelled")
+            raise
+        if error is not None:
+            raise error
+        return result
+
+    call.calls = calls
+    return call
+
+
+@pytest.mark.asyncio
+class TestHedge:
+    async def test_fast_primary_is_not_hedged(self):
+        primary, alternate = source("primary"), source("alternate")
+
+        assert await hedge("test").first(primary, alternate) == "primary"
+        assert alternate.calls == []
+
+    async def test_first_response_wins(self):
+        # Given: 먼저 보낸 요청이 기다리는 시간(initial_delay=0.05) 보다 오래 걸림
+        primary, alternate = source("primary", delay=1), source("alternate")
+
+        # Then: 다른 경로의 결과를 쓰고 먼저 보낸 요청은 취소한다
+        assert await hedge("test").first(primary, alternate) == "alternate"
+        await asyncio.sleep(0)
+        assert primary.calls == ["started", "cancelled"]
+        assert hedged_requests.values[("test", "won")] >= 1
+
+    async def test_slow_primary_still_wins_if_alternate_fails(self):
+        primary, alternate = source("primary", delay=0.1), source(error=httpx.ConnectTimeout("timeout"))
+
+        assert await hedge("test").first(primary, alternate) == "primary"
+
+    async def test_failed_primary_waits_for_alternate(self):
+        primary, alternate = source(delay=0.08, error=httpx.ConnectTimeout("timeout")), source("alternate", delay=0.1)
+
+        assert await hedge("test").first(primary, alternate) == "alternate"
+
+    async def test_primary_error_is_raised_when_both_fail(self):
+        primary = source(delay=0.1, error=httpx.ConnectTimeout("primary"))
+        alternate = source(error=httpx.ConnectTimeout("alternate"))
+
+        with pytest.raises(httpx.ConnectTimeout, match="primary"):
+            await hedge("test").first(primary, alternate)
+
+    async def test_hedge_rate_is_capped(self):
+        # Given: 조회 수의 절반까지만 추가 요청을 보내는 hedge
+        hedging = hedge("test", max_ratio=0.5)
+        alternate = source("alternate")
+
+        # When: 느린 요청을 네 번 보내면
+        results = [await hedging.first(source("primary", delay=0.1), alternate) for _ in range(4)]
+
+        # Then: 두 번만 다른 경로로 보낸다
+        assert len(alternate.calls) == 2
+        assert sorted(results) == ["alternate", "alternate", "primary", "primary"]
+
+    async def test_fallback_is_not_capped(self):
+        hedging = hedge("test", max_ratio=0)
+        alternate = source("alternate")
+
+        # When: 먼저 보낸 요청이 결과 없이 바로 끝나면
+        for _ in range(3):
+            assert await hedging.first(source(None), alternate, fallback=True) == "alternate"
+
+        # Then: 한도와 상관없이 다른 경로로 보낸다
+        assert len(alternate.calls) == 3
+
+    async def test_slow_empty_primary_falls_back_without_credit(self):
+        # Given: 추가 요청 한도가 없고, 먼저 보낸 요청이 delay 보다 늦게 결과 없이 끝남
+        hedging = hedge("test", max_ratio=0)
+        alternate = source("alternate")
+
+        # Then: 그래도 다른 경로로 보낸다
+        assert await hedging.first(source(None, delay=0.1), alternate, fallback=True) == "alternate"
+        assert len(alternate.calls) == 1
+
+    async def test_delay_follows_recent_latency(self):
+        hedging = hedge("test")
+        assert hedging.delay == 0.05
+
+        # When: 지연시간이 min_samples 개 이상 모이면
+        for delay in (0.02, 0.02, 0.03, 0.03):
+            await hedging.first(source("primary", delay=delay), source("alternate"))
+
+        # Then: 그 분위수(중간값) 를 기다린다
+        assert 0.03 <= hedging.delay < 0.05
+
+
+@pytest.mark.asyncio
+class TestHedgedOpenGraph:
+    async def test_slow_bookstore_is_hedged_with_opengraph_io(self, ridibooks_opengraph_tags):
+        async def slow_scrape(_: str) -> Optional[OpenGraph]:
+            await asyncio.sleep(1)
+
+        # Given: 서점 페이지 응답이 느림
+        with (
+            patch("functions.scrape_open_graph", AsyncMock(side_effect=slow_scrape)),
+            patch("functions.get_og_tags", AsyncMock(return_value=ridibooks_opengraph_tags)) as mock_get_og_tags,
+        ):
+            og = await asyncio.wait_for(get_open_graph("https://ridibooks.com/books/1354000126"), timeout=0.5)
+
+        # Then: 기다리지 않고 opengraph.io 결과를 쓴다
+        mock_get_og_tags.assert_awaited_once()
+        assert og == OpenGraph.model_validate(ridibooks_opengraph_tags["openGraph"])
+
+    async def test_slow_empty_scrape_falls_back_with_credit_exhausted(self, bookstore_hedge, ridibooks_opengraph_tags):
+        async def slow_empty_scrape(_: str) -> Optional[OpenGraph]:
+            await asyncio.sleep(0.2)
+
+        # Given: 추가 요청 한도를 다 썼고, 서점 페이지가 delay 보다 늦게 태그 없이 응답
+        bookstore_hedge.max_ratio = 0
+        with (
+            patch("functions.scrape_open_graph", AsyncMock(side_effect=slow_empty_scrape)),
+            patch("functions.get_og_tags", AsyncMock(return_value=ridibooks_opengraph_tags)) as mock_get_og_tags,
+        ):
+            og = await get_open_graph("https://ridibooks.com/books/1354000126")
+
+        # Then: opengraph.io 로 fallback 한다
+        mock_get_og_tags.assert_awaited_once()
+        assert og == OpenGraph.model_validate(ridibooks_opengraph_tags["openGraph"])
+
+    async def test_empty_result_is_negatively_cached(self, og_cache):
+        # Given: 어느 경로에서도 태그를 얻지 못함
+        with patch("functions.bookstore_hedge.first", AsyncMock(return_value=None)):
+            assert await get_open_graph("https://ridibooks.com/books/1354000126") is None
+
+        # Then: 캐시에 None 을 넣지 않고 실패로 기록한다
+        assert og_cache.get("https://ridibooks.com/books/1354000126") == (True, None)
+
+    async def test_slow_opengraph_io_is_requested_again(self, ridibooks_opengraph_tags):
+        delays = [1, 0]
+
+        async def og_tags(_: str) -> dict:
+            await asyncio.sleep(delays.pop(0))
+            return ridibooks_opengraph_tags
+
+        # Given: 서점 페이지를 읽을 수 없는 링크인데 opengraph.io 첫 요청이 느림
+        with patch("functions.get_og_tags", AsyncMock(side_effect=og_tags)) as mock_get_og_tags:
+            og = await asyncio.wait_for(get_open_graph("https://www.aladin.co.kr/shop/wproduct.aspx?ItemId=1"), 0.5)
+
+        # Then: 다시 보낸 요청의 결과를 쓴다
+        assert mock_get_og_tags.await_count == 2
+        assert og == OpenGraph.model_validate(ridibooks_opengraph_tags["openGraph"])
@@ -0,0 +1,58 @@
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from http_clients import HttpClientPool
+
+
+@pytest.fixture
+def pool() -> HttpClientPool:
+    return HttpClientPool(max_connections_per_host=4, max_keepalive_connections_per_host=2, keepalive_expiry=5)
+
+
+@pytest.mark.asyncio
+class TestHttpClientPool:
+    async def test_same_host_shares_client(self, pool):
+        # Then: 같은 호스트로 가는 요청은 하나의 클라이언트(커넥션 풀)를 공유한다
+        assert pool.get("https://api.notion.com/v1/pages/") is pool.get("https://api.notion.com/v1/databases/")
+        assert pool.get("https://api.notion.com/v1/pages/") is not pool.get("https://opengraph.io/api/1.1/site/")
+        await pool.aclose()
+
+    async def test_clients_share_ssl_context(self, pool):
+        with patch("http_clients.httpx.create_ssl_context", wraps=httpx.create_ssl_context) as mock_create:
+            pool.get("https://api.notion.com")
+            pool.get("https://opengraph.io")
+
+        # Then: 인증서 묶음은 한 번만 읽는다
+        mock_create.assert_called_once()
+        await pool.aclose()
+
+    async def test_closed_client_is_recreated(self, pool):
+        client = pool.get("https://api.notion.com")
+        await pool.aclose()
+
+        assert client.is_closed
+        assert not pool.get("https://api.notion.com").is_closed
+        await pool.aclose()
+
+    async def test_prewarm_opens_connections_per_host(self, pool):
+        with patch("http_clients.httpx.AsyncClient.head", AsyncMock()) as mock_head:
+            await pool.prewarm(
+                ("https://opengraph.io/api/1.1/site/{book_link}", "https://api.notion.com"),
+                connections_per_host=2,
+                timeout=1,
+            )
+
+        assert sorted(call.args[0] for call in mock_head.await_args_list) == [
+            "https://api.notion.com",
+            "https://api.notion.com",
+            "https://opengraph.io",
+            "https://opengraph.io",
+        ]
+        await pool.aclose()
+
+    async def test_prewarm_failure_does_not_block_startup(self, pool):
+        with patch("http_clients.httpx.AsyncClient.head", AsyncMock(side_effect=httpx.ConnectError("refused"))):
+            await pool.prewarm(("https://api.notion.com",), connections_per_host=1, timeout=1)
+        await pool.aclose()
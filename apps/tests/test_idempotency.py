@@ -0,0 +1,142 @@
+import asyncio
+import json
+import time
+from http import HTTPStatus
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from app import app
+from idempotency import IdempotencyStore, StoredResponse
+
+
+async def submit(submit_data: dict, headers: dict = None) -> httpx.Response:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as async_client:
+        return await async_client.post("/submit-book/", data={"payload": json.dumps(submit_data)}, headers=headers)
+
+
+@pytest.fixture
+def slack(user_profile_success_data, chat_post_success_data, ok_response_from_slack):
+    async def post_message(**_):
+        await asyncio.sleep(0.2)
+        return ok_response_from_slack(chat_post_success_data)
+
+    with (
+        patch(
+            "app.slack_client.users_profile_get",
+            AsyncMock(return_value=ok_response_from_slack(user_profile_success_data)),
+        ) as mock_user_profile,
+        patch("app.slack_client.chat_postMessage", AsyncMock(side_effect=post_message)) as mock_post_message,
+    ):
+        yield mock_user_profile, mock_post_message
+
+
+@pytest.mark.asyncio
+class TestIdempotencyStore:
+    async def test_claim_once(self, idempotency):
+        assert idempotency.try_claim("key") == (True, None)
+        assert idempotency.try_claim("key") == (False, None)
+
+        idempotency.complete("key", HTTPStatus.OK, b"")
+        assert idempotency.try_claim("key") == (False, StoredResponse(HTTPStatus.OK, b""))
+
+    async def test_released_key_can_be_claimed_again(self, idempotency):
+        assert idempotency.try_claim("key") == (True, None)
+        idempotency.release("key")
+
+        assert idempotency.try_claim("key") == (True, None)
+
+    async def test_shared_across_workers(self, idempotency):
+        # Given: 같은 파일을 쓰는 다른 워커가 처리 중인 키
+        other_worker = IdempotencyStore(path=idempotency.path, ttl=60, lease=0.05, poll_interval=0.01)
+        assert other_worker.try_claim("key") == (True, None)
+
+        # Then: 끝날 때까지 기다리고 그 결과를 받는다
+        asyncio.get_running_loop().call_later(0.05, other_worker.complete, "key", HTTPStatus.OK, b"done")
+        assert await idempotency.claim("key", timeout=1) == (False, StoredResponse(HTTPStatus.OK, b"done"))
+
+    async def test_expired_lease_is_taken_over(self, idempotency):
+        # Given: 처리하던 워커가 lease 안에 끝내지 못함
+        other_worker = IdempotencyStore(path=idempotency.path, ttl=60, lease=0.05, poll_interval=0.01)
+        assert other_worker.try_claim("key") == (True, None)
+        await asyncio.sleep(0.1)
+
+        assert idempotency.try_claim("key") == (True, None)
+
+    async def test_wait_times_out(self, idempotency):
+        assert idempotency.try_claim("key") == (True, None)
+
+        started = time.monotonic()
+        assert await idempotency.claim("key", timeout=0.05) == (False, None)
+        assert time.monotonic() - started < 0.5
+
+
+@pytest.mark.asyncio
+class TestDuplicateSubmission:
+    async def test_slack_retry_is_dropped(self, slack, book_submit_data, outbox):
+        mock_user_profile, mock_post_message = slack
+        submit_data = book_submit_data(bookstore_url="https://ridibooks.com/books/1354000126")
+
+        # When: 슬랙이 같은 제출을 다시 보내면
+        first = await submit(submit_data)
+        retry = await submit(submit_data, headers={"X-Slack-Retry-Num": "1", "X-Slack-Retry-Reason": "http_timeout"})
+
+        # Then: 프로필 조회, 메세지 전송, 노션 아카이빙 모두 한 번만
+        assert (first.status_code, first.content) == (retry.status_code, retry.content) == (HTTPStatus.OK, b"")
+        mock_user_profile.assert_called_once()
+        mock_post_message.assert_called_once()
+        assert outbox.depth() == 1
+
+    async def test_double_click_waits_for_first_submission(self, slack, book_submit_data, outbox):
+        _, mock_post_message = slack
+        submit_data = book_submit_data(bookstore_url="https://ridibooks.com/books/1354000126")
+
+        # When: 제출을 처리하는 중에 한 번 더 누르면
+        responses = await asyncio.gather(submit(submit_data), submit(submit_data))
+
+        # Then: 두 번째 제출은 첫 번째 결과를 기다렸다가 같은 응답을 받는다
+        assert [(response.status_code, response.content) for response in responses] == [(HTTPStatus.OK, b"")] * 2
+        mock_post_message.assert_called_once()
+        assert outbox.depth() == 1
+
+    async def test_other_submissions_are_not_dropped(self, slack, book_submit_data):
+        _, mock_post_message = slack
+        submit_data = book_submit_data(bookstore_url="https://ridibooks.com/books/1354000126")
+        await submit(submit_data)
+
+        # When: 같은 다이얼로그여도 내용을 바꿔서 제출하거나, 다른 다이얼로그로 같은 내용을 제출하면
+        submit_data["submission"]["recommend_reason"] = "다시 읽어도 재밌어요"
+        await submit(submit_data)
+        submit_data["callback_id"] = "another-dialog"
+        await submit(submit_data)
+
+        assert mock_post_message.call_count == 3
+
+    async def test_failed_submission_can_be_retried(
+        self, book_submit_data, user_profile_success_data, chat_post_success_data, ok_response_from_slack
+    ):
+        # Given: 첫 번째 메세지 전송은 실패
+        with (
+            patch(
+                "app.slack_client.users_profile_get",
+                AsyncMock(return_value=ok_response_from_slack(user_profile_success_data)),
+            ),
+            patch(
+                "app.slack_client.chat_postMessage",
+                AsyncMock(
+                    side_effect=[
+                        ok_response_from_slack({"ok": False, "error": "fatal_error"}),
+                        ok_response_from_slack(chat_post_success_data),
+                    ]
+                ),
+            ) as mock_post_message,
+        ):
+            submit_data = book_submit_data(bookstore_url="https://ridibooks.com/books/1354000126")
+            failed = await submit(submit_data)
+            retried = await submit(submit_data)
+
+        # Then: 에러를 보여준 제출은 기록하지 않으므로 다시 제출하면 처리한다
+        assert failed.content == b"fatal_error"
+        assert retried.content == b""
+        assert mock_post_message.call_count == 2
@@ -0,0 +1,80 @@
+import json
+import random
+from http import HTTPStatus
+from urllib.parse import parse_qs, quote_plus, unquote_to_bytes, urlencode
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import app
+from dtos.slack.book_submission import BookSubmitPayload
+from interactions import extract_payload, unquote_plus_bytes
+
+
+client = TestClient(app)
+
+
+@pytest.mark.asyncio
+class TestExtractPayload:
+    async def test_same_as_form_parser(self, book_submit_data):
+        # Given: 공백, +, &, = 와 한글이 들어간 추천 이유
+        data = book_submit_data(bookstore_url="https://ridibooks.com/books/1354000126?a=1&b=2")
+        data["submission"]["recommend_reason"] = "1+1 = 2 & 부의 추월차선 %20"
+        body = urlencode({"token": "x", "payload": json.dumps(data, ensure_ascii=False), "extra": "y"}).encode()
+
+        # When
+        payload = extract_payload(body)
+
+        # Then: 일반 폼 파서와 같은 결과를 얻는다
+        assert payload.decode() == parse_qs(body.decode())["payload"][0]
+        assert BookSubmitPayload.model_validate_json(payload) == BookSubmitPayload.model_validate(data)
+
+    async def test_missing_payload(self):
+        assert extract_payload(b"token=x&payloads=y") is None
+        assert extract_payload(b"") is None
+
+
+@pytest.mark.asyncio
+class TestInteractionPayload:
+    @pytest.mark.parametrize(
+        "body",
+        [
+            {"token": "x"},
+            {"payload": "{not json"},
+            {"payload": json.dumps({"type": "dialog_submission"})},
+        ],
+    )
+    async def test_reject_malformed_payload(self, body):
+        response = client.post(
+            "/submit-book/", data=body, headers={"Content-Type": "application/x-www-form-urlencoded"}
+        )
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    async def test_multipart_form_is_also_accepted(self, book_submit_data):
+        # When: urlencoded 가 아닌 폼으로 보내면
+        response = client.post(
+            "/submit-book/",
+            files={"payload": (None, json.dumps(book_submit_data(bookstore_url="https://example")))},
+        )
+
+        # Then: 일반 폼 파서로 읽어서 검증까지 진행한다
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == {"errors": [{"name": "bookstore_url", "error": "유효하지 않은 URL입니다."}]}
+
+
+@pytest.mark.asyncio
+class TestUnquotePlusBytes:
+    @pytest.mark.parametrize(
+        "value",
+        [b"a+b%2Bc", b"%ED%95%9C%EA%B8%80", b"%3d%3D=", b"100%", b"%zz%4", b"%0D%0A=%0A", b"a=%20\r\n", b""],
+    )
+    async def test_same_as_unquote_plus(self, value):
+        assert unquote_plus_bytes(value) == unquote_to_bytes(value.replace(b"+", b" "))
+
+    async def test_round_trip_random_text(self):
+        alphabet = "ab =%+&_\n\r\t\\\"'?한글📖"
+        rng = random.Random(0)
+        for _ in range(2000):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+            assert unquote_plus_bytes(quote_plus(text).encode()) == text.encode()
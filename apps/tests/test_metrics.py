@@ -0,0 +1,143 @@
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import app
+from metrics import Counter, Gauge, Histogram, Registry, registry
+
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def metrics_registry(tmp_path) -> Registry:
+    # 앱 전역 레지스트리를 테스트마다 비어있는 상태로 사용
+    directory = registry.directory
+    registry.directory = str(tmp_path / "metrics")
+    for metric in registry.metrics.values():
+        metric.values.clear()
+    yield registry
+    registry.directory = directory
+
+
+def worker_registry(directory: str) -> Registry:
+    worker = Registry(directory=directory)
+    worker.register(Counter("jobs_total", "jobs", ("result",)))
+    worker.register(Histogram("latency_seconds", "latency", ("stage",), buckets=(0.1, 1)))
+    worker.register(Gauge("in_flight", "in flight"))
+    return worker
+
+
+@pytest.mark.asyncio
+class TestRegistry:
+    async def test_render_prometheus_text_format(self, tmp_path):
+        worker = worker_registry(str(tmp_path))
+        worker.metrics["jobs_total"].inc(result="done")
+        worker.metrics["latency_seconds"].observe(0.05, stage="parse")
+        worker.metrics["latency_seconds"].observe(0.5, stage="parse")
+        worker.metrics["latency_seconds"].observe(3, stage="parse")
+
+        assert worker.render().splitlines() == [
+            "# HELP jobs_total jobs",
+            "# TYPE jobs_total counter",
+            'jobs_total{result="done"} 1.0',
+            "# HELP latency_seconds latency",
+            "# TYPE latency_seconds histogram",
+            'latency_seconds_bucket{stage="parse",le="0.1"} 1',
+            'latency_seconds_bucket{stage="parse",le="1.0"} 2',
+            'latency_seconds_bucket{stage="parse",le="+Inf"} 3',
+            'latency_seconds_sum{stage="parse"} 3.55',
+            'latency_seconds_count{stage="parse"} 3',
+            "# HELP in_flight in flight",
+            "# TYPE in_flight gauge",
+        ]
+
+    async def test_aggregate_across_workers(self, tmp_path):
+        # Given: 같은 디렉토리를 쓰는 두 워커
+        first, second = worker_registry(str(tmp_path)), worker_registry(str(tmp_path))
+        first.metrics["jobs_total"].inc(result="done")
+        first.metrics["latency_seconds"].observe(0.05, stage="parse")
+        first.metrics["in_flight"].set(2)
+        second.metrics["jobs_total"].inc(2, result="done")
+        second.metrics["latency_seconds"].observe(0.5, stage="parse")
+        second.metrics["in_flight"].set(3)
+        with patch("metrics.os.getpid", return_value=1):
+            second.flush()
+
+        # When: 첫 번째 워커가 /metrics 요청을 받으면
+        collected = first.collect()
+
+        # Then: 모든 워커의 값을 더해서 응답한다
+        assert collected["jobs_total"] == {("done",): 3}
+        assert collected["latency_seconds"][("parse",)]["buckets"] == [1, 1, 0]
+        assert collected["in_flight"] == {(): 5}
+
+        # When: 두 번째 워커가 종료되면
+        first.mark_process_dead(1)
+
+        # Then: 카운터는 유지하고 게이지에서만 뺀다
+        collected = first.collect()
+        assert collected["jobs_total"] == {("done",): 3}
+        assert collected["in_flight"] == {(): 2}
+
+    async def test_escape_label_values(self, tmp_path):
+        worker = worker_registry(str(tmp_path))
+        worker.metrics["jobs_total"].inc(result='say "hi"\n')
+
+        assert 'jobs_total{result="say \\"hi\\"\\n"} 1.0' in worker.render()
+
+
+@pytest.mark.asyncio
+class TestMetricsEndpoint:
+    async def test_submit_book_metrics(
+        self,
+        metrics_registry,
+        book_submit_data,
+        user_profile_success_data,
+        chat_post_success_data,
+        ok_response_from_slack,
+    ):
+        # Given: 도서 추천 한 건
+        with (
+            patch(
+                "app.slack_client.users_profile_get",
+                AsyncMock(return_value=ok_response_from_slack(user_profile_success_data)),
+            ),
+            patch(
+                "app.slack_client.chat_postMessage",
+                AsyncMock(return_value=ok_response_from_slack(chat_post_success_data)),
+            ),
+        ):
+            client.post(
+                "/submit-book/",
+                data={"payload": json.dumps(book_submit_data(bookstore_url="https://ridibooks.com/books/1354000126"))},
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+            )
+
+        # When
+        response = client.get("/metrics")
+
+        # Then: 단계별/업스트림별 지연시간, 결과, 아카이빙 대기열 깊이를 내보낸다
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        lines = response.text.splitlines()
+        assert 'bookk_handler_outcomes_total{handler="submit_book",outcome="ok"} 1.0' in lines
+        assert 'bookk_request_duration_seconds_count{handler="submit_book"} 1' in lines
+        for stage in ("parse_form", "decode", "validate", "profile_lookup", "announce"):
+            assert f'bookk_stage_duration_seconds_count{{handler="submit_book",stage="{stage}"}} 1' in lines
+        assert 'bookk_upstream_duration_seconds_count{upstream="slack",operation="chat.postMessage"} 1' in lines
+        assert "bookk_outbox_depth 1.0" in lines
+        assert 'bookk_in_flight_requests{handler="submit_book"} 0.0' in lines
+        assert 'bookk_in_flight_requests{handler="metrics"} 1.0' in lines
+
+    async def test_count_slack_errors(self, metrics_registry, ok_response_from_slack):
+        with patch(
+            "app.slack_client.api_call",
+            AsyncMock(return_value=ok_response_from_slack({"ok": False, "error": "expired_trigger_id"})),
+        ):
+            client.post("/open-form/", data={"trigger_id": "1234"})
+
+        lines = client.get("/metrics").text.splitlines()
+        assert 'bookk_handler_outcomes_total{handler="open_form",outcome="slack_error"} 1.0' in lines
+        assert 'bookk_errors_total{source="slack",error="expired_trigger_id"} 1.0' in lines
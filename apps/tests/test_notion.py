@@ -0,0 +1,127 @@
+import asyncio
+import time
+from http import HTTPStatus
+
+import pytest
+
+from dtos.internal.book import Book
+from dtos.opengraph import OpenGraphIOResponse
+from functions import post_book_to_notion
+from notion import NotionError
+from ratelimit import AdaptiveConcurrencyLimit, TokenBucket
+
+
+@pytest.mark.asyncio
+class TestNotionClient:
+    async def test_retry_after_is_honoured(self, notion_client, fake_notion):
+        # Given: 노션이 두 번 연속으로 429 를 응답
+        fake_notion.fail_next(HTTPStatus.TOO_MANY_REQUESTS, times=2, retry_after=0.05)
+
+        started = time.monotonic()
+        page = await notion_client.create_page({"properties": {}})
+
+        # Then: Retry-After 만큼 기다렸다가 재시도해서 저장한다
+        assert page["object"] == "page"
+        assert len(fake_notion.requests) == 3
+        assert time.monotonic() - started >= 0.1
+
+    async def test_client_error_is_not_retried(self, notion_client, fake_notion):
+        fake_notion.fail_next(HTTPStatus.BAD_REQUEST)
+
+        with pytest.raises(NotionError) as e:
+            await notion_client.create_page({"properties": {}})
+
+        assert e.value.status_code == HTTPStatus.BAD_REQUEST
+        assert len(fake_notion.requests) == 1
+
+    async def test_gives_up_after_max_retries(self, notion_client, fake_notion):
+        fake_notion.fail_next(HTTPStatus.SERVICE_UNAVAILABLE, times=3, retry_after=0)
+
+        with pytest.raises(NotionError):
+            await notion_client.update_page("page-id", {"properties": {}})
+        assert len(fake_notion.requests) == notion_client.max_retries + 1
+
+    async def test_server_error_on_create_is_not_retried(self, notion_client, fake_notion):
+        # Given: 노션이 페이지를 만들다가 502 를 응답 (실제로는 만들어졌을 수도 있음)
+        fake_notion.fail_next(HTTPStatus.BAD_GATEWAY, retry_after=0)
+
+        with pytest.raises(NotionError) as e:
+            await notion_client.create_page({"properties": {}})
+
+        # Then: 같은 페이지가 두 번 생기지 않도록 다시 보내지 않는다
+        assert e.value.status_code == HTTPStatus.BAD_GATEWAY
+        assert len(fake_notion.requests) == 1
+
+    async def test_server_error_on_query_is_retried(self, notion_client, fake_notion):
+        fake_notion.fail_next(HTTPStatus.BAD_GATEWAY, retry_after=0)
+
+        await notion_client.query_database("database-id", {})
+
+        assert len(fake_notion.requests) == 2
+
+    async def test_concurrent_writes_of_same_book_are_coalesced(self, notion_client, fake_notion):
+        fake_notion.latency = 0.02
+
+        # When: 같은 책을 동시에 여러 번 저장
+        pages = await asyncio.gather(
+            *(notion_client.create_page({"properties": {}}, dedupe_key="ridibooks.com/books/1") for _ in range(5))
+        )
+
+        # Then: 노션에는 한 번만 저장한다
+        assert len(fake_notion.pages) == 1
+        assert len({page["id"] for page in pages}) == 1
+
+    async def test_burst_is_throttled(self, notion_client, fake_notion):
+        notion_client.bucket = TokenBucket(rate=50, capacity=1)
+
+        started = time.monotonic()
+        await asyncio.gather(*(notion_client.create_page({"properties": {"n": n}}) for n in range(6)))
+
+        # Then: 토큰 버킷 속도(초당 50회) 를 넘지 않는다
+        assert time.monotonic() - started >= 0.09
+        assert len(fake_notion.pages) == 6
+
+    async def test_concurrency_adapts_to_throttling(self, notion_client, fake_notion):
+        for _ in range(20):
+            await notion_client.create_page({"properties": {}})
+        grown = notion_client.concurrency.limit
+        assert grown > 2
+
+        fake_notion.fail_next(HTTPStatus.TOO_MANY_REQUESTS, retry_after=0)
+        await notion_client.create_page({"properties": {}})
+        assert notion_client.concurrency.limit < grown
+
+    async def test_post_book_to_notion_fails_on_notion_error(self, fake_notion, og_cache, ridibooks_opengraph_tags):
+        book = Book(
+            category="경제일반", bookstore_url="https://ridibooks.com/books/1", recommend_reason="-", recommender="-"
+        )
+        og_cache.set(book.bookstore_url, OpenGraphIOResponse.model_validate(ridibooks_opengraph_tags).open_graph)
+        fake_notion.fail_next(HTTPStatus.BAD_REQUEST)
+
+        assert not await post_book_to_notion(book)
+        assert await post_book_to_notion(book)
+
+
+@pytest.mark.asyncio
+class TestAdaptiveConcurrencyLimit:
+    async def test_in_flight_requests_are_bounded(self):
+        limiter = AdaptiveConcurrencyLimit(initial=2, minimum=1, maximum=2, latency_target=1)
+        running, peak = 0, 0
+
+        async def call():
+            nonlocal running, peak
+            await limiter.acquire()
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            limiter.release(latency=0.01)
+
+        await asyncio.gather(*(call() for _ in range(10)))
+        assert peak == 2
+
+    async def test_slow_responses_shrink_limit(self):
+        limiter = AdaptiveConcurrencyLimit(initial=8, minimum=1, maximum=10, latency_target=0.5)
+        await limiter.acquire()
+        limiter.release(latency=1)
+        assert limiter.limit == pytest.approx(7.2)
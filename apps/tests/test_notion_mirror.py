@@ -0,0 +1,123 @@
+from http import HTTPStatus
+from unittest.mock import patch
+
+import pytest
+
+from dtos.internal.book import Book
+from dtos.opengraph import OpenGraphIOResponse
+from functions import post_book_to_notion
+from notion import NotionError
+
+
+def notion_page(title: str, url: str, categories=("경제일반", "경영/경제")) -> dict:
+    # 페이지를 만들 때 보내는 본문
+    return {
+        "properties": {
+            "title": {"title": [{"type": "text", "text": {"content": title}}]},
+            "URL": {"type": "url", "url": url},
+            "category": {"multi_select": [{"name": name} for name in categories]},
+            "recommender": {"rich_text": [{"type": "text", "text": {"content": "김북크"}}]},
+            "recommend reason": {"rich_text": [{"type": "text", "text": {"content": "재밌어요"}}]},
+        }
+    }
+
+
+@pytest.mark.asyncio
+class TestNotionMirror:
+    async def test_incremental_sync(self, notion_mirror, notion_client, fake_notion):
+        # Given: 노션에 책 세 권 (한 번에 두 권씩 조회)
+        for n in range(3):
+            await notion_client.create_page(notion_page(f"책 {n}", f"https://ridibooks.com/books/{n}"))
+
+        # When
+        assert await notion_mirror.sync(notion_client) == 3
+
+        # Then
+        assert notion_mirror.count() == 3
+        assert [book.title for book in notion_mirror.recent()] == ["책 2", "책 1", "책 0"]
+
+        # When: 한 권이 수정된 뒤 다시 동기화하면
+        page_id = notion_mirror.find_by_url("https://ridibooks.com/books/0")[0].id
+        fake_notion.requests.clear()
+        await notion_client.update_page(
+            page_id, {"properties": {"title": notion_page("고친 책", "")["properties"]["title"]}}
+        )
+        await notion_mirror.sync(notion_client)
+
+        # Then: 마지막으로 본 시각 이후에 수정된 페이지만 가져온다
+        query = [request for request in fake_notion.requests if request[1].endswith("/query")]
+        assert len(query) == 1
+        assert notion_mirror.find_by_url("https://ridibooks.com/books/0")[0].title == "고친 책"
+
+    async def test_full_sync_removes_deleted_pages(self, notion_mirror, notion_client):
+        # Given
+        first = await notion_client.create_page(notion_page("책 0", "https://ridibooks.com/books/0"))
+        await notion_client.create_page(notion_page("책 1", "https://ridibooks.com/books/1"))
+        await notion_mirror.sync(notion_client)
+
+        # When: 노션에서 한 권이 지워지면
+        await notion_client.update_page(first["id"], {"archived": True})
+        await notion_mirror.sync(notion_client)
+
+        # Then: 증분 동기화로는 알 수 없고, 전체 동기화에서 지운다
+        assert await notion_mirror.sync(notion_client, full=True) == 1
+        assert [book.title for book in notion_mirror.recent()] == ["책 1"]
+
+    async def test_find_by_url_and_category(self, notion_mirror, notion_client):
+        await notion_client.create_page(notion_page("책 0", "https://www.yes24.com/Product/Goods/1?pid=1"))
+        await notion_client.create_page(notion_page("책 1", "https://ridibooks.com/books/1", categories=("시", "시/에세이")))
+        await notion_mirror.sync(notion_client)
+
+        assert [book.title for book in notion_mirror.find_by_url("http://m.yes24.com/Goods/Detail/1")] == ["책 0"]
+        assert notion_mirror.find_by_url("https://ridibooks.com/books/2") == []
+        assert notion_mirror.count(category="시/에세이") == 1
+        assert [book.title for book in notion_mirror.recent(category="경영/경제")] == ["책 0"]
+
+    async def test_write_through(self, notion_mirror, fake_notion, og_cache, ridibooks_opengraph_tags):
+        # Given
+        og_cache.set(
+            "https://ridibooks.com/books/1", OpenGraphIOResponse.model_validate(ridibooks_opengraph_tags).open_graph
+        )
+        book = Book(
+            category="경제일반",
+            bookstore_url="https://ridibooks.com/books/1",
+            recommend_reason="재밌어요",
+            recommender="김북크",
+        )
+
+        # When: 노션에 저장에 실패하면 기록하지 않고, 성공하면 동기화 전에도 바로 조회된다
+        fake_notion.fail_next(HTTPStatus.BAD_REQUEST)
+        assert not await post_book_to_notion(book)
+        assert notion_mirror.count() == 0
+
+        assert await post_book_to_notion(book)
+
+        # Then
+        [mirrored] = notion_mirror.find_by_url(book.bookstore_url)
+        assert mirrored.categories == ["경제일반", "경영/경제"]
+        assert mirrored.recommender == "김북크"
+        assert mirrored.recommend_reason == "재밌어요"
+
+    async def test_sync_failure_keeps_cursor(self, notion_mirror, notion_client):
+        # Given: 두 번째 묶음을 받다가 실패
+        for n in range(3):
+            await notion_client.create_page(notion_page(f"책 {n}", f"https://ridibooks.com/books/{n}"))
+        query_database = notion_client.query_database
+
+        async def fail_second_query(database_id: str, query: dict) -> dict:
+            if "start_cursor" in query:
+                raise NotionError(HTTPStatus.BAD_GATEWAY, "")
+            return await query_database(database_id, query)
+
+        with patch.object(notion_client, "query_database", fail_second_query), pytest.raises(NotionError):
+            await notion_mirror.sync(notion_client)
+
+        # Then: 첫 번째 묶음까지는 반영하고, 다음 동기화는 거기서부터 이어간다
+        assert notion_mirror.count() == 2
+        assert notion_mirror.cursor() == notion_mirror.recent()[0].last_edited_time
+        assert await notion_mirror.sync(notion_client) == 2
+        assert notion_mirror.count() == 3
+
+    async def test_only_one_worker_holds_sync_lease(self, notion_mirror):
+        assert notion_mirror.try_lease(60)
+        assert not notion_mirror.try_lease(60)
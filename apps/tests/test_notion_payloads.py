@@ -0,0 +1,73 @@
+import json
+from typing import Optional
+
+import httpx
+import pytest
+
+from dtos.internal.book import Book
+from dtos.notion.book_submission import BookSubmission, BookSubmissionProperties
+from dtos.notion.database import Database
+from dtos.notion.image_block import Image, ImageBlock, ImageUrl
+from dtos.notion.text import BookUrl, Category, CategoryName, Content, Recommender, RecommendReason, TextContent, Title
+from dtos.opengraph import ImageUrl as OpenGraphImageUrl
+from dtos.opengraph import OpenGraph
+from notion_payloads import book_page
+
+
+def dto_page(book: Book, og: Optional[OpenGraph]) -> dict:
+    # 템플릿으로 바꾸기 전에 functions.create_book_page 가 만들던 페이지
+    return BookSubmission(
+        parent=Database(),
+        properties=BookSubmissionProperties(
+            title=Title(title=[TextContent(text=Content(content=og.title))] if og else []),
+            URL=BookUrl(url=book.bookstore_url),
+            category=Category(
+                multi_select=[CategoryName(name=name) for name in (book.category, book.parent_category) if name],
+            ),
+            recommender=Recommender(rich_text=[TextContent(text=Content(content=book.recommender))]),
+            recommend_reason=RecommendReason(rich_text=[TextContent(text=Content(content=book.recommend_reason))]),
+        ),
+        children=[ImageBlock(image=Image(external=ImageUrl(url=og.image.url)))] if og else [],
+    ).model_dump(by_alias=True)
+
+
+BOOKS = [
+    (
+        Book(
+            category="경제일반",
+            bookstore_url="https://ridibooks.com/books/1354000126",
+            recommend_reason="재밌어요",
+            recommender="김북크",
+        ),
+        OpenGraph(title="부의 추월차선", image=OpenGraphImageUrl(url="https://img.ridicdn.net/cover/1354000126/xxlarge#1")),
+    ),
+    (
+        Book(
+            category="소설",
+            bookstore_url="https://www.yes24.com/Product/Goods/142763152",
+            recommend_reason='"따옴표" 와 \\역슬래시\\,\n줄바꿈\t탭 그리고 😀',
+            recommender="O'Brien",
+        ),
+        OpenGraph(title="제목 \u0000  ", image=OpenGraphImageUrl(url="https://image.yes24.com/goods/142763152/XL")),
+    ),
+    # 오픈그래프 태그 없이 만드는 페이지, 카테고리 목록에 없는 카테고리
+    (
+        Book(
+            category="미분류",
+            bookstore_url="https://ridibooks.com/books/1",
+            recommend_reason="",
+            recommender="김북크",
+        ),
+        None,
+    ),
+]
+
+
+class TestBookPage:
+    @pytest.mark.parametrize("book, og", BOOKS)
+    def test_same_bytes_as_dto(self, book, og):
+        page = dto_page(book, og)
+
+        # Then: httpx 가 DTO 를 json= 으로 보내던 것과 바이트 단위로 같다
+        assert book_page(book, og) == httpx.Request("POST", "https://api.notion.com/v1/pages/", json=page).content
+        assert json.loads(book_page(book, og)) == page
@@ -0,0 +1,107 @@
+import sqlite3
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import ConnectTimeout
+
+from dtos.opengraph import OpenGraph
+from functions import get_open_graph
+from bookstores import canonicalize_url
+from og_cache import OpenGraphCache
+
+
+@pytest.mark.asyncio
+class TestOpenGraphCache:
+    async def test_repeated_book_skips_opengraph_api(self, og_cache, yes24_opengraph_tags):
+        # Given: 같은 책을 두 번 조회
+        with patch("functions.get_og_tags", AsyncMock(return_value=yes24_opengraph_tags)) as mock_get_og_tags:
+            first = await get_open_graph("https://www.yes24.com/Product/Goods/106369008")
+            second = await get_open_graph("https://yes24.com/Product/Goods/106369008/")
+
+        # Then: 두 번째 조회는 opengraph.io 를 거치지 않는다
+        mock_get_og_tags.assert_awaited_once()
+        assert first == second == OpenGraph.model_validate(yes24_opengraph_tags["openGraph"])
+        assert og_cache.stats() == {"hits": 1, "negative_hits": 0, "misses": 1}
+
+    async def test_failed_lookup_is_negatively_cached(self, og_cache):
+        # Given: opengraph.io 조회 실패
+        with patch("functions.get_og_tags", AsyncMock(side_effect=ConnectTimeout("timeout"))) as mock_get_og_tags:
+            first = await get_open_graph("https://ridibooks.com/books/1354000126")
+            second = await get_open_graph("https://ridibooks.com/books/1354000126")
+
+        # Then: 실패한 링크는 negative_ttl 동안 다시 조회하지 않는다
+        assert first is None and second is None
+        mock_get_og_tags.assert_awaited_once()
+        assert og_cache.stats() == {"hits": 0, "negative_hits": 1, "misses": 1}
+
+    async def test_expired_entry_is_fetched_again(self, og_cache, ridibooks_opengraph_tags):
+        book_link = "https://ridibooks.com/books/1354000126"
+        with patch("functions.get_og_tags", AsyncMock(return_value=ridibooks_opengraph_tags)) as mock_get_og_tags:
+            await get_open_graph(book_link)
+
+            # When: TTL 이 지난 뒤 다시 조회
+            with patch("og_cache.time.time", return_value=10**10):
+                await get_open_graph(book_link)
+
+        # Then: opengraph.io 를 다시 호출한다
+        assert mock_get_og_tags.await_count == 2
+
+    async def test_least_recently_used_entry_is_evicted(self, tmp_path, ridibooks_opengraph_tags):
+        cache = OpenGraphCache(path=str(tmp_path / "lru.sqlite3"), ttl=60, negative_ttl=60, max_entries=2)
+        og = OpenGraph.model_validate(ridibooks_opengraph_tags["openGraph"])
+
+        # Given: 최대 2개까지 저장하는 캐시에 3권을 저장 (첫번째 책은 중간에 다시 조회)
+        now = time.time()
+        with patch("og_cache.time.time", side_effect=[now - 3, now - 2, now - 1, now]):
+            cache.set("https://ridibooks.com/books/1", og)
+            cache.set("https://ridibooks.com/books/2", og)
+            cache.get("https://ridibooks.com/books/1")
+            cache.set("https://ridibooks.com/books/3", og)
+
+        # Then: 가장 오래 조회되지 않은 두번째 책이 제거된다
+        assert cache.get("https://ridibooks.com/books/1") == (True, og)
+        assert cache.get("https://ridibooks.com/books/2") == (False, None)
+        assert cache.get("https://ridibooks.com/books/3") == (True, og)
+
+    @pytest.mark.parametrize(
+        "book_link",
+        [
+            "https://ridibooks.com/books/1354000008",
+            "http://www.ridibooks.com/books/1354000008/",
+            "https://RIDIBOOKS.com/books/1354000008?_s=search&_q=부의+추월차선",
+            "https://ridibooks.com/books/1354000008#reviews",
+        ],
+    )
+    async def test_canonicalize_url(self, book_link):
+        assert canonicalize_url(book_link) == "https://ridibooks.com/books/1354000008"
+
+    async def test_shared_file_uses_wal(self, og_cache):
+        og_cache.get("https://ridibooks.com/books/1354000126")
+
+        assert og_cache._connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    async def test_reconnect_after_fork(self, og_cache, ridibooks_opengraph_tags):
+        og = OpenGraph.model_validate(ridibooks_opengraph_tags["openGraph"])
+        og_cache.set("https://ridibooks.com/books/1354000126", og)
+        before = og_cache._connection
+
+        # When: 마스터에서 연 연결을 물려받은 워커라면 (pid 가 다르면)
+        og_cache._pid = -1
+
+        # Then: 새로 연결한다
+        assert og_cache.get("https://ridibooks.com/books/1354000126") == (True, og)
+        assert og_cache._connection is not before
+
+    async def test_locked_cache_does_not_fail_lookup(self, og_cache, ridibooks_opengraph_tags):
+        # Given: 다른 워커가 캐시 파일을 잠가서 읽고 쓰지 못함
+        locked = sqlite3.OperationalError("database is locked")
+        with (
+            patch.object(og_cache, "get", side_effect=locked),
+            patch.object(og_cache, "set", side_effect=locked),
+            patch("functions.get_og_tags", AsyncMock(return_value=ridibooks_opengraph_tags)),
+        ):
+            og = await get_open_graph("https://ridibooks.com/books/1354000126")
+
+        # Then: 캐시 없이 조회한 결과를 쓴다
+        assert og == OpenGraph.model_validate(ridibooks_opengraph_tags["openGraph"])
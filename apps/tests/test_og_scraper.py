@@ -0,0 +1,124 @@
+import os
+from typing import Callable
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from dtos.opengraph import OpenGraph, ImageUrl
+from functions import get_open_graph
+from http_clients import HttpClientPool
+from og_scraper import scrape_open_graph
+
+
+HTML_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "html")
+CHUNK_SIZE = 4096
+
+
+class BookstorePages:
+    def __init__(self):
+        self.pages = {}
+        self.sent = 0
+
+    def serve(self, url: str, filename: str, content_type: str = "text/html; charset=utf-8", status_code: int = 200):
+        with open(os.path.join(HTML_DIR, filename), "rb") as f:
+            self.pages[url] = (f.read(), content_type, status_code)
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        body, content_type, status_code = self.pages[str(request.url)]
+
+        async def stream():
+            for start in range(0, len(body), CHUNK_SIZE):
+                chunk = body[start:][:CHUNK_SIZE]
+                self.sent += len(chunk)
+                yield chunk
+
+        return httpx.Response(status_code, headers={"content-type": content_type}, content=stream())
+
+
+@pytest.fixture
+def bookstore_pages() -> Callable:
+    pages = BookstorePages()
+    pool = HttpClientPool(
+        max_connections_per_host=1,
+        max_keepalive_connections_per_host=1,
+        keepalive_expiry=1,
+        transport=httpx.MockTransport(pages.handler),
+    )
+    with patch("og_scraper.http_clients", pool):
+        yield pages
+
+
+@pytest.mark.asyncio
+class TestOpenGraphScraper:
+    async def test_scrape_ridibooks(self, bookstore_pages):
+        url = "https://ridibooks.com/books/1354000126"
+        bookstore_pages.serve(url, "ridibooks_1354000126.html")
+
+        og = await scrape_open_graph(url)
+
+        # Then: 스킴이 생략된 이미지 주소도 절대 경로로 바꿔서 반환한다
+        assert og == OpenGraph(
+            title="부의 추월차선(10주년 기념 에디션)",
+            image=ImageUrl(url="https://img.ridicdn.net/cover/1354000126/xxlarge#1"),
+            isbn="9791191347572",
+        )
+        # Then: 태그를 모두 찾으면 나머지 본문은 내려받지 않는다
+        assert bookstore_pages.sent < os.path.getsize(os.path.join(HTML_DIR, "ridibooks_1354000126.html")) / 4
+
+    async def test_scrape_yes24_with_euc_kr_charset(self, bookstore_pages):
+        url = "https://www.yes24.com/Product/Goods/106369008"
+        bookstore_pages.serve(url, "yes24_106369008.html", content_type="text/html; charset=euc-kr")
+
+        og = await scrape_open_graph(url)
+
+        assert og == OpenGraph(
+            title="부의 추월차선 (10주년 스페셜 에디션) - 예스24",
+            image=ImageUrl(url="https://image.yes24.com/goods/106369008/XL"),
+        )
+        assert bookstore_pages.sent == CHUNK_SIZE
+
+    async def test_page_without_og_tags_in_head(self, bookstore_pages):
+        url = "https://www.yes24.com/Product/Search?domain=BOOK&query=abc"
+        bookstore_pages.serve(url, "yes24_search.html")
+
+        # Then: <head> 가 끝나면 본문에 있는 태그는 보지 않고 조회를 멈춘다
+        assert await scrape_open_graph(url) is None
+        assert bookstore_pages.sent == CHUNK_SIZE
+
+    async def test_unexpected_status_code(self, bookstore_pages):
+        url = "https://ridibooks.com/books/1354000126"
+        bookstore_pages.serve(url, "ridibooks_1354000126.html", status_code=404)
+
+        assert await scrape_open_graph(url) is None
+
+    async def test_link_without_scheme(self, bookstore_pages):
+        bookstore_pages.serve("https://ridibooks.com/books/1354000126", "ridibooks_1354000126.html")
+
+        # Then: 스킴 없이 입력한 링크는 https 로 요청한다
+        og = await scrape_open_graph("ridibooks.com/books/1354000126")
+        assert og.title == "부의 추월차선(10주년 기념 에디션)"
+
+    async def test_unsupported_bookstore_is_not_requested(self, bookstore_pages):
+        assert await scrape_open_graph("https://www.aladin.co.kr/shop/wproduct.aspx?ItemId=1") is None
+        assert bookstore_pages.sent == 0
+
+    async def test_scraped_tags_skip_opengraph_io(self, ridibooks_opengraph_tags):
+        og = OpenGraph.model_validate(ridibooks_opengraph_tags["openGraph"])
+        with (
+            patch("functions.scrape_open_graph", AsyncMock(return_value=og)),
+            patch("functions.get_og_tags", AsyncMock()) as mock_get_og_tags,
+        ):
+            assert await get_open_graph("https://ridibooks.com/books/1354000126") == og
+
+        mock_get_og_tags.assert_not_awaited()
+
+    async def test_fallback_to_opengraph_io(self, scrape_open_graph, ridibooks_opengraph_tags):
+        # Given: 서점 페이지에서 태그를 찾지 못함
+        with patch("functions.get_og_tags", AsyncMock(return_value=ridibooks_opengraph_tags)) as mock_get_og_tags:
+            og = await get_open_graph("https://ridibooks.com/books/1354000126")
+
+        # Then: opengraph.io 결과를 사용한다
+        scrape_open_graph.assert_awaited_once_with("https://ridibooks.com/books/1354000126")
+        mock_get_og_tags.assert_awaited_once()
+        assert og == OpenGraph.model_validate(ridibooks_opengraph_tags["openGraph"])
@@ -1,3 +1,4 @@
+import json
 import os
 from http import HTTPStatus
 from unittest.mock import patch, AsyncMock
@@ -155,7 +156,7 @@ def mock_uuid():
 class TestOpenForm:
     async def test_open_form_succeed(self, dialog_form_data, dialog_format, mock_uuid):
         with patch(
-            "app.slack_client.dialog_open",
+            "app.slack_client.api_call",
             AsyncMock(
                 return_value=SlackResponse(
                     client=slack_client,
@@ -173,11 +174,17 @@ class TestOpenForm:
             )
 
         assert response.status_code == HTTPStatus.OK
-        mock_call.assert_called_once_with(trigger_id=dialog_form_data["trigger_id"], dialog=dialog_format)
+        mock_call.assert_called_once()
+        assert mock_call.call_args.args == ("dialog.open",)
+        assert mock_call.call_args.kwargs["headers"] == {"Content-Type": "application/json;charset=utf-8"}
+        assert json.loads(mock_call.call_args.kwargs["data"]) == {
+            "trigger_id": dialog_form_data["trigger_id"],
+            "dialog": dialog_format,
+        }
 
     async def test_open_form_fail(self, dialog_form_data, dialog_format, mock_uuid):
         with patch(
-            "app.slack_client.dialog_open",
+            "app.slack_client.api_call",
             AsyncMock(
                 return_value=SlackResponse(
                     client=slack_client,
@@ -195,4 +202,10 @@ class TestOpenForm:
             )
 
         assert response.status_code == HTTPStatus.OK
-        mock_call.assert_called_once_with(trigger_id=dialog_form_data["trigger_id"], dialog=dialog_format)
+        mock_call.assert_called_once()
+        assert mock_call.call_args.args == ("dialog.open",)
+        assert mock_call.call_args.kwargs["headers"] == {"Content-Type": "application/json;charset=utf-8"}
+        assert json.loads(mock_call.call_args.kwargs["data"]) == {
+            "trigger_id": dialog_form_data["trigger_id"],
+            "dialog": dialog_format,
+        }
@@ -0,0 +1,126 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from outbox import Outbox
+
+
+def make_outbox(path, **kwargs) -> Outbox:
+    options = dict(concurrency=2, max_attempts=3, base_delay=0, max_delay=0, lease=60, poll_interval=0.01)
+    options.update(kwargs)
+    return Outbox(path=str(path), **options)
+
+
+@pytest.mark.asyncio
+class TestOutbox:
+    async def test_uses_wal_journal(self, outbox):
+        outbox.depth()
+        assert outbox._connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    async def test_concurrency_is_bounded(self, tmp_path):
+        queue = make_outbox(tmp_path / "outbox.sqlite3", concurrency=3)
+        running, peak = 0, 0
+
+        async def handler(_: dict) -> bool:
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return True
+
+        # Given: 작업 20개가 한꺼번에 쌓임
+        queue.register("job", handler)
+        for i in range(20):
+            queue.enqueue("job", {"i": i})
+        await queue.drain()
+
+        # Then: 동시에 처리되는 작업은 concurrency 를 넘지 않는다
+        assert peak == 3
+        assert queue.depth() == 0
+
+    async def test_failed_job_is_retried_with_backoff(self, tmp_path):
+        queue = make_outbox(tmp_path / "outbox.sqlite3", base_delay=10, max_delay=15)
+
+        async def handler(_: dict) -> bool:
+            raise RuntimeError("notion is down")
+
+        queue.register("job", handler)
+        queue.enqueue("job", {})
+
+        # When: 첫 번째 시도 실패
+        now = time.time()
+        await queue.drain()
+
+        # Then: base_delay 의 절반 ~ 전체 사이만큼 미뤄서 재시도
+        attempts, available_at, last_error = queue._connection.execute(
+            "SELECT attempts, available_at, last_error FROM jobs"
+        ).fetchone()
+        assert attempts == 1
+        assert now + 5 <= available_at <= now + 11
+        assert last_error == "RuntimeError('notion is down')"
+
+        # When: 두 번째 시도도 실패 -> 지연은 2배가 되지만 max_delay 를 넘지 않는다
+        with patch("outbox.time.time", return_value=available_at):
+            await queue.drain()
+        _, retry_at, _ = queue._connection.execute("SELECT attempts, available_at, last_error FROM jobs").fetchone()
+        assert available_at + 7.5 <= retry_at <= available_at + 15
+
+    async def test_job_is_moved_to_dead_letters(self, tmp_path):
+        queue = make_outbox(tmp_path / "outbox.sqlite3", max_attempts=3)
+        calls = 0
+
+        async def handler(_: dict) -> bool:
+            nonlocal calls
+            calls += 1
+            return False
+
+        queue.register("job", handler)
+        queue.enqueue("job", {"bookstore_url": "https://ridibooks.com/books/1354000008"})
+        await queue.drain()
+
+        assert calls == 3
+        assert queue.depth() == 0
+        assert queue.dead_letters() == [
+            {
+                "id": 1,
+                "kind": "job",
+                "payload": {"bookstore_url": "https://ridibooks.com/books/1354000008"},
+                "attempts": 3,
+                "last_error": None,
+            }
+        ]
+
+    async def test_claimed_job_is_not_processed_by_another_worker(self, tmp_path):
+        # Given: 같은 파일을 쓰는 두 워커
+        first, second = make_outbox(tmp_path / "outbox.sqlite3"), make_outbox(tmp_path / "outbox.sqlite3")
+        first.enqueue("job", {})
+
+        # Then: 한 워커가 lease 를 잡은 작업은 다른 워커가 가져가지 않고, lease 가 만료되면 다시 가져갈 수 있다
+        assert len(first._claim(10)) == 1
+        assert second._claim(10) == []
+        with patch("outbox.time.time", return_value=time.time() + 61):
+            assert len(second._claim(10)) == 1
+
+    async def test_stop_drains_queue(self, tmp_path):
+        queue = make_outbox(tmp_path / "outbox.sqlite3", poll_interval=10)
+        processed = []
+
+        async def handler(payload: dict) -> bool:
+            await asyncio.sleep(0.01)
+            processed.append(payload["i"])
+            return True
+
+        queue.register("job", handler)
+        queue.start()
+        for i in range(5):
+            queue.enqueue("job", {"i": i})
+
+        # When: graceful shutdown
+        await queue.stop(timeout=5)
+
+        # Then: 종료 전에 쌓여있던 작업을 모두 처리한다
+        assert sorted(processed) == [0, 1, 2, 3, 4]
+        assert queue.depth() == 0
@@ -0,0 +1,51 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from functions import get_open_graph
+from pipeline import Deadline, wait_background_tasks
+
+
+@pytest.mark.asyncio
+class TestPipeline:
+    async def test_stage_is_not_cancelled_after_deadline(self):
+        finished = asyncio.Event()
+
+        async def slow_stage() -> str:
+            await asyncio.sleep(0.05)
+            finished.set()
+            return "done"
+
+        # When: 단계가 기한을 넘김
+        deadline = Deadline(budget=0.01)
+        with pytest.raises(asyncio.TimeoutError):
+            await deadline.run(slow_stage())
+
+        # Then: 호출한 쪽은 기다리지 않지만 단계는 백그라운드에서 끝까지 실행된다
+        await wait_background_tasks(timeout=1)
+        assert finished.is_set()
+
+    async def test_stage_budget_is_capped_by_remaining_time(self):
+        deadline = Deadline(budget=0.05)
+        assert await deadline.run(asyncio.sleep(0, result="fast"), budget=10) == "fast"
+
+        with pytest.raises(asyncio.TimeoutError):
+            await deadline.run(asyncio.sleep(0.2), budget=10)
+        assert deadline.remaining() == 0
+
+    async def test_concurrent_lookups_of_same_book_are_coalesced(self, ridibooks_opengraph_tags):
+        async def slow_og_tags(_: str) -> dict:
+            await asyncio.sleep(0.01)
+            return ridibooks_opengraph_tags
+
+        # Given: 미리 조회 + outbox 컨슈머가 같은 책을 동시에 조회
+        with patch("functions.get_og_tags", AsyncMock(side_effect=slow_og_tags)) as mock_get_og_tags:
+            prefetched, archived = await asyncio.gather(
+                get_open_graph("https://ridibooks.com/books/1354000126"),
+                get_open_graph("https://www.ridibooks.com/books/1354000126?_s=search"),
+            )
+
+        # Then: opengraph.io 는 한 번만 호출한다
+        mock_get_og_tags.assert_awaited_once()
+        assert prefetched == archived
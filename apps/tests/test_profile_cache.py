@@ -0,0 +1,79 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app import slack_api
+from profile_cache import ProfileCache
+
+
+@pytest.fixture
+def users_list_pages() -> list:
+    return [
+        {
+            "ok": True,
+            "members": [
+                {"id": "W012A3CDE", "deleted": False, "profile": {"real_name": "Egon Spengler"}},
+                {"id": "W07QCRPA4", "deleted": True, "profile": {"real_name": "Glinda Southgood"}},
+            ],
+            "response_metadata": {"next_cursor": "dXNlcjpVMEc5V0ZYTlo="},
+        },
+        {
+            "ok": True,
+            "members": [{"id": "W12A3BCDEF", "profile": {"real_name": "Ray Stantz"}}],
+            "response_metadata": {"next_cursor": ""},
+        },
+    ]
+
+
+@pytest.mark.asyncio
+class TestProfileCache:
+    async def test_cached_profile_skips_slack_api(
+        self, profile_cache, user_profile_success_data, ok_response_from_slack
+    ):
+        with patch(
+            "app.slack_client.users_profile_get",
+            AsyncMock(return_value=ok_response_from_slack(user_profile_success_data)),
+        ) as mock_user_profile:
+            first = await profile_cache.get_real_name("W12A3BCDEF")
+            second = await profile_cache.get_real_name("W12A3BCDEF")
+
+        # Then: 두 번째 조회는 슬랙 API 를 호출하지 않는다
+        assert first == second == user_profile_success_data["profile"]["real_name"]
+        mock_user_profile.assert_awaited_once_with(user="W12A3BCDEF")
+
+    async def test_expired_or_invalidated_profile_is_fetched_again(
+        self, shared_cache, user_profile_success_data, ok_response_from_slack
+    ):
+        cache = ProfileCache(slack=slack_api, cache=shared_cache, ttl=0)
+        with patch(
+            "app.slack_client.users_profile_get",
+            AsyncMock(return_value=ok_response_from_slack(user_profile_success_data)),
+        ) as mock_user_profile:
+            await cache.get_real_name("W12A3BCDEF")
+            await cache.get_real_name("W12A3BCDEF")
+
+        # Then: TTL 이 지난 프로필은 다시 조회한다
+        assert mock_user_profile.await_count == 2
+
+        cache.ttl = 60
+        cache.set("W12A3BCDEF", "Egon Spengler")
+        cache.invalidate("W12A3BCDEF")
+        assert cache.get("W12A3BCDEF") is None
+
+    async def test_prewarm_crawls_every_page(self, profile_cache, users_list_pages, ok_response_from_slack):
+        # When: users.list 결과가 두 페이지에 걸쳐 있음
+        with patch(
+            "app.slack_client.users_list",
+            AsyncMock(side_effect=[ok_response_from_slack(page) for page in users_list_pages]),
+        ) as mock_users_list:
+            count = await profile_cache.prewarm()
+
+        # Then: 커서를 따라 모든 페이지를 읽고, 비활성화된 멤버는 제외한다
+        assert count == 2
+        assert [call.kwargs for call in mock_users_list.await_args_list] == [
+            {"limit": 200},
+            {"limit": 200, "cursor": "dXNlcjpVMEc5V0ZYTlo="},
+        ]
+        assert profile_cache.get("W012A3CDE") == "Egon Spengler"
+        assert profile_cache.get("W12A3BCDEF") == "Ray Stantz"
+        assert profile_cache.get("W07QCRPA4") is None
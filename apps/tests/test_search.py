@@ -0,0 +1,114 @@
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import app
+from notion_mirror import NotionMirror
+from search import bigrams, words
+
+
+client = TestClient(app)
+
+
+def notion_page(page_id: str, title: str, recommender: str, categories, reason: str, created_time: str) -> dict:
+    # 노션 데이터베이스 조회 결과의 페이지
+    return {
+        "id": page_id,
+        "created_time": created_time,
+        "last_edited_time": created_time,
+        "properties": {
+            "title": {"title": [{"plain_text": title}]},
+            "URL": {"url": f"https://ridibooks.com/books/{page_id}"},
+            "category": {"multi_select": [{"name": name} for name in categories]},
+            "recommender": {"rich_text": [{"plain_text": recommender}]},
+            "recommend reason": {"rich_text": [{"plain_text": reason}]},
+        },
+    }
+
+
+@pytest.fixture
+def books(notion_mirror) -> NotionMirror:
+    for page in (
+        notion_page("1", "부의 추월차선", "김북크", ("경제일반", "경영/경제"), "젊어서 부자가 되는 길", "2024-01-01T00:00:00.000Z"),
+        notion_page("2", "언스크립티드", "이북크", ("경제일반", "경영/경제"), "부의 추월차선 후속작", "2024-02-01T00:00:00.000Z"),
+        notion_page("3", "Clean Code", "박북크", ("개발/프로그래밍", "컴퓨터/IT"), "읽기 좋은 코드", "2024-03-01T00:00:00.000Z"),
+        notion_page("4", "사랑의 시", "김북크", ("시", "시/에세이"), "봄에 읽기 좋은 시집", "2024-04-01T00:00:00.000Z"),
+    ):
+        notion_mirror.upsert(page)
+    return notion_mirror
+
+
+@pytest.mark.asyncio
+class TestTokenizer:
+    async def test_bigrams(self):
+        assert words("부의 추월차선!  ＣＬＥＡＮ code") == ["부의", "추월차선", "clean", "code"]
+        assert bigrams(["부의", "추월차선", "시"]) == {"부의", "추월", "월차", "차선"}
+
+
+@pytest.mark.asyncio
+class TestSearch:
+    @pytest.mark.parametrize(
+        "query, titles",
+        [
+            # 제목에 있는 책이 먼저, 그 다음은 최근에 추천된 순
+            ("추월차선", ["부의 추월차선", "언스크립티드"]),
+            ("월차", ["부의 추월차선", "언스크립티드"]),
+            ("김북크", ["사랑의 시", "부의 추월차선"]),
+            ("clean CODE", ["Clean Code"]),
+            ("컴퓨터", ["Clean Code"]),
+            ("읽기 좋은", ["사랑의 시", "Clean Code"]),
+            ("읽기 시집", ["사랑의 시"]),
+            ("시", ["사랑의 시"]),
+            ("추월차선 코드", []),
+            ("!!", []),
+        ],
+    )
+    async def test_search(self, books, query, titles):
+        assert [book.title for book in books.search(query)] == titles
+
+    async def test_index_follows_mirror(self, books):
+        # When: 노션에서 제목이 바뀌거나 페이지가 지워지면
+        books.upsert(notion_page("3", "Refactoring", "박북크", ("개발/프로그래밍",), "읽기 좋은 코드", "2024-05-01T00:00:00.000Z"))
+        books.upsert({"id": "1", "archived": True})
+
+        # Then
+        assert books.search("clean") == []
+        assert [book.title for book in books.search("refactoring")] == ["Refactoring"]
+        assert [book.title for book in books.search("추월차선")] == ["언스크립티드"]
+
+    async def test_index_existing_mirror(self, tmp_path):
+        # Given: 검색 색인이 없던 때 만들어진 사본
+        path = str(tmp_path / "mirror.sqlite3")
+        mirror = NotionMirror(path=path, database_id="test-database")
+        mirror.upsert(notion_page("1", "부의 추월차선", "김북크", ("경제일반",), "", "2024-01-01T00:00:00.000Z"))
+        with sqlite3.connect(path) as conn:
+            conn.execute("DELETE FROM search_documents")
+            conn.execute("DELETE FROM search_terms")
+
+        # When
+        mirror = NotionMirror(path=path, database_id="test-database")
+
+        # Then
+        assert [book.title for book in mirror.search("추월")] == ["부의 추월차선"]
+
+
+@pytest.mark.asyncio
+class TestSearchBooks:
+    async def test_search_books(self, books):
+        response = client.post("/search-books/", data={"command": "/book-search", "text": "추월차선"})
+
+        body = response.json()
+        assert body["response_type"] == "ephemeral"
+        assert body["text"].startswith("📖 <https://ridibooks.com/books/1|부의 추월차선> (경제일반, 김북크님 추천)")
+        assert "<https://ridibooks.com/books/2|언스크립티드>" in body["text"]
+
+    async def test_no_result(self, books):
+        response = client.post("/search-books/", data={"text": "<없는 책>"})
+
+        assert response.json()["text"] == "'&lt;없는 책&gt;' 에 해당하는 추천 도서가 없어요."
+
+    async def test_empty_query(self, books):
+        response = client.post("/search-books/", data={"text": " "})
+
+        assert "검색어" in response.json()["text"]
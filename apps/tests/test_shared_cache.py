@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from shared_cache import SharedCache
+
+
+@pytest.mark.asyncio
+class TestSharedCache:
+    async def test_get_set(self, shared_cache):
+        shared_cache.set("profile:U1", "김북크", ttl=60)
+        shared_cache.set("og:1", {"title": "부의 추월차선"}, ttl=60)
+
+        assert shared_cache.get("profile:U1") == "김북크"
+        assert shared_cache.get("og:1") == {"title": "부의 추월차선"}
+        assert shared_cache.get("profile:U2") is None
+
+    async def test_expired(self, shared_cache):
+        shared_cache.set("profile:U1", "김북크", ttl=0.05)
+        time.sleep(0.06)
+
+        assert shared_cache.get("profile:U1") is None
+
+    async def test_shared_across_workers(self, shared_cache):
+        # Given: 같은 파일을 쓰는 다른 워커
+        other_worker = SharedCache(path=shared_cache.path)
+
+        # Then: 한 워커가 채운 값을 다른 워커도 읽는다
+        other_worker.set_many({"profile:U1": "김북크", "profile:U2": "이북크"}, ttl=60)
+        assert shared_cache.get("profile:U2") == "이북크"
+
+        shared_cache.delete("profile:U1")
+        assert other_worker.get("profile:U1") is None
+
+    async def test_add_only_once(self, shared_cache):
+        other_worker = SharedCache(path=shared_cache.path)
+
+        # When: 여러 워커가 같은 키를 차지하려고 하면 한 워커만 성공하고
+        assert shared_cache.add("lease:prewarm", 1, ttl=0.05)
+        assert not other_worker.add("lease:prewarm", 2, ttl=0.05)
+        assert shared_cache.get("lease:prewarm") == 1
+
+        # Then: 만료되면 다시 차지할 수 있다
+        time.sleep(0.06)
+        assert other_worker.add("lease:prewarm", 2, ttl=0.05)
+
+    async def test_clear_prefix(self, shared_cache):
+        shared_cache.set_many({"profile:U1": "김북크", "profile:U2": "이북크", "og:1": "부의 추월차선"}, ttl=60)
+
+        shared_cache.clear("profile:")
+
+        assert shared_cache.get("profile:U1") is None
+        assert shared_cache.get("og:1") == "부의 추월차선"
+
+    async def test_reconnect_after_fork(self, shared_cache):
+        shared_cache.set("profile:U1", "김북크", ttl=60)
+        before = shared_cache._connection
+
+        # When: 마스터에서 연 연결을 물려받은 워커라면 (pid 가 다르면)
+        shared_cache._pid = -1
+
+        # Then: 새로 연결한다
+        assert shared_cache.get("profile:U1") == "김북크"
+        assert shared_cache._connection is not before
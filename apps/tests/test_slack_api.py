@@ -0,0 +1,100 @@
+import time
+from http import HTTPStatus
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from slack.errors import SlackApiError
+from slack.web.slack_response import SlackResponse
+
+from slack_api import POST_MESSAGE, SlackApi
+
+
+def slack_response(data: dict, status_code: int = HTTPStatus.OK, headers: dict = None) -> SlackResponse:
+    return SlackResponse(
+        client=None,
+        http_verb="POST",
+        api_url="url",
+        req_args={},
+        data=data,
+        headers=headers or {},
+        status_code=int(status_code),
+    )
+
+
+RATELIMITED = slack_response(
+    {"ok": False, "error": "ratelimited"}, status_code=HTTPStatus.TOO_MANY_REQUESTS, headers={"Retry-After": "0.1"}
+)
+
+
+@pytest.fixture
+def client() -> MagicMock:
+    client = MagicMock()
+    client.chat_postMessage = AsyncMock(return_value=slack_response({"ok": True}))
+    return client
+
+
+@pytest.mark.asyncio
+class TestSlackApi:
+    async def test_retry_after_is_honoured(self, client):
+        # Given: 슬랙이 ratelimited 를 응답 (WebClient 는 예외로 던진다)
+        client.chat_postMessage.side_effect = [
+            SlackApiError("ratelimited", RATELIMITED),
+            slack_response({"ok": True}),
+        ]
+        api = SlackApi(client)
+
+        started = time.monotonic()
+        response = await api.chat_post_message(channel="C1", text="hi")
+
+        # Then: Retry-After 만큼 기다렸다가 다시 보낸다
+        assert response.ok
+        assert client.chat_postMessage.await_count == 2
+        assert time.monotonic() - started >= 0.1
+
+    async def test_gives_up_after_max_retries(self, client):
+        client.chat_postMessage.side_effect = SlackApiError("ratelimited", RATELIMITED)
+        api = SlackApi(client, max_retries=1)
+
+        response = await api.chat_post_message(channel="C1", text="hi")
+
+        assert (response.ok, response.error) == (False, "ratelimited")
+        assert client.chat_postMessage.await_count == 2
+
+    async def test_post_message_is_limited_per_channel(self, client):
+        api = SlackApi(client, rate_share=1 / 4)
+
+        # When: 한 채널에 버스트를 다 쓰면
+        for _ in range(int(POST_MESSAGE.burst)):
+            await api.chat_post_message(channel="C1", text="hi")
+
+        # Then: 다른 채널은 바로 보내고, 같은 채널은 다음 차례까지 기다린다
+        started = time.monotonic()
+        await api.chat_post_message(channel="C2", text="hi")
+        assert time.monotonic() - started < 0.1
+
+        api._bucket("chat.postMessage", "C1").rate = 10
+        await api.chat_post_message(channel="C1", text="hi")
+        assert time.monotonic() - started >= 0.09
+
+    async def test_typed_response(self, client):
+        client.users_profile_get = AsyncMock(
+            side_effect=[
+                slack_response({"ok": True, "profile": {"real_name": "김북크"}}),
+                SlackApiError("user_not_found", slack_response({"ok": False, "error": "user_not_found"})),
+            ]
+        )
+        api = SlackApi(client)
+
+        assert (await api.users_profile_get(user="U1")).profile.real_name == "김북크"
+        # 데이터가 필요한 호출의 에러는 예외로
+        with pytest.raises(SlackApiError):
+            await api.users_profile_get(user="U2")
+
+    async def test_errors_are_returned_as_common_response(self, client):
+        client.chat_postMessage.side_effect = SlackApiError(
+            "channel_not_found", slack_response({"ok": False, "error": "channel_not_found"})
+        )
+
+        response = await SlackApi(client).chat_post_message(channel="C1", text="hi")
+
+        assert (response.ok, response.error) == (False, "channel_not_found")
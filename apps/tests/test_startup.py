@@ -0,0 +1,40 @@
+import sys
+
+import pytest
+
+from tests.startup import (
+    IMPORT_RSS_BUDGET,
+    IMPORT_SECONDS_BUDGET,
+    WORKER_PRIVATE_BUDGET,
+    inherited_connections,
+    measure_import,
+    measure_worker,
+)
+
+
+@pytest.fixture(scope="module")
+def app_import() -> dict:
+    return measure_import("app")
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="/proc 가 필요")
+class TestStartup:
+    def test_import_within_budget(self, app_import):
+        assert app_import["seconds"] <= IMPORT_SECONDS_BUDGET
+        assert app_import["rss_bytes"] <= IMPORT_RSS_BUDGET
+
+    def test_import_is_fork_safe(self, app_import):
+        # preload_app: 마스터에서 읽는 동안 만든 연결/스레드는 워커들이 물려받으므로, 모두 lifespan 이나 처음 쓸 때 만들어야 한다
+        assert app_import["threads"] == 1
+        assert app_import["files"] == []
+
+    def test_caches_reconnect_after_fork(self, tmp_path):
+        # 마스터에서 연 캐시 연결은 워커에서 처음 쓸 때 새로 연다
+        env = {"OG_CACHE_PATH": str(tmp_path / "og.sqlite3"), "SHARED_CACHE_PATH": str(tmp_path / "shared.sqlite3")}
+
+        assert inherited_connections(env) == []
+
+    def test_worker_private_memory_within_budget(self, tmp_path):
+        memory = measure_worker(env={"METRICS_DIR": str(tmp_path / "metrics")})
+
+        assert memory["private_bytes"] <= WORKER_PRIVATE_BUDGET
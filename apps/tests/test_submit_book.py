@@ -1,12 +1,17 @@
+import asyncio
 import json
+import time
 from http import HTTPStatus
 from unittest.mock import AsyncMock, patch
 
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 
 from dtos.internal.book import Book
-from app import app, SUCCESS_MESSAGE
+from app import app, ANNOUNCE_FAILED, SUCCESS_MESSAGE
+from http_clients import HttpClientPool
+from pipeline import wait_background_tasks
 from settings import settings
 
 
@@ -93,6 +98,7 @@ class TestBookSubmission:
         user_profile_success_data,
         chat_post_success_data,
         ok_response_from_slack,
+        outbox,
     ):
         # When: 유효한 서점 링크를 첨부하여 도서 추천
         with (
@@ -104,7 +110,7 @@ class TestBookSubmission:
                 "app.slack_client.chat_postMessage",
                 AsyncMock(return_value=ok_response_from_slack(chat_post_success_data)),
             ) as mock_post_message,
-            patch("app.post_book_to_notion", AsyncMock(return_value=True)) as mock_post_notion,
+            patch("functions.post_book_to_notion", AsyncMock(return_value=True)) as mock_post_notion,
         ):
             successful_submit_data = book_submit_data(bookstore_url=valid_bookstore_url)
             response = client.post(
@@ -112,6 +118,8 @@ class TestBookSubmission:
                 data={"payload": json.dumps(successful_submit_data)},
                 headers={"Content-Type": "application/x-www-form-urlencoded"},
             )
+            assert outbox.depth() == 1
+            await outbox.drain()
 
         assert response.status_code == HTTPStatus.OK
         assert not response.content
@@ -128,6 +136,7 @@ class TestBookSubmission:
         mock_post_notion.assert_called_once_with(
             Book(**successful_submit_data["submission"], recommender=user_profile_success_data["profile"]["real_name"]),
         )
+        assert outbox.depth() == 0
 
     async def test_post_yes24_book_to_notion(
         self,
@@ -136,6 +145,8 @@ class TestBookSubmission:
         book_submit_data,
         ok_response_from_slack,
         yes24_opengraph_tags,
+        outbox,
+        fake_notion,
     ):
         # When: yes24 링크를 첨부하여 도서 추천
         with (
@@ -148,7 +159,6 @@ class TestBookSubmission:
                 AsyncMock(return_value=ok_response_from_slack(chat_post_success_data)),
             ),
             patch("functions.get_og_tags", AsyncMock(return_value=yes24_opengraph_tags)),
-            patch("functions.httpx.AsyncClient.post") as mock_post_notion,
         ):
             yes24_url = "https://www.yes24.com/Product/Goods/106369008"
             successful_submit_data = book_submit_data(bookstore_url=yes24_url)
@@ -157,9 +167,10 @@ class TestBookSubmission:
                 data={"payload": json.dumps(successful_submit_data)},
                 headers={"Content-Type": "application/x-www-form-urlencoded"},
             )
+            await outbox.drain()
 
         # Then: yes24 오픈그래프 태그에서 얻은 정보를 노션에 저장한다
-        assert mock_post_notion.await_args_list[0].kwargs["json"] == {
+        assert fake_notion.pages[0] == {
             "parent": {
                 "type": "database_id",
                 "database_id": settings.notion_database_id,
@@ -211,6 +222,8 @@ class TestBookSubmission:
         book_submit_data,
         ok_response_from_slack,
         ridibooks_opengraph_tags,
+        outbox,
+        fake_notion,
     ):
         # When: 리디북스 링크를 첨부하여 도서 추천
         with (
@@ -223,7 +236,6 @@ class TestBookSubmission:
                 AsyncMock(return_value=ok_response_from_slack(chat_post_success_data)),
             ),
             patch("functions.get_og_tags", AsyncMock(return_value=ridibooks_opengraph_tags)),
-            patch("functions.httpx.AsyncClient.post") as mock_post_notion,
         ):
             yes24_url = "https://ridibooks.com/books/1354000126"
             successful_submit_data = book_submit_data(bookstore_url=yes24_url)
@@ -232,9 +244,10 @@ class TestBookSubmission:
                 data={"payload": json.dumps(successful_submit_data)},
                 headers={"Content-Type": "application/x-www-form-urlencoded"},
             )
+            await outbox.drain()
 
         # Then: 리디북스 오픈그래프 태그에서 얻은 정보를 노션에 저장한다
-        assert mock_post_notion.await_args_list[0].kwargs["json"] == {
+        assert fake_notion.pages[0] == {
             "parent": {
                 "type": "database_id",
                 "database_id": settings.notion_database_id,
@@ -282,7 +295,7 @@ class TestBookSubmission:
         }
 
     async def test_submit_book_fail_to_post_message(
-        self, book_submit_data, user_profile_success_data, chat_post_success_data, ok_response_from_slack
+        self, book_submit_data, user_profile_success_data, chat_post_success_data, ok_response_from_slack, outbox
     ):
         # Given: 노션 저장 실패
         with (
@@ -294,7 +307,7 @@ class TestBookSubmission:
                 "app.slack_client.chat_postMessage",
                 AsyncMock(return_value=ok_response_from_slack(chat_post_success_data)),
             ) as mock_post_message,
-            patch("app.post_book_to_notion", AsyncMock(return_value=False)),
+            patch("functions.post_book_to_notion", AsyncMock(return_value=False)),
         ):
             successful_submit_data = book_submit_data(bookstore_url="https://ridibooks.com/books/1354000008")
             response = client.post(
@@ -302,6 +315,7 @@ class TestBookSubmission:
                 data={"payload": json.dumps(successful_submit_data)},
                 headers={"Content-Type": "application/x-www-form-urlencoded"},
             )
+            await outbox.drain()
 
         # Then: 노션 저장에 실패해도 슬랙 채널에 알림 메세지를 전송해야 함
         assert response.status_code == HTTPStatus.OK
@@ -315,3 +329,267 @@ class TestBookSubmission:
             ),
             channel=successful_submit_data["channel"]["id"],
         )
+
+        # Then: 재시도를 모두 실패한 아카이빙 작업은 dead letter 로 남는다
+        assert outbox.depth() == 0
+        assert [letter["payload"]["bookstore_url"] for letter in outbox.dead_letters()] == [
+            successful_submit_data["submission"]["bookstore_url"]
+        ]
+
+    async def test_submit_book_prefetches_opengraph(
+        self,
+        book_submit_data,
+        user_profile_success_data,
+        chat_post_success_data,
+        ok_response_from_slack,
+        prefetch_open_graph,
+    ):
+        with (
+            patch(
+                "app.slack_client.users_profile_get",
+                AsyncMock(return_value=ok_response_from_slack(user_profile_success_data)),
+            ),
+            patch(
+                "app.slack_client.chat_postMessage",
+                AsyncMock(return_value=ok_response_from_slack(chat_post_success_data)),
+            ),
+        ):
+            client.post(
+                "/submit-book/",
+                data={"payload": json.dumps(book_submit_data(bookstore_url="https://ridibooks.com/books/1354000126"))},
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+            )
+
+        # Then: 링크 검증이 끝나자마자 노션 아카이빙에 쓸 오픈그래프 태그를 미리 조회한다
+        prefetch_open_graph.assert_called_once_with("https://ridibooks.com/books/1354000126")
+
+    async def test_slow_profile_lookup_falls_back_to_user_name(
+        self, book_submit_data, user_profile_success_data, chat_post_success_data, ok_response_from_slack
+    ):
+        async def slow_user_profile(**_):
+            await asyncio.sleep(1)
+            return ok_response_from_slack(user_profile_success_data)
+
+        # Given: 슬랙 프로필 조회가 profile_lookup_budget 보다 오래 걸림
+        with (
+            patch.object(settings, "profile_lookup_budget", 0.05),
+            patch("app.slack_client.users_profile_get", AsyncMock(side_effect=slow_user_profile)),
+            patch(
+                "app.slack_client.chat_postMessage",
+                AsyncMock(return_value=ok_response_from_slack(chat_post_success_data)),
+            ) as mock_post_message,
+        ):
+            submit_data = book_submit_data(bookstore_url="https://ridibooks.com/books/1354000126")
+            response = client.post(
+                "/submit-book/",
+                data={"payload": json.dumps(submit_data)},
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+            )
+
+        # Then: 프로필을 기다리지 않고 페이로드에 있는 사용자 이름으로 메세지를 보낸다
+        assert response.status_code == HTTPStatus.OK
+        mock_post_message.assert_called_once_with(
+            text=SUCCESS_MESSAGE.format(**submit_data["submission"], recommender=submit_data["user"]["name"]),
+            channel=submit_data["channel"]["id"],
+        )
+
+    async def test_slow_slack_api_does_not_exceed_budget(
+        self, book_submit_data, user_profile_success_data, chat_post_success_data, ok_response_from_slack
+    ):
+        async def slow_post_message(**_):
+            await asyncio.sleep(1)
+            return ok_response_from_slack(chat_post_success_data)
+
+        # Given: 메세지 전송이 submit_book_budget 보다 오래 걸림
+        with (
+            patch.object(settings, "submit_book_budget", 0.2),
+            patch(
+                "app.slack_client.users_profile_get",
+                AsyncMock(return_value=ok_response_from_slack(user_profile_success_data)),
+            ),
+            patch("app.slack_client.chat_postMessage", AsyncMock(side_effect=slow_post_message)),
+        ):
+            started = time.monotonic()
+            response = client.post(
+                "/submit-book/",
+                data={"payload": json.dumps(book_submit_data(bookstore_url="https://ridibooks.com/books/1354000126"))},
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+            )
+
+        # Then: 기한 안에 슬랙에 응답한다
+        assert response.status_code == HTTPStatus.OK
+        assert not response.content
+        assert time.monotonic() - started < 0.8
+
+
+@pytest.fixture
+def deferred_reply():
+    with patch.object(settings, "submit_book_deferred_reply", True):
+        yield
+
+
+@pytest.fixture
+def response_urls():
+    # 다이얼로그의 response_url 로 보낸 요청
+    requests = []
+
+    def respond(request: httpx.Request) -> httpx.Response:
+        requests.append((str(request.url), json.loads(request.content)))
+        return httpx.Response(HTTPStatus.OK, text="ok")
+
+    pool = HttpClientPool(
+        max_connections_per_host=1,
+        max_keepalive_connections_per_host=1,
+        keepalive_expiry=5,
+        transport=httpx.MockTransport(respond),
+    )
+    with patch("app.http_clients", pool):
+        yield requests
+
+
+async def submit(submit_data: dict) -> httpx.Response:
+    # 응답 뒤에 이어지는 백그라운드 작업을 기다릴 수 있도록 테스트와 같은 이벤트 루프에서 호출
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as async_client:
+        return await async_client.post("/submit-book/", data={"payload": json.dumps(submit_data)})
+
+
+@pytest.mark.asyncio
+class TestDeferredReply:
+    async def test_acknowledge_before_posting_message(
+        self,
+        deferred_reply,
+        book_submit_data,
+        user_profile_success_data,
+        chat_post_success_data,
+        ok_response_from_slack,
+    ):
+        async def slow_post_message(**_):
+            await asyncio.sleep(0.5)
+            return ok_response_from_slack(chat_post_success_data)
+
+        # Given: 슬랙 API 가 느림
+        with (
+            patch(
+                "app.slack_client.users_profile_get",
+                AsyncMock(return_value=ok_response_from_slack(user_profile_success_data)),
+            ),
+            patch("app.slack_client.chat_postMessage", AsyncMock(side_effect=slow_post_message)) as mock_post_message,
+        ):
+            submit_data = book_submit_data(bookstore_url="https://ridibooks.com/books/1354000126")
+
+            # When
+            started = time.monotonic()
+            response = await submit(submit_data)
+            acknowledged_in = time.monotonic() - started
+            await wait_background_tasks(timeout=2)
+
+        # Then: 메세지 전송을 기다리지 않고 바로 빈 응답을 보내고, 메세지는 그 뒤에 보낸다
+        assert response.status_code == HTTPStatus.OK
+        assert not response.content
+        assert acknowledged_in < 0.3
+        mock_post_message.assert_called_once_with(
+            text=SUCCESS_MESSAGE.format(
+                **submit_data["submission"], recommender=user_profile_success_data["profile"]["real_name"]
+            ),
+            channel=submit_data["channel"]["id"],
+        )
+
+    async def test_invalid_link_is_still_rejected(self, deferred_reply, book_submit_data):
+        response = await submit(book_submit_data(bookstore_url="example"))
+
+        assert response.json() == {"errors": [{"name": "bookstore_url", "error": "유효하지 않은 URL입니다."}]}
+
+    async def test_report_failure_to_response_url(
+        self, deferred_reply, response_urls, book_submit_data, user_profile_success_data, ok_response_from_slack
+    ):
+        # Given: 채널에 메세지를 보내지 못함
+        with (
+            patch(
+                "app.slack_client.users_profile_get",
+                AsyncMock(return_value=ok_response_from_slack(user_profile_success_data)),
+            ),
+            patch(
+                "app.slack_client.chat_postMessage",
+                AsyncMock(return_value=ok_response_from_slack({"ok": False, "error": "channel_not_found"})),
+            ),
+        ):
+            submit_data = book_submit_data(bookstore_url="https://ridibooks.com/books/1354000126")
+            response = await submit(submit_data)
+            await wait_background_tasks(timeout=2)
+
+        # Then: 추천한 사람에게만 보이는 메세지로 알린다
+        assert not response.content
+        assert response_urls == [
+            (
+                submit_data["response_url"],
+                {
+                    "response_type": "ephemeral",
+                    "replace_original": False,
+                    "text": ANNOUNCE_FAILED.format(
+                        error="channel_not_found", bookstore_url="https://ridibooks.com/books/1354000126"
+                    ),
+                },
+            )
+        ]
+
+    async def test_report_failure_without_response_url(
+        self, deferred_reply, book_submit_data, chat_post_success_data, ok_response_from_slack
+    ):
+        # Given: response_url 이 없고, 프로필 조회부터 실패
+        with (
+            patch("app.slack_client.users_profile_get", AsyncMock(side_effect=ConnectionError)),
+            patch(
+                "app.slack_client.chat_postEphemeral", AsyncMock(return_value=ok_response_from_slack({"ok": True}))
+            ) as mock_post_ephemeral,
+        ):
+            submit_data = book_submit_data(bookstore_url="https://ridibooks.com/books/1354000126")
+            del submit_data["response_url"]
+            await submit(submit_data)
+            await wait_background_tasks(timeout=2)
+
+        # Then
+        mock_post_ephemeral.assert_called_once_with(
+            channel=submit_data["channel"]["id"],
+            user=submit_data["user"]["id"],
+            text=ANNOUNCE_FAILED.format(
+                error="ConnectionError", bookstore_url="https://ridibooks.com/books/1354000126"
+            ),
+        )
+
+
+@pytest.mark.asyncio
+async def test_report_failure_after_budget(
+    response_urls, book_submit_data, user_profile_success_data, ok_response_from_slack
+):
+    async def slow_failed_post_message(**_):
+        await asyncio.sleep(0.4)
+        return ok_response_from_slack({"ok": False, "error": "channel_not_found"})
+
+    # Given: 메세지 전송이 submit_book_budget 을 넘긴 뒤에 실패
+    with (
+        patch.object(settings, "submit_book_budget", 0.2),
+        patch(
+            "app.slack_client.users_profile_get",
+            AsyncMock(return_value=ok_response_from_slack(user_profile_success_data)),
+        ),
+        patch("app.slack_client.chat_postMessage", AsyncMock(side_effect=slow_failed_post_message)),
+    ):
+        submit_data = book_submit_data(bookstore_url="https://ridibooks.com/books/1354000126")
+        response = await submit(submit_data)
+        await wait_background_tasks(timeout=2)
+
+    # Then: 슬랙에는 먼저 빈 응답을 보내고, 실패는 끝난 뒤에 추천한 사람에게 알린다
+    assert response.status_code == HTTPStatus.OK
+    assert not response.content
+    assert response_urls == [
+        (
+            submit_data["response_url"],
+            {
+                "response_type": "ephemeral",
+                "replace_original": False,
+                "text": ANNOUNCE_FAILED.format(
+                    error="channel_not_found", bookstore_url="https://ridibooks.com/books/1354000126"
+                ),
+            },
+        )
+    ]
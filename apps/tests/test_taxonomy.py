@@ -0,0 +1,66 @@
+import json
+import os
+
+import pytest
+
+from dtos.internal.book import Book
+from taxonomy import Taxonomy, build_dialog, default_categories, taxonomy
+
+
+def write_categories(path, categories: dict, mtime_ns: int) -> None:
+    path.write_text(json.dumps(categories, ensure_ascii=False), encoding="utf-8")
+    # 같은 초 안에 여러 번 써도 바뀐 걸 알 수 있도록 mtime 을 직접 지정
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.mark.asyncio
+class TestTaxonomy:
+    @pytest.mark.parametrize(
+        "category, parent",
+        [("경제일반", "경영/경제"), ("역사", "소설"), ("역사/문학", "인문/사회"), ("기타", "건강/취미"), ("없는 카테고리", None)],
+    )
+    async def test_parent_category(self, category, parent):
+        book = Book(category=category, bookstore_url="https://ridibooks.com", recommend_reason="", recommender="")
+        assert book.parent_category == parent
+
+    async def test_dialog_request_same_as_dialog_model(self):
+        body = taxonomy.dialog_request(trigger_id='13345224609.738474920."x"', callback_id="5f2b3c9a")
+
+        assert json.loads(body) == {
+            "trigger_id": '13345224609.738474920."x"',
+            "dialog": build_dialog(default_categories(), callback_id="5f2b3c9a").model_dump(),
+        }
+
+    async def test_reload_when_file_changed(self, tmp_path):
+        # Given: 카테고리 파일을 읽은 상태
+        path = tmp_path / "categories.json"
+        write_categories(path, {"경영/경제": ["경영일반"]}, mtime_ns=1_000_000_000)
+        categories = Taxonomy(default_categories(), path=str(path))
+        assert categories.parent_of("경영일반") == "경영/경제"
+        assert categories.parent_of("에세이") is None
+
+        # When: 파일이 바뀌면
+        write_categories(path, {"경영/경제": ["경영일반"], "시/에세이": ["시", "에세이"]}, mtime_ns=2_000_000_000)
+
+        # Then: 재시작 없이 다이얼로그와 상위 카테고리에 반영된다
+        assert categories.parent_of("에세이") == "시/에세이"
+        dialog = json.loads(categories.dialog_request(trigger_id="t", callback_id="c"))["dialog"]
+        assert [group["label"] for group in dialog["elements"][0]["option_groups"]] == ["경영/경제", "시/에세이"]
+
+    async def test_keep_categories_when_file_is_broken(self, tmp_path):
+        # Given
+        path = tmp_path / "categories.json"
+        write_categories(path, {"경영/경제": ["경영일반"]}, mtime_ns=1_000_000_000)
+        categories = Taxonomy(default_categories(), path=str(path))
+
+        # When: 잘못된 파일로 바뀌면
+        write_categories(path, {"경영/경제": []}, mtime_ns=2_000_000_000)
+
+        # Then: 기존 카테고리를 계속 사용한다
+        assert categories.reload_if_changed() is False
+        assert categories.parent_of("경영일반") == "경영/경제"
+
+    async def test_use_default_categories_without_file(self, tmp_path):
+        categories = Taxonomy(default_categories(), path=str(tmp_path / "missing.json"))
+
+        assert categories.parent_of("경제일반") == "경영/경제"
@@ -0,0 +1,70 @@
+"""
+도서 링크 검증/서점 판별 비용을 비교하는 마이크로 벤치마크
+
+    PYTHONPATH=apps python benchmarks/bench_book_links.py --iterations 50000
+
+- legacy: 정규식 검증 -> urlparse -> 서점 도메인 enum 을 돌면서 부분 문자열 검사 (기존 방식)
+- registry: parse_book_link 한 번 -> 호스트로 서점 어댑터 조회
+
+긴 입력(수십 KB) 은 공격적인 링크를 넣었을 때 한 요청이 얼마나 CPU 를 쓰는지 보기 위한 것.
+"""
+import argparse
+import re
+import time
+from enum import Enum
+from urllib.parse import urlparse
+
+from bookstores import bookstores, parse_book_link
+
+
+_LEGACY_LINK_REGEX = (
+    r"^(http:\/\/www\.|https:\/\/www\.|http:\/\/|https:\/\/)?[a-z0-9]"
+    r"+([\-\.]{1}[a-z0-9]+)*\.[a-z]{2,5}(:[0-9]{1,5})?(\/.*)?$"
+)
+
+
+class _LegacyBookStoreDomain(str, Enum):
+    RIDI = "ridibooks.com"
+    YES_TWENTY_FOUR = "yes24.com"
+
+
+def legacy(link: str) -> bool:
+    if not re.match(_LEGACY_LINK_REGEX, link):
+        return False
+    parsed_link = urlparse(link.strip())
+    return any(domain in parsed_link.netloc or domain in parsed_link.path for domain in _LegacyBookStoreDomain)
+
+
+def registry(link: str) -> bool:
+    parsed = parse_book_link(link)
+    return parsed is not None and bookstores.for_link(parsed) is not None
+
+
+LINKS = {
+    "ridibooks": "https://ridibooks.com/books/1354000126?_s=search&_q=부의+추월차선",
+    "yes24": "https://www.yes24.com/Product/Goods/106369008",
+    "other": "https://www.example.com/books/1",
+    "invalid": "부의 추월차선",
+    "long_valid": "https://ridibooks.com/" + "a" * 50000,
+    "long_invalid": "https://" + "a-" * 25000 + "!",
+}
+
+
+def measure(check, link: str, iterations: int) -> float:
+    started = time.process_time()
+    for _ in range(iterations):
+        check(link)
+    return (time.process_time() - started) / iterations
+
+
+def main(iterations: int) -> None:
+    for name, link in LINKS.items():
+        count = iterations if not name.startswith("long") else max(1, iterations // 100)
+        before, after = measure(legacy, link, count), measure(registry, link, count)
+        print(f"{name:>12}: legacy {before * 1e6:9.2f} µs, registry {after * 1e6:9.2f} µs ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=50000)
+    main(parser.parse_args().iterations)
@@ -0,0 +1,161 @@
+"""
+요청마다 AsyncClient 를 새로 여는 방식과 공유 커넥션 풀(http_clients)을 비교하는 벤치마크
+
+    PYTHONPATH=apps python benchmarks/bench_http_pool.py --submissions 200 --concurrency 20 --tls --rtt-ms 20
+
+(settings 를 읽으므로 .env 또는 CI 와 같은 환경변수가 필요)
+
+도서 추천 1건은 opengraph.io GET 1회 + Notion POST 1회로 흉내낸다. 두 업스트림은 서로 다른 포트의 로컬 서버이고,
+--rtt-ms 만큼 새 커넥션마다 지연을 주어 원격 호스트와의 TCP/TLS 핸드셰이크 비용을 재현한다.
+"""
+import argparse
+import asyncio
+import json
+import os
+import ssl
+import subprocess
+import tempfile
+import time
+from typing import Optional
+
+import httpx
+
+from http_clients import HttpClientPool
+
+
+RESPONSE_HEAD = b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 2\r\n\r\n"
+RESPONSE_BODY = b"{}"
+
+
+class Upstream:
+    def __init__(self, rtt: float, ssl_context: Optional[ssl.SSLContext]):
+        self.rtt = rtt
+        self.ssl_context = ssl_context
+        self.connections = 0
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        scheme = "https" if self.ssl_context else "http"
+        return f"{scheme}://localhost:{self.server.sockets[0].getsockname()[1]}"
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0, ssl=self.ssl_context)
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        # 핸드셰이크 왕복(SYN/ACK, TLS hello) 에 해당하는 지연
+        await asyncio.sleep(self.rtt * (2 if self.ssl_context else 1))
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                await reader.readexactly(length)
+                await asyncio.sleep(self.rtt)
+                writer.write(RESPONSE_HEAD if head.startswith(b"HEAD ") else RESPONSE_HEAD + RESPONSE_BODY)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def self_signed_context(directory: str) -> ssl.SSLContext:
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subject = ["-subj", "/CN=localhost", "-keyout", key, "-out", cert]
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", *subject],
+        check=True,
+        capture_output=True,
+    )
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+async def submit_with_fresh_clients(og: Upstream, notion: Upstream, verify) -> None:
+    async with httpx.AsyncClient(verify=verify) as client:
+        await client.get(og.url)
+    async with httpx.AsyncClient(verify=verify) as client:
+        await client.post(notion.url, json={"parent": {}})
+
+
+async def submit_with_pool(og: Upstream, notion: Upstream, pool: HttpClientPool) -> None:
+    await pool.get(og.url).get(og.url)
+    await pool.get(notion.url).post(notion.url, json={"parent": {}})
+
+
+async def run(mode: str, args: argparse.Namespace, ssl_context: Optional[ssl.SSLContext]) -> dict:
+    og, notion = Upstream(args.rtt_ms / 1000, ssl_context), Upstream(args.rtt_ms / 1000, ssl_context)
+    await og.start()
+    await notion.start()
+
+    verify = False if ssl_context else True
+    pool = HttpClientPool(
+        max_connections_per_host=args.concurrency,
+        max_keepalive_connections_per_host=args.concurrency,
+        keepalive_expiry=60,
+        verify=verify,
+    )
+    if mode == "pool":
+        await pool.prewarm((og.url, notion.url), connections_per_host=args.prewarm, timeout=5)
+    prewarmed = og.connections + notion.connections
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def submission() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            if mode == "pool":
+                await submit_with_pool(og, notion, pool)
+            else:
+                await submit_with_fresh_clients(og, notion, verify)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(submission() for _ in range(args.submissions)))
+    elapsed = time.perf_counter() - started
+
+    await pool.aclose()
+    await og.stop()
+    await notion.stop()
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "submissions": args.submissions,
+        "concurrency": args.concurrency,
+        "tls": ssl_context is not None,
+        "rtt_ms": args.rtt_ms,
+        "connections_opened": og.connections + notion.connections - prewarmed,
+        "connections_prewarmed": prewarmed,
+        "elapsed_s": round(elapsed, 3),
+        "submissions_per_s": round(args.submissions / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        ssl_context = self_signed_context(directory) if args.tls else None
+        for mode in ("fresh", "pool"):
+            print(json.dumps(await run(mode, args, ssl_context), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--submissions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=20)
+    parser.add_argument("--prewarm", type=int, default=2)
+    parser.add_argument("--tls", action="store_true")
+    asyncio.run(main(parser.parse_args()))
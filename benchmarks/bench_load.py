@@ -0,0 +1,321 @@
+"""
+gunicorn.ini.py 설정 그대로(gunicorn + uvicorn 워커) 띄운 앱에 목표 RPS 로 요청을 보내 지연시간/처리량/실패율을 측정하는 부하 테스트
+
+    PYTHONPATH=apps python benchmarks/bench_load.py run --rate 20 --duration 30 --upstream-latency-ms 80 --error-rate 0.01
+    PYTHONPATH=apps python benchmarks/bench_load.py run --scenarios submit-book --upstream-latency-ms 800 --deferred-reply
+    PYTHONPATH=apps python benchmarks/bench_load.py compare benchmarks/results/<base>.json benchmarks/results/<head>.json
+
+슬랙 Web API / 노션 / opengraph.io 는 apps/tests/fakes.py 의 가짜 서버를 별도 프로세스의 uvicorn 으로 띄워서 대체한다.
+결과는 커밋 해시별 JSON 파일(benchmarks/results/<commit>.json) 로 저장되고, compare 로 두 커밋의 결과를 비교한다.
+
+요청은 응답을 기다리지 않고 정해진 간격으로 보내며(open-loop), 지연시간은 요청을 보내기로 예정된 시각부터 잰다.
+그래야 앱이 느려져서 요청이 밀렸을 때의 대기 시간이 결과에서 빠지지 않는다(coordinated omission).
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+import uvicorn
+
+from tests.fakes import FakeNotion, FakeOpenGraph, FakeSlack
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS_DIR = os.path.join(ROOT_DIR, "apps")
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+
+UPSTREAMS = ("slack", "notion", "opengraph")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"nothing is listening on {port} after {timeout}s")
+
+
+def run_fake_upstreams(ports: Dict[str, int], latency: float, jitter: float, error_rate: float) -> None:
+    fakes = {
+        "slack": FakeSlack(latency=latency, jitter=jitter, error_rate=error_rate),
+        "notion": FakeNotion(latency=latency, jitter=jitter, error_rate=error_rate),
+        "opengraph": FakeOpenGraph(latency=latency, jitter=jitter, error_rate=error_rate),
+    }
+    servers = [
+        uvicorn.Server(uvicorn.Config(fakes[name].app, host="127.0.0.1", port=ports[name], log_level="warning"))
+        for name in UPSTREAMS
+    ]
+
+    async def serve() -> None:
+        await asyncio.gather(*(server.serve() for server in servers))
+
+    asyncio.run(serve())
+
+
+def start_app(
+    port: int, upstream_ports: Dict[str, int], data_dir: str, workers: Optional[int], deferred_reply: bool
+) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        # .env 의 실제 토큰/주소를 읽지 않도록
+        "BOOKK_ENV": "test",
+        "PORT": str(port),
+        "SLACK_API_TOKEN": "bench",
+        "OG_APP_ID": "bench",
+        "BOOKS_CHANNEL": "bench",
+        "NOTION_SECRET_KEY": "bench",
+        "NOTION_DATABASE_ID": "bench",
+        "SLACK_API_BASE_URL": f"http://127.0.0.1:{upstream_ports['slack']}/api/",
+        "NOTION_API_BASE_URL": f"http://127.0.0.1:{upstream_ports['notion']}",
+        "OG_API_BASE_URL": f"http://127.0.0.1:{upstream_ports['opengraph']}",
+        # 실제 서점 페이지에 요청하지 않도록 opengraph.io (가짜 서버) 만 사용
+        "OG_SCRAPER_ENABLED": "false",
+        "OG_CACHE_PATH": os.path.join(data_dir, "opengraph.sqlite3"),
+        "SHARED_CACHE_PATH": os.path.join(data_dir, "shared.sqlite3"),
+        "OUTBOX_PATH": os.path.join(data_dir, "outbox.sqlite3"),
+        "SUBMIT_BOOK_DEFERRED_REPLY": str(deferred_reply).lower(),
+        # 가짜 슬랙에는 rate limit 이 없으므로, 슬랙 한도에 맞춰 줄 세우지 않고 앱 자체의 처리량을 잰다
+        "SLACK_RATE_SHARE": "1000",
+    }
+    command = ["gunicorn", "-c", "gunicorn.ini.py", "app:app"]
+    if workers:
+        command += ["--workers", str(workers)]
+    return subprocess.Popen(command, cwd=APPS_DIR, env=env)
+
+
+def open_form_request(n: int, slack_url: str) -> dict:
+    return {"url": "/open-form/", "data": {"trigger_id": uuid.uuid4().hex}}
+
+
+def submit_book_request(n: int, slack_url: str) -> dict:
+    payload = {
+        "type": "dialog_submission",
+        "submission": {
+            "category": "경제일반",
+            # 매번 다른 책이라 오픈그래프 캐시에 걸리지 않는다
+            "bookstore_url": f"https://ridibooks.com/books/{1000000000 + n}",
+            "recommend_reason": "부하 테스트",
+        },
+        "callback_id": uuid.uuid4().hex,
+        "user": {"id": f"U{n % 100:08d}", "name": "bench"},
+        "channel": {"id": "C00000000", "name": "books"},
+        # 메세지 전송에 실패했을 때 알리는 주소도 가짜 슬랙 서버로
+        "response_url": f"{slack_url}/response/bench",
+    }
+    return {"url": "/submit-book/", "data": {"payload": json.dumps(payload)}}
+
+
+SCENARIOS = {"open-form": open_form_request, "submit-book": submit_book_request}
+
+
+def percentile(latencies: List[float], q: float) -> Optional[float]:
+    # nearest-rank
+    if not latencies:
+        return None
+    ordered = sorted(latencies)
+    return ordered[max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered))) - 1))]
+
+
+async def drive(base_url: str, slack_url: str, scenario: str, rate: float, duration: float, timeout: float) -> dict:
+    build_request = SCENARIOS[scenario]
+    latencies: List[float] = []
+    errors: Counter = Counter()
+
+    async def send(client: httpx.AsyncClient, n: int, scheduled_at: float) -> None:
+        try:
+            response = await client.post(**build_request(n, slack_url))
+        except httpx.HTTPError as e:
+            errors[type(e).__name__] += 1
+            return
+        latency = time.monotonic() - scheduled_at
+        # 슬랙 API 에러는 200 응답 본문에 에러 코드를 담아 보낸다
+        if response.status_code != 200:
+            errors[f"http_{response.status_code}"] += 1
+        elif response.content:
+            errors["error_body"] += 1
+        else:
+            latencies.append(latency)
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        started = time.monotonic()
+        tasks = []
+        for n in range(int(rate * duration)):
+            scheduled_at = started + n / rate
+            await asyncio.sleep(max(0.0, scheduled_at - time.monotonic()))
+            tasks.append(asyncio.create_task(send(client, n, scheduled_at)))
+        await asyncio.gather(*tasks)
+        elapsed = time.monotonic() - started
+
+    total = len(tasks)
+    failed = sum(errors.values())
+    return {
+        "requests": total,
+        "succeeded": total - failed,
+        "failed": failed,
+        "failure_rate": failed / total if total else 0,
+        "errors": dict(errors),
+        "throughput_rps": (total - failed) / elapsed,
+        "latency_ms": {
+            "p50": _ms(percentile(latencies, 50)),
+            "p95": _ms(percentile(latencies, 95)),
+            "p99": _ms(percentile(latencies, 99)),
+            "max": _ms(max(latencies, default=None)),
+        },
+    }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def git_revision() -> Dict[str, object]:
+    def git(*args: str) -> str:
+        return subprocess.run(["git", *args], cwd=ROOT_DIR, capture_output=True, text=True).stdout.strip()
+
+    return {"commit": git("rev-parse", "--short", "HEAD") or "unknown", "dirty": bool(git("status", "--porcelain"))}
+
+
+async def run_scenarios(args: argparse.Namespace, base_url: str, slack_url: str) -> Dict[str, dict]:
+    results = {}
+    for scenario in args.scenarios:
+        if args.warmup:
+            await drive(base_url, slack_url, scenario, args.rate, args.warmup, args.timeout)
+        results[scenario] = await drive(base_url, slack_url, scenario, args.rate, args.duration, args.timeout)
+        print(f"{scenario}: {json.dumps(results[scenario], ensure_ascii=False)}")
+    return results
+
+
+def upstream_stats(ports: Dict[str, int]) -> Dict[str, dict]:
+    return {name: httpx.get(f"http://127.0.0.1:{ports[name]}/_stats").json() for name in UPSTREAMS}
+
+
+def run(args: argparse.Namespace) -> None:
+    upstream_ports = {name: free_port() for name in UPSTREAMS}
+    app_port = free_port()
+
+    upstreams = multiprocessing.Process(
+        target=run_fake_upstreams,
+        args=(upstream_ports, args.upstream_latency_ms / 1000, args.upstream_jitter_ms / 1000, args.error_rate),
+        daemon=True,
+    )
+    upstreams.start()
+    with tempfile.TemporaryDirectory() as data_dir:
+        app = start_app(app_port, upstream_ports, data_dir, args.workers, args.deferred_reply)
+        try:
+            for port in (*upstream_ports.values(), app_port):
+                wait_for_port(port, timeout=30)
+            scenarios = asyncio.run(
+                run_scenarios(args, f"http://127.0.0.1:{app_port}", f"http://127.0.0.1:{upstream_ports['slack']}")
+            )
+        finally:
+            # SIGTERM 으로 종료해서 outbox 에 남은 아카이빙 작업까지 처리하게 한다
+            app.send_signal(signal.SIGTERM)
+            app.wait(timeout=60)
+        stats = upstream_stats(upstream_ports)
+    upstreams.kill()
+    upstreams.join()
+
+    report = {
+        **git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "config": {key: value for key, value in vars(args).items() if key not in ("command", "handler")},
+        "scenarios": scenarios,
+        "upstreams": stats,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"saved to {output}")
+
+
+def compare(args: argparse.Namespace) -> None:
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+
+    regressed = False
+    print(f"{'scenario':<12} {'metric':<14} {base['commit']:>10} {head['commit']:>10} {'change':>8}")
+    for scenario in sorted(set(base["scenarios"]) & set(head["scenarios"])):
+        before, after = base["scenarios"][scenario], head["scenarios"][scenario]
+        rows = [(f"{q} ms", before["latency_ms"][q], after["latency_ms"][q]) for q in ("p50", "p95", "p99")]
+        rows += [("failure_rate", before["failure_rate"], after["failure_rate"])]
+        rows += [("throughput", before["throughput_rps"], after["throughput_rps"])]
+        for metric, old, new in rows:
+            change = (new - old) / old if old and new is not None else None
+            print(f"{scenario:<12} {metric:<14} {_fmt(old):>10} {_fmt(new):>10} {_fmt_change(change):>8}")
+        if before["latency_ms"]["p99"] and after["latency_ms"]["p99"]:
+            regressed |= after["latency_ms"]["p99"] > before["latency_ms"]["p99"] * (1 + args.threshold)
+        regressed |= after["failure_rate"] > before["failure_rate"] + args.failure_rate_threshold
+
+    if regressed:
+        print("regression: p99 latency or failure rate got worse than the thresholds")
+        sys.exit(1)
+
+
+def _fmt(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.2f}"
+
+
+def _fmt_change(change: Optional[float]) -> str:
+    return "-" if change is None else f"{change:+.0%}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run")
+    run_parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=["open-form", "submit-book"])
+    run_parser.add_argument("--rate", type=float, default=20, help="초당 요청 수")
+    run_parser.add_argument("--duration", type=float, default=30)
+    run_parser.add_argument("--warmup", type=float, default=3, help="측정 전에 같은 속도로 요청을 보내는 시간")
+    run_parser.add_argument("--timeout", type=float, default=10)
+    run_parser.add_argument("--workers", type=int, help="gunicorn.ini.py 의 workers 대신 사용할 값")
+    run_parser.add_argument("--upstream-latency-ms", type=float, default=80)
+    run_parser.add_argument("--upstream-jitter-ms", type=float, default=20)
+    run_parser.add_argument("--error-rate", type=float, default=0, help="가짜 업스트림이 실패 응답을 보내는 비율")
+    run_parser.add_argument(
+        "--deferred-reply", action="store_true", help="submit_book 이 검증만 하고 바로 응답 (슬랙 메세지는 응답 뒤에 전송)"
+    )
+    run_parser.add_argument("--output", help="기본값은 benchmarks/results/<commit>.json")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("head")
+    compare_parser.add_argument("--threshold", type=float, default=0.2, help="허용하는 p99 지연시간 증가율")
+    compare_parser.add_argument("--failure-rate-threshold", type=float, default=0.01, help="허용하는 실패율 증가폭")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
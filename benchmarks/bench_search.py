@@ -0,0 +1,72 @@
+"""
+추천 도서 검색 지연시간 벤치마크
+
+    PYTHONPATH=apps python benchmarks/bench_search.py --books 30000
+
+(settings 를 읽으므로 .env 또는 CI 와 같은 환경변수가 필요)
+
+임시 노션 사본에 가짜 추천 도서를 채운 뒤, 자주 쓰일 만한 검색어마다 NotionMirror.search 의 지연시간을 잰다.
+슬래시 커맨드는 3초 안에 응답해야 하므로 p99 가 수십 ms 안쪽이면 충분하다.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from notion_mirror import NotionMirror
+
+
+SYLLABLES = "가나다라마바사아자차카타파하부의추월차선경제사랑시코드읽기좋은책여행역사소설"
+QUERIES = ["추월차선", "부의", "시", "경영/경제", "김북크", "읽기 좋은", "clean code", "없는검색어"]
+
+
+def fake_page(n: int, rng: random.Random) -> dict:
+    def phrase(words: int) -> str:
+        return " ".join("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 5))) for _ in range(words))
+
+    created_time = f"2024-01-01T00:00:{n:08d}Z"
+    return {
+        "id": str(n),
+        "created_time": created_time,
+        "last_edited_time": created_time,
+        "properties": {
+            "title": {"title": [{"plain_text": phrase(3) if n % 100 else "Clean Code"}]},
+            "URL": {"url": f"https://ridibooks.com/books/{n}"},
+            "category": {"multi_select": [{"name": "경제일반"}, {"name": "경영/경제"}]},
+            "recommender": {"rich_text": [{"plain_text": rng.choice(["김북크", "이북크", "박북크"])}]},
+            "recommend reason": {"rich_text": [{"plain_text": phrase(30)}]},
+        },
+    }
+
+
+def main(books: int, repeat: int) -> None:
+    rng = random.Random(7)
+    mirror = NotionMirror(path=os.path.join(tempfile.mkdtemp(), "mirror.sqlite3"), database_id="benchmark")
+
+    started = time.perf_counter()
+    for n in range(books):
+        mirror.upsert(fake_page(n, rng))
+    print(f"indexed {books} books in {time.perf_counter() - started:.1f}s ({os.path.getsize(mirror.path) >> 20} MB)")
+
+    for query in QUERIES:
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            results = mirror.search(query)
+            latencies.append(time.perf_counter() - started)
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(
+            f"{query:>12}: {len(results):2d} results, "
+            f"p50 {statistics.median(latencies) * 1e3:6.2f} ms, p99 {p99 * 1e3:6.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=30000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    main(args.books, args.repeat)
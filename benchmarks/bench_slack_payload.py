@@ -0,0 +1,94 @@
+"""
+슬랙 인터랙션 payload 디코딩 비용을 비교하는 마이크로 벤치마크
+
+    PYTHONPATH=apps python benchmarks/bench_slack_payload.py --iterations 20000
+
+(settings 를 읽으므로 .env 또는 CI 와 같은 환경변수가 필요)
+
+- form: request.form() -> json.loads -> BookSubmitPayload.model_validate (기존 방식)
+- fast: request.body() -> interactions.extract_payload -> BookSubmitPayload.model_validate_json
+
+둘 다 같은 urlencoded 본문을 starlette Request 로 감싸서 읽으므로, 요청 하나를 처리하는 데 드는 CPU 시간 차이만 남는다.
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlencode
+
+from starlette.requests import Request
+
+from dtos.slack.book_submission import BookSubmitPayload
+from interactions import FORM_URLENCODED, extract_payload
+
+
+def slack_body() -> bytes:
+    # 실제 다이얼로그 제출과 비슷한 크기(약 1KB) 의 본문
+    payload = {
+        "type": "dialog_submission",
+        "submission": {
+            "category": "경제일반",
+            "bookstore_url": "https://ridibooks.com/books/1354000126?_s=search&_q=부의+추월차선",
+            "recommend_reason": "죽도록 일해서 돈을 벌고, 아끼고, 모으는 것만으로는 절대 젊어서 부자가 될 수 없다고 말하며, ‘젊어서 부자가 되는 길’을 공개한다.",
+        },
+        "callback_id": "5f2b3c9a1e7d4c0b8a6f2e1d3c4b5a69",
+        "state": "",
+        "team": {"id": "T1ABCD2E12", "domain": "coverbands"},
+        "user": {"id": "W12A3BCDEF", "name": "dreamweaver"},
+        "channel": {"id": "C1AB2C3DE", "name": "coverthon-1999"},
+        "action_ts": "936893340.702759",
+        "token": "M1AqUUw3FqayAbqNtsGMch72",
+        "response_url": "https://hooks.slack.com/app/T012AB0A1/123456789/JpmK0yzoZDeRiqfeduTBYXWQ",
+    }
+    return urlencode({"payload": json.dumps(payload, ensure_ascii=False)}).encode()
+
+
+def make_request(body: bytes) -> Request:
+    async def receive() -> dict:
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/submit-book/",
+        "headers": [(b"content-type", FORM_URLENCODED.encode()), (b"content-length", str(len(body)).encode())],
+    }
+    return Request(scope, receive)
+
+
+async def form_path(body: bytes) -> BookSubmitPayload:
+    form = await make_request(body).form()
+    return BookSubmitPayload.model_validate(json.loads(form.get("payload")))
+
+
+async def fast_path(body: bytes) -> BookSubmitPayload:
+    return BookSubmitPayload.model_validate_json(extract_payload(await make_request(body).body()))
+
+
+async def measure(decode, body: bytes, iterations: int) -> float:
+    for _ in range(min(1000, iterations)):
+        await decode(body)
+    started = time.process_time()
+    for _ in range(iterations):
+        await decode(body)
+    return (time.process_time() - started) / iterations
+
+
+async def main(iterations: int) -> None:
+    body = slack_body()
+    assert await form_path(body) == await fast_path(body)
+
+    results = {
+        name: await measure(decode, body, iterations) for name, decode in (("form", form_path), ("fast", fast_path))
+    }
+    for name, seconds in results.items():
+        print(f"{name}: {seconds * 1e6:.1f} µs CPU/request")
+    print(
+        f"saved: {(results['form'] - results['fast']) * 1e6:.1f} µs/request ({results['form'] / results['fast']:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    asyncio.run(main(parser.parse_args().iterations))
@@ -0,0 +1,150 @@
+"""
+앱의 콜드 스타트 시간과 워커별 메모리를 잰다
+
+    PYTHONPATH=apps python benchmarks/bench_startup.py --workers 4
+    PYTHONPATH=apps python benchmarks/bench_startup.py --check   # apps/tests/startup.py 의 예산을 넘으면 실패
+
+- import: 새 인터프리터에서 `import app` 에 걸리는 시간과 그 직후 RSS (gunicorn 마스터가 preload_app 으로 한 번 치르는 비용)
+- cold start: gunicorn 을 띄운 뒤 모든 워커가 lifespan 을 마치고 요청에 응답하기까지의 시간
+- workers: 그 직후 워커마다의 rss / pss / private (fork 뒤에 새로 쓴 페이지). 워커 수만큼 곱해지는 건 private 이다
+가짜 업스트림은 bench_load.py 와 같은 것을 쓴다. 결과는 benchmarks/results/startup-<commit>.json 에 저장한다.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import httpx
+
+from bench_load import RESULTS_DIR, UPSTREAMS, free_port, git_revision, run_fake_upstreams, start_app, wait_for_port
+from tests.startup import (
+    IMPORT_RSS_BUDGET,
+    IMPORT_SECONDS_BUDGET,
+    WORKER_PRIVATE_BUDGET,
+    measure_import,
+    process_memory,
+)
+
+
+DEBUG_TOKEN: str = "bench"
+MIB: int = 1024 * 1024
+
+
+def wait_for_workers(port: int, workers: int, timeout: float) -> List[int]:
+    # /debug/heap 은 응답한 워커의 pid 를 알려주므로, 모든 워커가 한 번씩 응답할 때까지 요청한다
+    seen = set()
+    deadline = time.monotonic() + timeout
+    while len(seen) < workers:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"only {len(seen)} of {workers} workers are ready after {timeout}s")
+        try:
+            # 매번 새 커넥션으로 보내야 여러 워커에 나뉘어 들어간다
+            response = httpx.get(
+                f"http://127.0.0.1:{port}/debug/heap",
+                headers={"Authorization": f"Bearer {DEBUG_TOKEN}"},
+                params={"top": 1},
+                timeout=5,
+            )
+            seen.add(response.json()["pid"])
+        except (httpx.HTTPError, ValueError, KeyError):
+            time.sleep(0.05)
+    return sorted(seen)
+
+
+def measure_workers(workers: int, timeout: float) -> dict:
+    upstream_ports = {name: free_port() for name in UPSTREAMS}
+    app_port = free_port()
+    upstreams = multiprocessing.Process(target=run_fake_upstreams, args=(upstream_ports, 0, 0, 0), daemon=True)
+    upstreams.start()
+    for port in upstream_ports.values():
+        wait_for_port(port, timeout=30)
+
+    os.environ["DEBUG_TOKEN"] = DEBUG_TOKEN
+    with tempfile.TemporaryDirectory() as data_dir:
+        started = time.monotonic()
+        app = start_app(app_port, upstream_ports, data_dir, workers, deferred_reply=False)
+        try:
+            wait_for_port(app_port, timeout=timeout)
+            pids = wait_for_workers(app_port, workers, timeout)
+            cold_start = time.monotonic() - started
+            report = {
+                "cold_start_seconds": cold_start,
+                "master": process_memory(app.pid),
+                "workers": {str(pid): process_memory(pid) for pid in pids},
+            }
+        finally:
+            app.send_signal(signal.SIGTERM)
+            app.wait(timeout=60)
+    upstreams.kill()
+    upstreams.join()
+    return report
+
+
+def over_budget(report: dict) -> List[str]:
+    exceeded = []
+    if report["import"]["seconds"] > IMPORT_SECONDS_BUDGET:
+        exceeded.append(f"import took {report['import']['seconds']:.2f}s > {IMPORT_SECONDS_BUDGET}s")
+    if report["import"]["rss_bytes"] > IMPORT_RSS_BUDGET:
+        exceeded.append(f"import RSS {report['import']['rss_bytes'] / MIB:.1f}MiB > {IMPORT_RSS_BUDGET / MIB:.0f}MiB")
+    for pid, memory in report["startup"]["workers"].items():
+        if memory["private_bytes"] > WORKER_PRIVATE_BUDGET:
+            exceeded.append(
+                f"worker {pid} private {memory['private_bytes'] / MIB:.1f}MiB > {WORKER_PRIVATE_BUDGET / MIB:.0f}MiB"
+            )
+    return exceeded
+
+
+def print_report(report: dict) -> None:
+    imported = report["import"]
+    print(
+        f"import: {imported['seconds']:.3f}s, rss {imported['rss_bytes'] / MIB:.1f}MiB, {imported['modules']} modules"
+    )
+    print(f"cold start: {report['startup']['cold_start_seconds']:.2f}s")
+    processes: Dict[str, dict] = {"master": report["startup"]["master"], **report["startup"]["workers"]}
+    for name, memory in processes.items():
+        print(
+            f"{name:>8}: rss {memory['rss_bytes'] / MIB:.1f}MiB, pss {memory['pss_bytes'] / MIB:.1f}MiB,"
+            f" private {memory['private_bytes'] / MIB:.1f}MiB"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--import-runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--check", action="store_true", help="예산을 넘으면 종료 코드 1")
+    parser.add_argument("--output", help="기본값은 benchmarks/results/startup-<commit>.json")
+    args = parser.parse_args()
+
+    report = {
+        **git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "config": vars(args),
+        "import": measure_import("app", runs=args.import_runs),
+        "startup": measure_workers(args.workers, args.timeout),
+    }
+    print_report(report)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"startup-{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"saved to {output}")
+
+    exceeded = over_budget(report)
+    for line in exceeded:
+        print(f"over budget: {line}")
+    if args.check and exceeded:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()